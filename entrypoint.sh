@@ -5,18 +5,17 @@ IMPORT_DIR="${IMPORT_DIR:-/data/import}"
 LIB_DIR="${LIB_DIR:-/data/library}"
 export IMPORT_DIR LIB_DIR
 
-echo "[startup] organising once..."
-python /app/main.py "$IMPORT_DIR" "$LIB_DIR" --mode move
-
-echo "[watch] monitoring $IMPORT_DIR for new or changed files..."
-# Run inotify loop in background so we can start the web server
-(
-  inotifywait -m -r -e close_write,create,move,delete "$IMPORT_DIR" | while read -r _; do
-    sleep 20
-    echo "[watch] change detected — organising..."
-    python /app/main.py "$IMPORT_DIR" "$LIB_DIR" --mode move --dupe-mode name --emit-nfo all --carry-posters keep
-  done
-) &
+echo "[watch] organising $IMPORT_DIR, then monitoring it for new or changed files..."
+# One long-lived organiser in the background so we can start the web server.
+# Its first pass organises whatever is already in the inbox, so there is no
+# separate one-off run at startup.
+# It keeps the library index and fingerprint cache warm between uploads and
+# only looks at the folders that changed; --debounce waits for a burst of
+# writes to go quiet before organising it.
+# --dupe-mode hash, as the old startup run had: with --mode move a matched
+# import is deleted, so a name match alone is not enough to drop one.
+python /app/main.py "$IMPORT_DIR" "$LIB_DIR" --watch --debounce 20 \
+  --mode move --dupe-mode hash --emit-nfo all --carry-posters keep &
 
 echo "[web] starting upload interface on port 6767..."
 # One worker only: the dashboard cache in web.py is per-process, so extra
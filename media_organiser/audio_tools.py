@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import os
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
@@ -9,7 +10,9 @@ from typing import Any, Dict, Optional
 from mutagen import File as MutagenFile
 from mutagen.easyid3 import EasyID3
 
+from . import iorate
 from .duplicates import quick_fingerprint
+from .io_ops import partial_path
 
 # Minimum acceptable bitrate for library ingest (inclusive).
 MIN_BITRATE_KBPS = 256
@@ -430,6 +433,33 @@ def _compute_library_target(source: Path, export_dir: Path) -> Path:
         n += 1
 
 
+def _write_copy(source: Path, target: Path) -> None:
+    """
+    ``target.write_bytes(source.read_bytes())``, a step at a time under an I/O cap.
+
+    A plain write on purpose: the copy gets its own mode and mtime, as a new
+    file in the library should. It is written under a hidden name beside
+    ``target`` and renamed into place once complete, so a failed copy leaves
+    nothing behind.
+    """
+    partial = partial_path(target)
+    try:
+        with source.open("rb") as src, partial.open("wb") as dst:
+            pace = iorate.pacer(src.fileno(), dst.fileno())
+            step = pace.step if pace is not None else 1 << 20
+            while True:
+                chunk = src.read(step)
+                if not chunk:
+                    break
+                if pace is not None:
+                    pace(len(chunk))
+                dst.write(chunk)
+        os.replace(partial, target)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+
 def ensure_mp3_320(
     source: Path, export_dir: Path, *, scan_library_duplicates: bool = True
 ) -> Dict[str, Any]:
@@ -484,7 +514,7 @@ def ensure_mp3_320(
 
     if codec_name == "mp3" and bitrate >= 320 and not quality.get("needs_transcode"):
         if source.resolve() != target.resolve():
-            target.write_bytes(source.read_bytes())
+            _write_copy(source, target)
         return {
             "status": "ok",
             "reason": None,
@@ -508,12 +538,17 @@ def ensure_mp3_320(
         str(target),
     ]
     try:
-        subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True,
-        )
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            iorate.prioritise_child(proc.pid)
+            out, err = proc.communicate()
+        except BaseException:
+            # Interrupted or failed part way: do not leave ffmpeg running, or a zombie.
+            proc.kill()
+            proc.wait()
+            raise
+        if proc.returncode:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
     except (FileNotFoundError, subprocess.CalledProcessError) as e:
         return {
             "status": "error",
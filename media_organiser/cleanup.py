@@ -1,34 +1,90 @@
 # media_organiser/cleanup.py
+import heapq
+import re
 from pathlib import Path
+from typing import Callable
+
+from . import snapshot
 
 JUNK_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".nfo", ".txt", ".url", ".webloc", ".lnk"}
 # ^ keep images + typical scene cruft that we consider removable if they contain bad words
 
 def is_ignored_junk(file: Path, bad_words: list[str]) -> bool:
-    if not file.is_file():
+    if not snapshot.is_file(file):
         return False
     name = file.name.lower()
     # delete only if it matches any bad word AND is a junky suffix
     return any(w in name for w in bad_words) and file.suffix.lower() in JUNK_SUFFIXES
 
+def _junk_matcher(bad_words: list[str]) -> Callable[[str], bool]:
+    """``is_ignored_junk``'s name test with the bad words folded into one pattern up front."""
+    if not bad_words:
+        return lambda name: False
+    pat = re.compile("|".join(map(re.escape, bad_words)))
+    return lambda name: pat.search(name.lower()) is not None and Path(name).suffix.lower() in JUNK_SUFFIXES
+
+
+class Pruner:
+    """
+    Junk removal and empty-folder pruning for a whole run, done once at the end.
+
+    Pruning after every moved file walked the same folder chain again for each
+    episode of a season pack. Here the organiser :meth:`touch`-es the folders
+    it took files from and :meth:`run` visits them deepest first, each one
+    once: junk inside is deleted, the folder is removed if that leaves it
+    empty, and only then is its parent considered — exactly the walk
+    ``prune_junk_then_empty_dirs`` makes for a single folder.
+    """
+
+    def __init__(self, stop: Path, bad_words: list[str]) -> None:
+        self.stop = stop
+        self._is_junk = _junk_matcher(bad_words)
+        self._touched: set[Path] = set()
+
+    def touch(self, d: Path) -> None:
+        self._touched.add(d)
+
+    def _below_stop(self, d: Path) -> bool:
+        return d != self.stop and d != d.parent and self.stop in d.parents
+
+    def run(self) -> int:
+        """Prune everything touched so far; returns the number of folders removed."""
+        heap = [(-len(d.parts), str(d), d) for d in self._touched if self._below_stop(d)]
+        self._touched.clear()
+        heapq.heapify(heap)
+        visited: set[Path] = set()
+        removed = 0
+        while heap:
+            _depth, _key, cur = heapq.heappop(heap)
+            if cur in visited:
+                continue
+            visited.add(cur)
+            # remove junk posters/etc first
+            for child in snapshot.listdir(cur):
+                try:
+                    if self._is_junk(child.name) and snapshot.is_file(child):
+                        child.unlink(missing_ok=True)
+                        snapshot.removed(child)
+                except OSError:
+                    pass
+            # try to remove the directory if now empty
+            try:
+                cur.rmdir()  # only succeeds if empty
+            except OSError:
+                continue  # not empty; its parents stay
+            snapshot.removed(cur)
+            removed += 1
+            parent = cur.parent
+            if self._below_stop(parent) and parent not in visited:
+                heapq.heappush(heap, (-len(parent.parts), str(parent), parent))
+        return removed
+
+
 def prune_junk_then_empty_dirs(start: Path, stop: Path, bad_words: list[str]):
     """
     From `start` up to (but not including) `stop`, delete known junk files that
     match `bad_words`, then remove empty dirs. Stop when a dir isn't empty.
     """
-    cur = start
-    while cur != stop and cur != cur.parent:
-        # remove junk posters/etc first
-        for child in list(cur.iterdir()):
-            try:
-                if is_ignored_junk(child, bad_words):
-                    child.unlink(missing_ok=True)
-            except OSError:
-                pass
-
-        # try to remove the directory if now empty
-        try:
-            cur.rmdir()  # only succeeds if empty
-            cur = cur.parent
-        except OSError:
-            break  # not empty; stop
\ No newline at end of file
+    pruner = Pruner(stop, bad_words)
+    pruner.touch(start)
+    pruner.run()
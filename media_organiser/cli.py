@@ -1,28 +1,16 @@
 import argparse
-import re
+import dataclasses
+import json
 import sys
-from collections import defaultdict
+import time
+from contextlib import nullcontext, redirect_stdout
 from pathlib import Path
+from typing import Optional
 
-from .stabilize import is_file_size_stable
-from .cleanup import prune_junk_then_empty_dirs
-from .constants import VIDEO_EXTS, IGNORED_PATH_COMPONENTS
-from .naming import (
-    detect_quality, is_tv_episode, _clean_title, guess_movie_name, guess_year_for_movie,
-    normalise_movie_title_for_display, movie_part_suffix, detect_numbered_series, count_distinct_movies,
-)
-from .nfo import (
-    find_nfo,  read_nfo_to_meta, nfo_path_for,
-    write_movie_nfo, write_episode_nfo, merge_first, merge_subtitles
-)
-from .duplicates import (
-    build_library_import_dup_index,
-    is_duplicate_in_dir,
-    quick_fingerprint,
-)
-from .io_ops import do_move_or_copy
-from .sidecars import copy_move_sidecars
-from .posters import carry_poster_with_sieve, parse_range_pair  # optional; default off
+from . import events, fingerprints, iorate, localhash, profiling
+from .constants import STATE_DIR_NAME
+from .io_ops import TRANSFER_MODES
+from .organiser import OrganiseConfig, organise, watch
 
 
 def _make_stdio_encoding_safe() -> None:
@@ -49,226 +37,159 @@ def main():
     ap = argparse.ArgumentParser(description="Organise media into /movies and /tv, copy subs, and emit local NFOs (offline).")
     ap.add_argument("source")
     ap.add_argument("dest", nargs="?", default=None)
-    ap.add_argument("--mode", choices=["move","copy"], default="move")
+    ap.add_argument("--mode", choices=list(TRANSFER_MODES), default="move",
+                    help="move, copy, or leave the import in place and hardlink, reflink or symlink it.")
     ap.add_argument("--dry-run", action="store_true")
-    ap.add_argument("--dupe-mode", choices=["off","name","size","hash"], default="hash")
+    ap.add_argument("--verify", action="store_true",
+                    help="Checksum copied data as it is read and check the copy against it before trusting it.")
+    ap.add_argument("--dupe-mode", choices=["off","name","size","hash","full"], default="hash",
+                    help="full: confirm a hash match by comparing every byte, reading only what it must.")
     ap.add_argument(
         "--no-import-dedupe",
         action="store_true",
         help="Do not scan movies/ and tv/ for duplicates; keep import files even when a matching library copy exists.",
     )
+    ap.add_argument(
+        "--rebuild-index",
+        action="store_true",
+        help="Walk all of movies/ and tv/ instead of revalidating the saved library index.",
+    )
+    ap.add_argument(
+        "--reconsider",
+        action="store_true",
+        help="Look again at import files the ledger says were already decided and have not changed.",
+    )
     # NFO
     ap.add_argument("--emit-nfo", choices=["off","movie","tv","all"], default="all")
     ap.add_argument("--nfo-layout", choices=["same-stem","kodi"], default="same-stem")
     ap.add_argument("--overwrite-nfo", action="store_true")
+    ap.add_argument("--localhash-scheme", choices=localhash.available(), default=localhash.CURRENT.key,
+                    help="Fingerprint recipe for the localhash written into new NFOs.")
     # Posters (optional; default off)
     ap.add_argument("--carry-posters", choices=["off","keep","skip","quarantine"], default="off")
     ap.add_argument("--poster-min-wh", default="600x900")
     ap.add_argument("--poster-aspect", default="0.66-0.75")
     ap.add_argument("--poster-keywords", default="yify,yts,rarbg,ettv,yifytorrent,yify-movie")
+    # Stability gate: one shared wait per run, not one per file
+    ap.add_argument(
+        "--stability",
+        default="size-mtime",
+        help="Comma-separated checks for unfinished uploads: size-mtime, open-writers, min-age.",
+    )
+    ap.add_argument("--stable-interval", type=float, default=1.0,
+                    help="Seconds between the two size/mtime samples (size-mtime).")
+    ap.add_argument("--min-age", type=float, default=0.0,
+                    help="Seconds since last modification before a file counts as finished (min-age).")
+    # Fingerprint cache
+    ap.add_argument("--fingerprint-cache", default=None,
+                    help=f"SQLite fingerprint store (default: DEST/{STATE_DIR_NAME}/{fingerprints.CACHE_NAME}).")
+    ap.add_argument("--no-fingerprint-cache", action="store_true",
+                    help="Read every file to fingerprint it, as if nothing had been seen before.")
+    ap.add_argument("--jobs", type=int, default=4,
+                    help="Worker threads for fingerprinting and NFO writing; placement stays in input order.")
+    # Machine-readable log
+    ap.add_argument("--log-format", choices=["text", "json"], default="text",
+                    help="json also writes one JSON event per decision, with per-stage timings.")
+    ap.add_argument("--log-file", default=None,
+                    help="Where JSON events go (--log-format json); default stdout, with the text log on stderr.")
+    ap.add_argument("--profile", action="store_true",
+                    help="Report where the run spent its time: stages, filesystem calls, bytes, naming regexes, memory.")
+    ap.add_argument("--profile-json", default=None, metavar="PATH",
+                    help="Also write the --profile report to PATH as JSON (implies --profile).")
+    ap.add_argument("--stream", action="store_true",
+                    help="Walk the source a directory at a time and organise as it goes, instead of "
+                         "listing the whole tree first; for inboxes with millions of files.")
+    ap.add_argument("--stream-batch", type=int, default=256,
+                    help="Videos gathered before each streamed batch is organised (--stream).")
+    ap.add_argument("--device-jobs", default="hdd=1,ssd=4,other=2",
+                    help="Concurrent transfers per device class (hdd, ssd, other), e.g. hdd=1,ssd=8; "
+                         "transfers on different devices run side by side. 'off' moves one file at a time.")
+    ap.add_argument("--io-rate", default=None,
+                    help="Cap on the bytes copies may move per second, e.g. 80M (K, M, G are binary units).")
+    ap.add_argument("--io-rate-device", action="append", default=[], metavar="PATH=RATE",
+                    help="Cap for the device holding PATH, on top of --io-rate; repeatable.")
+    ap.add_argument("--io-priority", choices=["off", *iorate.IOPRIO_CLASSES], default="off",
+                    help="I/O scheduling class for the organiser, its worker threads and ffmpeg (Linux).")
+    ap.add_argument("--nice", type=int, default=0,
+                    help="Raise the organiser's nice value (and its workers') by this much.")
+    # Watch mode: stay running and organise new uploads as they land
+    ap.add_argument("--watch", action="store_true",
+                    help="After the first pass, keep running and organise whatever changes under SOURCE.")
+    ap.add_argument("--debounce", type=float, default=5.0,
+                    help="Seconds of quiet that end a burst of changes (--watch).")
+    ap.add_argument("--watch-backend", choices=["auto", "inotify", "poll"], default="auto",
+                    help="inotify on Linux, polling elsewhere or when forced (--watch).")
+    ap.add_argument("--poll-interval", type=float, default=5.0,
+                    help="Seconds between scans for the polling backend (--watch).")
     args = ap.parse_args()
-
-    src_root = Path(args.source).expanduser().resolve()
-    dest_root = Path(args.dest).expanduser().resolve() if args.dest else src_root
-    movies_root = dest_root / "movies"
-    tv_root     = dest_root / "tv"
-    movies_root.mkdir(parents=True, exist_ok=True)
-    tv_root.mkdir(parents=True, exist_ok=True)
-
-    lib_import_index = None
-    if args.dupe_mode != "off" and not args.no_import_dedupe:
-        lib_import_index = build_library_import_dup_index(movies_root, tv_root, args.dupe_mode)
-
-    # Poster sieve config
-    min_w, min_h = map(int, args.poster_min_wh.lower().split("x"))
-    aspect_lo, aspect_hi = parse_range_pair(args.poster_aspect, "-", float)
-    bad_words = [w.strip().lower() for w in args.poster_keywords.split(",") if w.strip()]
-
-    # Track files being processed in this batch to detect duplicates
-    tv_episodes_processing = {}  # (series, season, episode) -> list of paths
-
-    items = list(src_root.rglob("*"))
-
-    # Pre-scan: group videos per directory so we can distinguish a single-movie folder
-    # from a container (several distinct movies, e.g. a "James Bond" folder) and from a
-    # loose numbered series (e.g. "BUZZYBEE-1..13"). Container folders take their title
-    # from each filename; numbered-series folders are routed to /tv as episodes.
-    dir_videos = defaultdict(list)
-    for p in items:
-        if not p.is_file() or p.suffix.lower() not in VIDEO_EXTS:
-            continue
-        if any(part in IGNORED_PATH_COMPONENTS for part in p.parts):
-            continue
-        dir_videos[p.parent].append(p)
-
-    numbered_series = {}    # path -> (series, season, episode)
-    container_dirs = set()  # dirs holding >1 distinct movie -> title from filename
-    for d, vids in dir_videos.items():
-        if count_distinct_movies(vids) > 1:
-            container_dirs.add(d)
-        if d == src_root:
-            continue  # never treat the source root (a dumping ground) as one series
-        ser = detect_numbered_series(vids)
-        if ser:
-            series_name = _clean_title(d.name) or ser["series"]
-            for vp, ep in ser["episodes"].items():
-                numbered_series[vp] = (series_name, 1, ep)
-
-    for path in items:
-        if not path.is_file(): continue
-        if path.suffix.lower() not in VIDEO_EXTS: continue
-        if any(part in IGNORED_PATH_COMPONENTS for part in path.parts):
-            continue
-
-        # skip incomplete uploads (e.g., vsftpd client still writing); skip check in dry-run for speed
-        if not args.dry_run and not is_file_size_stable(path, interval=1.0):
-            print(f"[skip] file not stable or still growing: {path}")
-            continue
-
-        # skip items already in /movies or /tv under dest
-        if dest_root in path.parents and (movies_root in path.parents or tv_root in path.parents):
-            continue
-        # skip obvious samples
-        if re.search(r"(?i)\bsample\b", path.name): continue
-
-        if lib_import_index is not None:
-            lib_match = lib_import_index.find_duplicate(path)
-            if lib_match is not None:
-                print(
-                    f"REMOVED DUPLICATE IMPORT: {path} -> already in library as {lib_match} [{args.dupe_mode}]"
-                )
-                if not args.dry_run:
-                    try:
-                        path.unlink(missing_ok=True)
-                    except OSError as e:
-                        print(f"[warn] could not remove duplicate import {path}: {e}")
-                    if args.mode == "move":
-                        prune_junk_then_empty_dirs(path.parent, src_root, bad_words)
-                continue
-
-        quality = detect_quality(path.name)
-        if path in numbered_series:
-            series_name, forced_season, forced_ep = numbered_series[path]
-            is_tv, info = True, {"series": series_name, "season": forced_season, "ep1": forced_ep, "ep2": None}
-        else:
-            is_tv, info = is_tv_episode(path.name, path)
-
-        if is_tv:
-            series = _clean_title(info["series"])
-
-            s_no = info["season"]
-            e_no = info["ep1"]
-            e2 = info.get("ep2")
-            ep_tag = f"S{s_no:02d}E{e_no:02d}" + (f"-E{e2:02d}" if e2 and e2 != e_no else "")
-            season_folder = "Specials" if s_no == 0 else f"Season {s_no:02d}"
-            season_dir = tv_root / series / season_folder
-            season_dir.mkdir(parents=True, exist_ok=True)
-            out_file = season_dir / f"{series} - {ep_tag} ({quality}){path.suffix.lower()}"
-
-            # Check for duplicates in the same batch; skip second and later copies
-            episode_key = (series.lower(), s_no, e_no)
-            if episode_key in tv_episodes_processing:
-                existing_paths = tv_episodes_processing[episode_key]
-                print(f"[WARNING] Potential duplicate in batch: {path} (same episode as {existing_paths})")
-                tv_episodes_processing[episode_key].append(path)
-                continue
-            tv_episodes_processing[episode_key] = [path]
-
-            if args.dupe_mode != "off":  # noqa
-                dup = is_duplicate_in_dir(path, season_dir, args.dupe_mode)
-                if dup:
-                    print(f"SKIP DUPLICATE: {path} == {dup} [{args.dupe_mode}]")
-                    continue
-
-            # safe_path may rename on collision; everything below must follow the real file
-            out_file = do_move_or_copy(path, out_file, args.mode, args.dry_run, quality)
-            # Read source NFO before moving sidecars (sidecars include .nfo and get moved)
-            src_nfo = find_nfo(path)
-            base_meta_from_src = merge_first({}, read_nfo_to_meta(src_nfo)) if src_nfo else {}
-            subs = copy_move_sidecars(path, out_file, do_move_or_copy, args.mode, args.dry_run)
-
-            if args.emit_nfo in ("tv","all") and not args.dry_run:
-                size, md5 = quick_fingerprint(out_file)
-                computed = {
-                    "scope":"tv",
-                    "showtitle": series,
-                    "season": s_no,
-                    "episode": e_no,
-                    "episode_to": e2,
-                    "title": f"{series} S{s_no:02d}E{e_no:02d}" + (f"-E{e2:02d}" if e2 and e2 != e_no else ""),
-                    "quality": quality,
-                    "extension": out_file.suffix.lstrip(".").lower(),
-                    "size": size,
-                    "uniqueid_localhash": md5,
-                    "filenameandpath": str(out_file),
-                    "originalfilename": path.name,
-                    "sourcepath": str(path),
-                    "subtitles": subs,
-                }
-                base_meta = base_meta_from_src
-                dest_nfo = nfo_path_for(out_file, "tv", args.nfo_layout)
-                if dest_nfo.exists():
-                    base_meta = merge_first(base_meta, read_nfo_to_meta(dest_nfo))
-                if "subtitles" in base_meta or subs:
-                    base_meta["subtitles"] = merge_subtitles(base_meta.get("subtitles"), subs)
-                write_episode_nfo(out_file, computed, base_meta, overwrite=args.overwrite_nfo, layout=args.nfo_layout)
-
-        else:
-            movie_name, used_nfo = guess_movie_name(path, src_root, parent_is_container=path.parent in container_dirs)
-            # Prefer (YYYY) over bare year in title (e.g. Blade Runner 2049)
-            year_guess = guess_year_for_movie(path)
-            part_suffix = movie_part_suffix(path)
-            # Base title without trailing (year)/[quality] so we add them once
-            folder_name = normalise_movie_title_for_display(movie_name)
-            full_name = f"{folder_name} {f'({year_guess}) ' if year_guess else ''}[{quality}]{part_suffix}"
-            out_dir = movies_root / folder_name
-            out_dir.mkdir(parents=True, exist_ok=True)
-            out_file = out_dir / f"{full_name}{path.suffix.lower()}"
-
-            if args.dupe_mode != "off":
-                dup = is_duplicate_in_dir(path, out_dir, args.dupe_mode)
-                if dup:
-                    print(f"SKIP DUPLICATE: {path} == {dup} [{args.dupe_mode}]")
-                    continue
-
-            # safe_path may rename on collision; everything below must follow the real file
-            out_file = do_move_or_copy(path, out_file, args.mode, args.dry_run, quality)
-            # Read source NFO before moving sidecars (sidecars include .nfo and get moved)
-            base_meta_from_src = merge_first({}, read_nfo_to_meta(used_nfo)) if used_nfo else {}
-            subs = copy_move_sidecars(path, out_file, do_move_or_copy, args.mode, args.dry_run)
-
-            # optional: carry posters through sieve
-            if args.carry_posters != "off":
-                carry_poster_with_sieve(
-                    src_context=path, dst_dir=out_dir, policy=args.carry_posters,
-                    min_w=min_w, min_h=min_h, aspect_lo=aspect_lo, aspect_hi=aspect_hi, bad_words=bad_words,
-                    mover=do_move_or_copy, mode=args.mode, dry_run=args.dry_run
-                )
-
-            if args.emit_nfo in ("movie","all") and not args.dry_run:
-                size, md5 = quick_fingerprint(out_file)
-                computed = {
-                    "scope":"movie",
-                    "title": movie_name,
-                    "year": year_guess,
-                    "quality": quality,
-                    "extension": out_file.suffix.lstrip(".").lower(),
-                    "size": size,
-                    "uniqueid_localhash": md5,
-                    "filenameandpath": str(out_file),
-                    "originalfilename": path.name,
-                    "sourcepath": str(path),
-                    "subtitles": subs,
-                }
-                base_meta = base_meta_from_src
-                dest_nfo = nfo_path_for(out_file, "movie", args.nfo_layout)
-                if dest_nfo.exists():
-                    base_meta = merge_first(base_meta, read_nfo_to_meta(dest_nfo))
-                if "subtitles" in base_meta or subs:
-                    base_meta["subtitles"] = merge_subtitles(base_meta.get("subtitles"), subs)
-                write_movie_nfo(out_file, computed, base_meta, overwrite=args.overwrite_nfo, layout=args.nfo_layout)
-
-        if args.mode == "move" and not args.dry_run:
-            prune_junk_then_empty_dirs(path.parent, src_root, bad_words)
-
-    print("Done.")
+    config = OrganiseConfig(**{f.name: getattr(args, f.name) for f in dataclasses.fields(OrganiseConfig)})
+    try:
+        config.validate()
+    except ValueError as e:
+        ap.error(str(e))
+
+    if args.log_file and args.log_format != "json":
+        ap.error("--log-file needs --log-format json")
+
+    try:
+        limiter = iorate.Limiter.from_options(args.io_rate, args.io_rate_device)
+    except ValueError as e:
+        ap.error(str(e))
+    io_class = None if args.io_priority == "off" else args.io_priority
+    # Worker threads and ffmpeg started from here on inherit both settings.
+    lowered = iorate.lower_priority(io_class, args.nice)
+    iorate.set_child_priority(io_class, args.nice)
+    if (io_class or args.nice) and not lowered:
+        print("[warn] could not lower the organiser's priority here")
+
+    src_root, dest_root = config.roots()
+    event_log = _open_event_log(args)
+    # JSON events own stdout unless they have a file; people read stderr meanwhile.
+    with redirect_stdout(sys.stderr) if event_log is not None and not args.log_file else nullcontext():
+        previous_limiter = iorate.install(limiter)
+        previous_events = events.install(event_log)
+        profile = profiling.Profile() if args.profile or args.profile_json else None
+        previous_profile = profiling.install(profile)
+        started = time.monotonic()
+        try:
+            with profile.instrument() if profile is not None else nullcontext():
+                if args.watch:
+                    watch(config)
+                else:
+                    organise(config)
+            if limiter is not None:
+                print(f"IO RATE: transfers held back {limiter.waited():.1f}s under the cap")
+            if profile is not None:
+                _report_profile(profile, args.profile_json)
+        finally:
+            profiling.install(previous_profile)
+            iorate.install(previous_limiter)
+            events.install(previous_events)
+            if event_log is not None:
+                event_log.close(source=str(src_root), dest=str(dest_root), mode=args.mode,
+                                dupe_mode=args.dupe_mode, dry_run=args.dry_run,
+                                elapsed=round(time.monotonic() - started, 3))
+        print("Done.")
+
+
+def _report_profile(profile: profiling.Profile, json_path: Optional[str]) -> None:
+    report = profile.report()
+    for line in profiling.format_report(report):
+        print(line)
+    if json_path:
+        path = Path(json_path).expanduser()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        except OSError as e:
+            print(f"[warn] could not write profile {path}: {e}")
+
+
+def _open_event_log(args) -> Optional[events.EventLog]:
+    if args.log_format != "json":
+        return None
+    if not args.log_file:
+        return events.EventLog(sys.stdout)
+    path = Path(args.log_file).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return events.EventLog(open(path, "a", encoding="utf-8"), owns=True)
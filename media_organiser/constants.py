@@ -25,6 +25,8 @@ RESOLUTION_WITH_BRACKETS_PATTERN = re.compile(
 
 # Year may be single (YYYY) or range (YYYY-YYYY) e.g. Lord of the Rings Trilogy (2001-2003)
 MOVIE_DIR_RE       = re.compile(r"(?i)^(?P<title>.+?)\s*[\(\[\{]?(?P<year>(?:19|20)\d{2}(?:\s*-\s*(?:19|20)\d{2})?)[\)\]\}]?$")
+# Per-library state (journal, caches) lives in this folder beside movies/ and tv/.
+STATE_DIR_NAME     = ".media_organiser"
 GENERIC_DIRS       = {"subs", "subtitles", "other", "cd 1", "cd 2", "sample"}
 IGNORED_PATH_COMPONENTS = {".AppleDouble", "__MACOSX"}
 MOVIE_PART_RE      = re.compile(r"(?i)(?:cd\s*(\d+)|part\s*(\d+)|pt\s*(\d+))")
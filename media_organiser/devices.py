@@ -0,0 +1,176 @@
+"""Per-device lanes for the byte-moving part of an organise run.
+
+Copying two files at once from the same spinning disk makes both slower than
+copying them one after the other: the heads seek between them. Copying from
+two different disks at once costs nothing. :class:`DeviceScheduler` runs each
+transfer once every device it touches has a free slot, so a batch spread over
+several disks keeps one stream going per spindle while transfers that share a
+disk queue behind each other.
+
+How many slots a device has depends on its class, read from sysfs:
+``hdd`` (rotational) defaults to one stream, ``ssd`` to four, and ``other`` —
+network filesystems, tmpfs, anything without a block device of its own — to
+two. ``--device-jobs hdd=1,ssd=8`` overrides them.
+
+Transfers can also *hold* keys (a target folder, a file size); :meth:`settle`
+waits until nothing in flight holds any of a set of keys, which is how the
+organiser keeps decisions that depend on an earlier file's transfer — duplicate
+checks, collision suffixes — exactly as in a serial run.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+DEVICE_CLASSES = ("hdd", "ssd", "other")
+DEFAULT_LIMITS = {"hdd": 1, "ssd": 4, "other": 2}
+
+_SYSFS_BLOCK = Path("/sys/dev/block")
+
+
+def parse_device_jobs(text: str) -> Dict[str, int]:
+    """``"hdd=1,ssd=8"`` as per-class stream limits, on top of :data:`DEFAULT_LIMITS`."""
+    limits = dict(DEFAULT_LIMITS)
+    for part in filter(None, (s.strip() for s in text.split(","))):
+        cls, sep, value = part.partition("=")
+        cls = cls.strip().lower()
+        if not sep or cls not in DEVICE_CLASSES:
+            raise ValueError(f"expected CLASS=N with CLASS one of {', '.join(DEVICE_CLASSES)}, not {part!r}")
+        try:
+            n = int(value)
+        except ValueError:
+            raise ValueError(f"not a stream count: {part!r}") from None
+        if n < 1:
+            raise ValueError(f"stream count must be at least 1: {part!r}")
+        limits[cls] = n
+    return limits
+
+
+@lru_cache(maxsize=None)
+def device_class(dev: int, sysfs: Path = _SYSFS_BLOCK) -> str:
+    """``hdd``, ``ssd`` or ``other`` for the device number ``dev`` (an ``st_dev``)."""
+    major, minor = os.major(dev), os.minor(dev)
+    if major == 0:
+        # Anonymous devices: NFS, tmpfs, overlay, btrfs subvolumes.
+        return "other"
+    node = sysfs / f"{major}:{minor}"
+    # A partition keeps its queue settings on the whole disk, one level up.
+    for queue in (node / "queue" / "rotational", node / ".." / "queue" / "rotational"):
+        try:
+            return "hdd" if queue.read_text().strip() == "1" else "ssd"
+        except OSError:
+            continue
+    return "other"
+
+
+def device_of(p: Path) -> int:
+    """``st_dev`` of ``p``, or of its nearest existing ancestor when it does not exist yet."""
+    for candidate in (p, *p.parents):
+        try:
+            return os.stat(candidate).st_dev
+        except OSError:
+            continue
+    raise FileNotFoundError(p)
+
+
+class _Task:
+    __slots__ = ("devices", "fn", "holds", "future")
+
+    def __init__(self, devices: frozenset, fn: Callable, holds: tuple, future: Future) -> None:
+        self.devices = devices
+        self.fn = fn
+        self.holds = holds
+        self.future = future
+
+
+class DeviceScheduler:
+    """
+    Run submitted work as soon as every device it names has a free slot.
+
+    ``workers`` threads run it; by default one per slot of each class, enough
+    for a device of every class to run at its limit at once.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None,
+                 classify: Callable[[int], str] = device_class, workers: Optional[int] = None) -> None:
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        if workers is None:
+            workers = sum(self.limits.values())
+        self._classify = classify
+        self._cond = threading.Condition()
+        self._waiting: deque[_Task] = deque()
+        self._busy: Counter = Counter()
+        self._holds: Counter = Counter()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="organise-lane")
+        self.peak: Counter = Counter()     # device -> most streams it ever ran at once
+        self.ran: Counter = Counter()      # device -> transfers it took part in
+
+    def limit(self, dev: int) -> int:
+        return self.limits.get(self._classify(dev), 1)
+
+    def submit(self, devices: Iterable[int], fn: Callable[[], object], holds: Iterable[Hashable] = ()) -> Future:
+        """
+        Queue ``fn`` for the devices it reads and writes; returns its future.
+
+        Work that shares a device starts in submission order. ``holds`` are in
+        force from now until ``fn`` has finished.
+        """
+        task = _Task(frozenset(devices), fn, tuple(holds), Future())
+        with self._cond:
+            self._holds.update(task.holds)
+            self._waiting.append(task)
+            self._dispatch()
+        return task.future
+
+    def settle(self, holds: Iterable[Hashable]) -> None:
+        """Wait until nothing queued or running holds any of ``holds``."""
+        holds = tuple(holds)
+        with self._cond:
+            self._cond.wait_for(lambda: not any(self._holds[h] for h in holds))
+
+    def close(self) -> None:
+        """Wait for everything submitted, then stop the workers."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._waiting and not +self._busy)
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "DeviceScheduler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _dispatch(self) -> None:
+        # Called with the condition held. A device an earlier task is waiting
+        # for is closed to later ones, so nothing overtakes on a shared disk.
+        blocked: set = set()
+        for task in list(self._waiting):
+            if task.devices & blocked or any(self._busy[d] >= self.limit(d) for d in task.devices):
+                blocked |= task.devices
+                continue
+            self._waiting.remove(task)
+            for d in task.devices:
+                self._busy[d] += 1
+                self.ran[d] += 1
+                self.peak[d] = max(self.peak[d], self._busy[d])
+            self._pool.submit(self._run, task)
+
+    def _run(self, task: _Task) -> None:
+        try:
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn())
+                except BaseException as e:  # handed to whoever waits on the future
+                    task.future.set_exception(e)
+        finally:
+            with self._cond:
+                for d in task.devices:
+                    self._busy[d] -= 1
+                self._holds.subtract(task.holds)
+                self._dispatch()
+                self._cond.notify_all()
@@ -1,8 +1,16 @@
+from array import array
+from bisect import bisect_left
 from pathlib import Path
-from typing import Dict, Iterator, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import hashlib
+import json
+import os
+import threading
+import zlib
 
+from . import fingerprints, profiling
+from . import snapshot
 from .constants import RESOLUTION_PATTERN, VIDEO_EXTS
 from .naming import clean_name
 
@@ -16,30 +24,471 @@ def iter_library_video_files(movies_root: Path, tv_root: Path) -> Iterator[Path]
                 yield p
 
 
+INDEX_NAME = "library_index.json"
+_INDEX_VERSION = 2
+
+# One indexed library video: (size, mtime_ns, md5 digest or None, key of its normalised stem).
+_Record = Tuple[int, int, Optional[bytes], int]
+
+_UNLISTED = -1     # mtime of a folder never listed: known only as the way to another
+_GONE = 1          # row flags: discarded, kept in place until the next compaction
+_HAS_DIGEST = 2
+_DIGEST_SIZE = 16
+
+
+def _norm_key(norm: str) -> int:
+    return zlib.crc32(norm.encode("utf-8", "surrogatepass"))
+
+
 class LibraryImportDupIndex:
     """
     Precomputed index of video files already under movies/ and tv/ for matching imports.
     Rules match is_duplicate_in_dir per --dupe-mode: name (normalized stem), size (file size only),
-    hash (size + sampled MD5 fingerprint).
+    hash (size + sampled MD5 fingerprint), full (a hash match, then confirmed by :class:`DupeLadder`).
+
+    The index can be saved between runs (:meth:`save`) and brought up to date
+    cheaply on load: a directory whose mtime has not moved still holds the same
+    names, so only directories that changed are listed again. Files the
+    organiser itself places are recorded with :meth:`add` as they land, so the
+    next run does not even have to revisit their folder. A file rewritten in
+    place without its directory changing is not noticed; ``--rebuild-index``
+    forces a full walk.
+
+    In memory it is a table of rows rather than an object per file: sizes,
+    mtimes and digests in arrays, every file and folder name encoded back to
+    back in one buffer, each file pointing at its folder's row and each folder
+    at its parent's. Lookups bisect orderings of the rows sorted by folder and
+    name, or by the mode's key; rows recorded since the last sort wait in small
+    dicts, and discarded ones are flagged until there are enough to sort again.
+    Half a million files in a quarter of a million folders take under 60 MB.
     """
 
-    __slots__ = ("mode", "_by_name", "_by_size", "_by_size_fp")
+    __slots__ = (
+        "mode", "base", "roots", "dirty", "_root_dirs", "_live", "_dead", "_names",
+        "_d_parent", "_d_start", "_d_len", "_d_mtime", "_d_gone",
+        "_f_dir", "_f_start", "_f_len", "_f_size", "_f_mtime", "_f_norm", "_f_digest", "_f_flags",
+        "_dirs_by_parent", "_files_by_dir", "_files_by_key", "_fresh_dirs", "_fresh_files", "_fresh_keys",
+    )
 
-    def __init__(
-        self,
-        mode: str,
-        by_name: Dict[str, Path],
-        by_size: Dict[int, Path],
-        by_size_fp: Dict[Tuple[int, str], Path],
-    ) -> None:
+    def __init__(self, mode: str, base: Path, roots: Tuple[Path, ...]) -> None:
         self.mode = mode
-        self._by_name = by_name
-        self._by_size = by_size
-        self._by_size_fp = by_size_fp
+        self.base = base
+        self.roots = roots
+        self._clear()
+        # Whether anything changed since the index was loaded or saved.
+        self.dirty = True
+
+    def _clear(self) -> None:
+        self._reset_rows()
+        self._root_dirs = [
+            (r, self._new_dir(-1, os.fsencode(os.path.relpath(r, self.base)))) for r in dict.fromkeys(self.roots)
+        ]
+
+    def _reset_rows(self) -> None:
+        self._live = 0
+        self._dead = 0
+        self._names = bytearray()
+        self._d_parent = array("i")
+        self._d_start = array("I")
+        self._d_len = array("H")
+        self._d_mtime = array("q")
+        self._d_gone = bytearray()
+        self._f_dir = array("i")
+        self._f_start = array("I")
+        self._f_len = array("H")
+        self._f_size = array("q")
+        self._f_mtime = array("q")
+        self._f_norm = array("I")
+        self._f_digest = bytearray()
+        self._f_flags = bytearray()
+        self._dirs_by_parent = array("i")
+        self._files_by_dir = array("i")
+        self._files_by_key = array("i")
+        # Rows added since the orderings were sorted: (parent or folder row, name) -> row, and key -> rows.
+        self._fresh_dirs: Dict[Tuple[int, bytes], int] = {}
+        self._fresh_files: Dict[Tuple[int, bytes], int] = {}
+        self._fresh_keys: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return self._live
+
+    # -- rows --------------------------------------------------------------
+
+    def _name(self, start: int, length: int) -> bytes:
+        return bytes(self._names[start:start + length])
+
+    def _dir_name(self, d: int) -> bytes:
+        return self._name(self._d_start[d], self._d_len[d])
+
+    def _file_name(self, s: int) -> bytes:
+        return self._name(self._f_start[s], self._f_len[s])
+
+    def _digest(self, s: int) -> Optional[bytes]:
+        if not self._f_flags[s] & _HAS_DIGEST:
+            return None
+        return bytes(self._f_digest[s * _DIGEST_SIZE:(s + 1) * _DIGEST_SIZE])
+
+    def _dir_path(self, d: int) -> Path:
+        parts = []
+        while d >= 0:
+            parts.append(os.fsdecode(self._dir_name(d)))
+            d = self._d_parent[d]
+        return self.base.joinpath(*reversed(parts))
+
+    def _path(self, s: int) -> Path:
+        return self._dir_path(self._f_dir[s]) / os.fsdecode(self._file_name(s))
+
+    def _new_dir(self, parent: int, name: bytes, fresh: bool = False) -> int:
+        d = len(self._d_parent)
+        self._d_parent.append(parent)
+        self._d_start.append(len(self._names))
+        self._d_len.append(len(name))
+        self._names += name
+        self._d_mtime.append(_UNLISTED)
+        self._d_gone.append(0)
+        if fresh:
+            self._fresh_dirs[(parent, name)] = d
+        return d
+
+    def _new_file(self, d: int, name: bytes, rec: _Record, fresh: bool = False) -> int:
+        s = len(self._f_dir)
+        size, mtime, digest, norm = rec
+        self._f_dir.append(d)
+        self._f_start.append(len(self._names))
+        self._f_len.append(len(name))
+        self._names += name
+        self._f_size.append(size)
+        self._f_mtime.append(mtime)
+        self._f_norm.append(norm)
+        self._f_digest += digest if digest is not None else bytes(_DIGEST_SIZE)
+        self._f_flags.append(_HAS_DIGEST if digest is not None else 0)
+        self._live += 1
+        self.dirty = True
+        if fresh:
+            self._fresh_files[(d, name)] = s
+            if self._indexed(s):
+                self._fresh_keys.setdefault(self._key(s), []).append(s)
+        return s
+
+    def _drop_file(self, s: int) -> None:
+        # Only the flag changes: the row's sort keys must stay as they were sorted.
+        self._f_flags[s] |= _GONE
+        self._live -= 1
+        self._dead += 1
+        self.dirty = True
+        where = (self._f_dir[s], self._file_name(s))
+        if self._fresh_files.get(where) == s:
+            del self._fresh_files[where]
+            holders = self._fresh_keys.get(self._key(s))
+            if holders is not None and s in holders:
+                holders.remove(s)
+                if not holders:
+                    del self._fresh_keys[self._key(s)]
+
+    def _drop_dir(self, d: int) -> None:
+        for s in self._files_in(d):
+            self._drop_file(s)
+        self._d_gone[d] = 1
+        self._dead += 1
+        where = (self._d_parent[d], self._dir_name(d))
+        if self._fresh_dirs.get(where) == d:
+            del self._fresh_dirs[where]
+
+    # -- orderings ---------------------------------------------------------
+
+    def _dir_place(self, d: int) -> int:
+        start = self._d_start[d]
+        return (self._d_parent[d] << 32) | zlib.crc32(self._names[start:start + self._d_len[d]])
+
+    def _file_place(self, s: int) -> int:
+        start = self._f_start[s]
+        return (self._f_dir[s] << 32) | zlib.crc32(self._names[start:start + self._f_len[s]])
+
+    def _key(self, s: int) -> int:
+        return self._f_norm[s] if self.mode == "name" else self._f_size[s]
+
+    def _indexed(self, s: int) -> bool:
+        if self.mode == "name":
+            return True
+        if is_content_empty(self._f_size[s]):
+            # Size- and content-based matching says nothing about an empty file; never index one.
+            return False
+        return self.mode not in _DIGEST_MODES or bool(self._f_flags[s] & _HAS_DIGEST)
+
+    @staticmethod
+    def _range(order: array, lo: int, hi: int, place) -> array:
+        start = bisect_left(order, lo, key=place)
+        return order[start:bisect_left(order, hi, start, key=place)]
+
+    def _reindex(self) -> None:
+        """Drop discarded rows and sort every row into the orderings, emptying the fresh dicts."""
+        if not self._dead and (len(self._dirs_by_parent), len(self._files_by_dir)) == (
+            len(self._d_parent), len(self._f_dir)
+        ):
+            return  # already sorted
+        if self._dead:
+            self._compact()
+        self._dirs_by_parent = array("i", sorted(range(len(self._d_parent)), key=self._dir_place))
+        self._files_by_dir = array("i", sorted(range(len(self._f_dir)), key=self._file_place))
+        self._files_by_key = array(
+            "i", sorted((s for s in range(len(self._f_dir)) if self._indexed(s)), key=self._key)
+        )
+        self._fresh_dirs, self._fresh_files, self._fresh_keys = {}, {}, {}
+
+    def _compact(self) -> None:
+        # A parent's row always comes before its children's, so one pass renumbers both.
+        old = (self._names, self._d_parent, self._d_start, self._d_len, self._d_mtime, self._d_gone,
+               self._f_dir, self._f_start, self._f_len, self._f_size, self._f_mtime, self._f_norm,
+               self._f_digest, self._f_flags)
+        names, d_parent, d_start, d_len, d_mtime, d_gone = old[:6]
+        f_dir, f_start, f_len, f_size, f_mtime, f_norm, f_digest, f_flags = old[6:]
+        dirty = self.dirty
+        self._reset_rows()
+        renumbered = array("i", [-1]) * len(d_parent)
+        for d in range(len(d_parent)):
+            parent = d_parent[d]
+            if d_gone[d] or (parent >= 0 and renumbered[parent] < 0):
+                continue
+            renumbered[d] = self._new_dir(renumbered[parent] if parent >= 0 else parent,
+                                          bytes(names[d_start[d]:d_start[d] + d_len[d]]))
+            self._d_mtime[renumbered[d]] = d_mtime[d]
+        for s in range(len(f_dir)):
+            if f_flags[s] & _GONE or renumbered[f_dir[s]] < 0:
+                continue
+            digest = bytes(f_digest[s * _DIGEST_SIZE:(s + 1) * _DIGEST_SIZE]) if f_flags[s] & _HAS_DIGEST else None
+            self._new_file(renumbered[f_dir[s]], bytes(names[f_start[s]:f_start[s] + f_len[s]]),
+                           (f_size[s], f_mtime[s], digest, f_norm[s]))
+        self._root_dirs = [(r, renumbered[d]) for r, d in self._root_dirs]
+        self.dirty = dirty
+
+    # -- finding rows ------------------------------------------------------
+
+    def _child(self, d: int, name: bytes) -> Optional[int]:
+        found = self._fresh_dirs.get((d, name))
+        if found is not None:
+            return found
+        place = (d << 32) | zlib.crc32(name)
+        for c in self._range(self._dirs_by_parent, place, place + 1, self._dir_place):
+            if not self._d_gone[c] and self._dir_name(c) == name:
+                return c
+        return None
+
+    def _children(self, d: int) -> List[int]:
+        rows = [c for c in self._range(self._dirs_by_parent, d << 32, (d + 1) << 32, self._dir_place)
+                if not self._d_gone[c]]
+        return rows + [c for (parent, _name), c in self._fresh_dirs.items() if parent == d]
+
+    def _file(self, d: int, name: bytes) -> Optional[int]:
+        found = self._fresh_files.get((d, name))
+        if found is not None:
+            return found
+        place = (d << 32) | zlib.crc32(name)
+        for s in self._range(self._files_by_dir, place, place + 1, self._file_place):
+            if not self._f_flags[s] & _GONE and self._file_name(s) == name:
+                return s
+        return None
+
+    def _files_in(self, d: int) -> List[int]:
+        rows = [s for s in self._range(self._files_by_dir, d << 32, (d + 1) << 32, self._file_place)
+                if not self._f_flags[s] & _GONE]
+        return rows + [s for (folder, _name), s in self._fresh_files.items() if folder == d]
+
+    def _holders(self, key: int) -> List[int]:
+        """Rows indexed under ``key``, oldest first."""
+        rows = [s for s in self._range(self._files_by_key, key, key + 1, self._key)
+                if not self._f_flags[s] & _GONE]
+        return rows + self._fresh_keys.get(key, [])
+
+    def _dir_for(self, d: Path, create: bool = False) -> Optional[int]:
+        """The row of library folder ``d``, optionally adding it; None outside the roots."""
+        for root, row in self._root_dirs:
+            try:
+                parts = d.relative_to(root).parts
+            except ValueError:
+                continue
+            for part in parts:
+                name = os.fsencode(part)
+                child = self._child(row, name)
+                if child is None:
+                    if not create:
+                        return None
+                    child = self._new_dir(row, name, fresh=True)
+                row = child
+            return row
+        return None
+
+    # -- keeping it current ------------------------------------------------
+
+    def _record_for(self, p: Path, st: os.stat_result, previous: Optional[int] = None) -> Optional[_Record]:
+        digest = None
+        if previous is not None and (self._f_size[previous], self._f_mtime[previous]) == (st.st_size, st.st_mtime_ns):
+            digest = self._digest(previous)
+        if digest is None and self.mode in _DIGEST_MODES and not is_content_empty(st.st_size):
+            try:
+                digest = bytes.fromhex(quick_fingerprint(p)[1])
+            except OSError:
+                return None
+        # The same path means the same name, so its stem need not be normalised again.
+        norm = self._f_norm[previous] if previous is not None else _norm_key(normalized_stem_ignore_quality(p))
+        return st.st_size, st.st_mtime_ns, digest, norm
+
+    def add(self, p: Path) -> None:
+        """Record a video the organiser just placed in the library."""
+        if p.suffix.lower() not in VIDEO_EXTS:
+            return
+        try:
+            st = p.stat()
+        except OSError:
+            return
+        d = self._dir_for(p.parent, create=True)
+        if d is None:
+            return
+        name = os.fsencode(p.name)
+        previous = self._file(d, name)
+        rec = self._record_for(p, st, previous)
+        if previous is not None:
+            self._drop_file(previous)
+        if rec is not None:
+            self._new_file(d, name, rec, fresh=True)
+        # The organiser's own write is why the folder's mtime moved; recording
+        # the new value spares the next run from listing it again.
+        try:
+            self._d_mtime[d] = p.parent.stat().st_mtime_ns
+        except OSError:
+            pass
+        if len(self._fresh_files) + self._dead > 1024 + self._live // 8:
+            self._reindex()
+
+    def discard(self, p: Path) -> None:
+        """Forget a library video that was moved away or removed."""
+        d = self._dir_for(p.parent)
+        s = self._file(d, os.fsencode(p.name)) if d is not None else None
+        if s is not None:
+            self._drop_file(s)
+
+    def refresh(self) -> None:
+        """
+        Bring the index up to date with the disk.
+
+        Costs one ``stat`` per directory; only directories whose mtime moved
+        are listed and their new or changed videos examined.
+        """
+        self._reindex()
+        known_dirs, known_files = len(self._d_parent), len(self._f_dir)
+        seen = bytearray(known_dirs)
+        stack = []
+        for root, row in self._root_dirs:
+            seen[row] = 1
+            if root.is_dir():
+                stack.append(row)
+            else:
+                for s in self._files_in(row):
+                    self._drop_file(s)
+                self._d_mtime[row] = _UNLISTED
+        while stack:
+            d = stack.pop()
+            path = self._dir_path(d)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if d < known_dirs:
+                seen[d] = 1
+            if self._d_mtime[d] == mtime:
+                stack.extend(self._children(d))
+                continue
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            subdirs = {self._dir_name(c): c for c in self._children(d)}
+            present = {self._file_name(s): s for s in self._files_in(d)}
+            for entry in entries:
+                name = os.fsencode(entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        child = subdirs.get(name)
+                        stack.append(child if child is not None else self._new_dir(d, name))
+                        continue
+                    if not entry.is_file() or os.path.splitext(entry.name)[1].lower() not in VIDEO_EXTS:
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                previous = present.pop(name, None)
+                if previous is not None and (self._f_size[previous], self._f_mtime[previous]) == (
+                    st.st_size, st.st_mtime_ns
+                ) and (
+                    self._f_flags[previous] & _HAS_DIGEST or self.mode not in _DIGEST_MODES
+                    or is_content_empty(st.st_size)
+                ):
+                    continue
+                rec = self._record_for(Path(entry.path), st, previous)
+                if previous is not None:
+                    self._drop_file(previous)
+                if rec is not None:
+                    self._new_file(d, name, rec)
+            for s in present.values():
+                self._drop_file(s)
+            self._d_mtime[d] = mtime
+            self.dirty = True
+
+        # Folders not reached are gone; their rows (and their children's) go too.
+        for d in range(known_dirs):
+            if not seen[d] and not self._d_gone[d]:
+                self._drop_dir(d)
+
+        if self.mode in _DIGEST_MODES:
+            # Entries carried over from a name- or size-mode run have no digest yet.
+            for s in range(len(self._f_dir)):
+                if self._f_flags[s] & (_GONE | _HAS_DIGEST) or is_content_empty(self._f_size[s]):
+                    continue
+                p = self._path(s)
+                try:
+                    fresh = self._record_for(p, p.stat(), s)
+                except OSError:
+                    fresh = None
+                d, name = self._f_dir[s], self._file_name(s)
+                self._drop_file(s)
+                if fresh is not None:
+                    self._new_file(d, name, fresh)
+
+        if self._dead or len(self._d_parent) > known_dirs or len(self._f_dir) > known_files:
+            self._reindex()
+
+    # -- matching ----------------------------------------------------------
+
+    def _lookup(self, key: int, same=None, confirmed=None) -> Optional[Path]:
+        """
+        The first library file indexed under ``key`` (and passing ``same``), provided it is still there.
+
+        A long-running watcher does not re-walk the library between batches,
+        so a match is confirmed with one ``stat`` before an import is deleted
+        on its strength; an entry that vanished or changed size is dropped and
+        the next holder of the key, if any, is tried. So is one that is there
+        but ``confirmed(path)`` turns down.
+        """
+        for s in self._holders(key):
+            if same is not None and not same(s):
+                continue
+            p = self._path(s)
+            try:
+                if p.stat().st_size == self._f_size[s]:
+                    if confirmed is None or confirmed(p):
+                        return p
+                    continue
+            except OSError:
+                pass
+            self._drop_file(s)
+        return None
 
     def find_duplicate(self, candidate: Path) -> Optional[Path]:
         if self.mode == "name":
-            return self._by_name.get(normalized_stem_ignore_quality(candidate))
+            norm = normalized_stem_ignore_quality(candidate)
+            return self._lookup(
+                _norm_key(norm),
+                lambda s: normalized_stem_ignore_quality(Path(os.fsdecode(self._file_name(s)))) == norm,
+            )
         try:
             cand_size = candidate.stat().st_size
         except OSError:
@@ -47,40 +496,116 @@ class LibraryImportDupIndex:
         if is_content_empty(cand_size):
             return None
         if self.mode == "size":
-            return self._by_size.get(cand_size)
+            return self._lookup(cand_size)
+        if not self._holders(cand_size):
+            # Nothing in the library is this size; no need to read the candidate.
+            return None
         try:
             cand_fp = quick_fingerprint(candidate)
         except OSError:
             return None
-        return self._by_size_fp.get((cand_size, cand_fp[1]))
+        digest = bytes.fromhex(cand_fp[1])
+        # In full mode every holder that shares the fingerprint gets its byte-for-byte check.
+        return self._lookup(cand_size, lambda s: self._digest(s) == digest,
+                            (lambda hit: confirm(candidate, hit)) if self.mode == "full" else None)
 
+    # -- persistence -------------------------------------------------------
 
-def build_library_import_dup_index(movies_root: Path, tv_root: Path, mode: str) -> Optional[LibraryImportDupIndex]:
+    def save(self, path: Path) -> None:
+        """Write the index atomically, so a killed run leaves the previous one intact."""
+        rel_dirs: List[str] = []
+        for d in range(len(self._d_parent)):
+            name = os.fsdecode(self._dir_name(d))
+            parent = self._d_parent[d]
+            rel_dirs.append(os.path.join(rel_dirs[parent], name) if parent >= 0 else name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        # Written a row at a time rather than built as one dict first.
+        with tmp.open("w", encoding="utf-8") as fh:
+            fh.write(f'{{"version":{_INDEX_VERSION},"base":{json.dumps(str(self.base), ensure_ascii=False)},"dirs":{{')
+            sep = ""
+            for d, rel in enumerate(rel_dirs):
+                if not self._d_gone[d]:
+                    fh.write(f"{sep}{json.dumps(rel, ensure_ascii=False)}:{self._d_mtime[d]}")
+                    sep = ","
+            fh.write('},"files":{')
+            sep = ""
+            for s in range(len(self._f_dir)):
+                if self._f_flags[s] & _GONE:
+                    continue
+                rel = os.path.join(rel_dirs[self._f_dir[s]], os.fsdecode(self._file_name(s)))
+                digest = self._digest(s)
+                row = [self._f_size[s], self._f_mtime[s], digest.hex() if digest is not None else None, self._f_norm[s]]
+                fh.write(f"{sep}{json.dumps(rel, ensure_ascii=False)}:{json.dumps(row)}")
+                sep = ","
+            fh.write("}}")
+        tmp.replace(path)
+        self.dirty = False
+
+    def _load(self, path: Path) -> bool:
+        try:
+            with path.open("r", encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError):
+            return False
+        # Version 1 kept each file's normalised stem rather than its key.
+        if not isinstance(payload, dict) or payload.get("version") not in (1, _INDEX_VERSION):
+            return False
+        if payload.get("base") != str(self.base):
+            return False
+        rows = {os.path.relpath(r, self.base): d for r, d in self._root_dirs}
+
+        def dir_row(rel: str) -> Optional[int]:
+            d = rows.get(rel)
+            if d is None and rel not in ("", os.curdir):
+                parent = dir_row(os.path.dirname(rel) or os.curdir)
+                if parent is not None:
+                    d = rows[rel] = self._new_dir(parent, os.fsencode(os.path.basename(rel)))
+            return d
+
+        try:
+            for rel, mtime in payload["dirs"].items():
+                d = dir_row(str(rel))
+                if d is not None:
+                    self._d_mtime[d] = int(mtime)
+            for rel, (size, mtime, digest, norm) in sorted(payload["files"].items()):
+                d = dir_row(os.path.dirname(rel) or os.curdir)
+                if d is None:
+                    continue
+                norm = _norm_key(str(norm)) if payload["version"] == 1 else int(norm)
+                rec = (int(size), int(mtime), bytes.fromhex(digest) if digest else None, norm)
+                self._new_file(d, os.fsencode(os.path.basename(rel)), rec)
+        except (KeyError, TypeError, ValueError, OverflowError):
+            self._clear()
+            return False
+        self._reindex()
+        self.dirty = False
+        return True
+
+
+def build_library_import_dup_index(
+    movies_root: Path,
+    tv_root: Path,
+    mode: str,
+    state_path: Optional[Path] = None,
+    rebuild: bool = False,
+) -> Optional[LibraryImportDupIndex]:
+    """
+    Index the library for ``mode``.
+
+    With ``state_path`` the index saved by an earlier run is loaded and
+    revalidated from directory mtimes instead of walking every file; pass
+    ``rebuild`` to ignore it. Callers that want the result kept must
+    :meth:`~LibraryImportDupIndex.save` it themselves.
+    """
     if mode == "off":
         return None
-    by_name: Dict[str, Path] = {}
-    by_size: Dict[int, Path] = {}
-    by_size_fp: Dict[Tuple[int, str], Path] = {}
-    for p in iter_library_video_files(movies_root, tv_root):
-        try:
-            norm = normalized_stem_ignore_quality(p)
-            sz = p.stat().st_size
-        except (OSError, FileNotFoundError):
-            continue
-        if mode == "name":
-            by_name.setdefault(norm, p)
-        elif is_content_empty(sz):
-            # Size- and content-based matching says nothing about an empty file; never index one.
-            continue
-        elif mode == "size":
-            by_size.setdefault(sz, p)
-        elif mode == "hash":
-            try:
-                fp = quick_fingerprint(p)
-            except OSError:
-                continue
-            by_size_fp.setdefault((sz, fp[1]), p)
-    return LibraryImportDupIndex(mode, by_name, by_size, by_size_fp)
+    base = Path(os.path.commonpath([movies_root, tv_root]))
+    index = LibraryImportDupIndex(mode, base, (movies_root, tv_root))
+    if state_path is not None and not rebuild:
+        index._load(state_path)
+    index.refresh()
+    return index
 
 def is_content_empty(size: int) -> bool:
     """
@@ -100,7 +625,40 @@ def normalized_stem_ignore_quality(p: Path) -> str:
     s = RESOLUTION_PATTERN.sub("", s)
     return s.strip()
 
-def quick_fingerprint(p: Path, sample_bytes: int = 1<<20) -> tuple[int, str]:
+FINGERPRINT_SAMPLE = 1 << 20
+
+# Modes whose library index keeps a fingerprint per file.
+_DIGEST_MODES = ("hash", "full")
+
+
+def _cached(p: Path, scheme: str, compute) -> tuple[int, str]:
+    cache = fingerprints.active()
+    if cache is not None:
+        return cache.fingerprint(p, scheme, compute)
+    return compute(p)
+
+
+def quick_fingerprint(p: Path, sample_bytes: int = FINGERPRINT_SAMPLE) -> tuple[int, str]:
+    """
+    ``(size, md5 of the first and last sample_bytes)``.
+
+    Goes through the installed :mod:`~media_organiser.fingerprints` cache when
+    there is one, so an unchanged file is read at most once across runs.
+    """
+    return _cached(p, f"md5-ht-{sample_bytes}", lambda q: _read_fingerprint(q, sample_bytes))
+
+
+def remember_fingerprint(p: Path, fp: tuple[int, str], sample_bytes: int = FINGERPRINT_SAMPLE) -> None:
+    """Seed the installed cache with a fingerprint of ``p`` computed without reading it."""
+    cache = fingerprints.active()
+    if cache is not None:
+        try:
+            cache.store(p, f"md5-ht-{sample_bytes}", fp[1])
+        except OSError:
+            pass
+
+
+def _read_fingerprint(p: Path, sample_bytes: int) -> tuple[int, str]:
     size = p.stat().st_size
     h = hashlib.md5()
     with p.open("rb") as f:
@@ -110,14 +668,342 @@ def quick_fingerprint(p: Path, sample_bytes: int = 1<<20) -> tuple[int, str]:
             h.update(f.read(sample_bytes))
             f.seek(max(0, size - sample_bytes))
             h.update(f.read(sample_bytes))
+    profiling.read("fingerprint", min(size, 2 * sample_bytes))
+    return size, h.hexdigest()
+
+
+HEAD_BYTES = 64 << 10
+INTERIOR_SAMPLES = 4
+INTERIOR_BYTES = 64 << 10
+_FULL_CHUNK = 1 << 20
+LADDER_STAGES = ("size", "head", "sampled", "full")
+
+
+def _read_interior(p: Path) -> tuple[int, str]:
+    """``(size, md5 of INTERIOR_SAMPLES blocks spread between the head and tail samples)``."""
+    h = hashlib.md5()
+    fd = os.open(p, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        span = size - 2 * FINGERPRINT_SAMPLE - INTERIOR_BYTES
+        if span > 0:
+            for i in range(1, INTERIOR_SAMPLES + 1):
+                h.update(os.pread(fd, INTERIOR_BYTES, FINGERPRINT_SAMPLE + span * i // (INTERIOR_SAMPLES + 1)))
+            profiling.read("fingerprint", INTERIOR_SAMPLES * INTERIOR_BYTES)
+    finally:
+        os.close(fd)
+    return size, h.hexdigest()
+
+
+def _read_full(p: Path) -> tuple[int, str]:
+    """``(size, BLAKE2b of every byte)``, read once front to back and dropped from the page cache after."""
+    h = hashlib.blake2b()
+    fd = os.open(p, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+        offset = 0
+        while True:
+            chunk = os.pread(fd, _FULL_CHUNK, offset)
+            if not chunk:
+                break
+            h.update(chunk)
+            offset += len(chunk)
+        profiling.read("fingerprint", offset)
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+    finally:
+        os.close(fd)
     return size, h.hexdigest()
 
+
+class DupeLadder:
+    """
+    Decides whether two files hold the same bytes, as cheaply as it can.
+
+    ``--dupe-mode full`` deletes an import only once its match has climbed
+    every rung: equal sizes, an identical first 64 KiB, equal head-and-tail
+    fingerprints plus equal interior samples, and finally equal BLAKE2b
+    digests of the whole of both files. Most non-duplicates fall off a rung
+    that reads little or nothing; the full read is paid only by files that
+    really are copies. Digests go through the fingerprint cache like
+    :func:`quick_fingerprint`'s, so a file is read in full at most once.
+
+    Counts how many pairs reached and were turned away at each rung, and how
+    many bytes were read compared with reading both files of every equal-size
+    pair outright.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checked = dict.fromkeys(LADDER_STAGES, 0)
+        self.rejected = dict.fromkeys(LADDER_STAGES, 0)
+        self.confirmed = 0
+        self.bytes_read = 0
+        self.bytes_naive = 0
+        self._memo: Dict[tuple, str] = {}
+
+    def _count(self, stage: str, rejected: bool) -> bool:
+        with self._lock:
+            self.checked[stage] += 1
+            if rejected:
+                self.rejected[stage] += 1
+        return rejected
+
+    def _read(self, n: int) -> None:
+        with self._lock:
+            self.bytes_read += n
+
+    def _digest(self, p: Path, scheme: str, read, cost: int) -> str:
+        # Kept for the run as well, since one import may be compared with several same-size files.
+        st = p.stat()
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, scheme)
+        with self._lock:
+            digest = self._memo.get(key)
+        if digest is not None:
+            return digest
+
+        def compute(q: Path) -> tuple[int, str]:
+            self._read(cost)
+            return read(q)
+        digest = _cached(p, scheme, compute)[1]
+        with self._lock:
+            self._memo[key] = digest
+        return digest
+
+    def _head(self, p: Path) -> bytes:
+        with p.open("rb", buffering=0) as f:
+            data = os.pread(f.fileno(), HEAD_BYTES, 0)
+        self._read(len(data))
+        profiling.read("fingerprint", len(data))
+        return data
+
+    def _sampled(self, p: Path, size: int) -> tuple[str, str]:
+        """The head-and-tail fingerprint and the interior samples' digest."""
+        interior = INTERIOR_SAMPLES * INTERIOR_BYTES if size > 2 * FINGERPRINT_SAMPLE + INTERIOR_BYTES else 0
+        return (
+            self._digest(p, f"md5-ht-{FINGERPRINT_SAMPLE}", lambda q: _read_fingerprint(q, FINGERPRINT_SAMPLE),
+                         min(size, 2 * FINGERPRINT_SAMPLE)),
+            self._digest(p, f"md5-in-{INTERIOR_SAMPLES}x{INTERIOR_BYTES}", _read_interior, interior),
+        )
+
+    def same(self, a: Path, b: Path) -> bool:
+        """Whether ``a`` and ``b`` have identical content. Raises OSError if either cannot be read."""
+        size = a.stat().st_size
+        if self._count("size", b.stat().st_size != size or is_content_empty(size)):
+            return False
+        with self._lock:
+            self.bytes_naive += 2 * size
+        if self._count("head", self._head(a) != self._head(b)):
+            return False
+        if size <= HEAD_BYTES:
+            with self._lock:
+                self.confirmed += 1
+            return True  # the head was the whole file
+
+        if self._count("sampled", self._sampled(a, size) != self._sampled(b, size)):
+            return False
+        if size > 2 * FINGERPRINT_SAMPLE:
+            # The samples covered only part of the file; compare all of it.
+            full_a = self._digest(a, "blake2b", _read_full, size)
+            if self._count("full", full_a != self._digest(b, "blake2b", _read_full, size)):
+                return False
+        with self._lock:
+            self.confirmed += 1
+        return True
+
+    def used(self) -> bool:
+        return self.checked["size"] > 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checked": dict(self.checked),
+                "rejected": dict(self.rejected),
+                "confirmed": self.confirmed,
+                "bytes_read": self.bytes_read,
+                "bytes_saved": max(0, self.bytes_naive - self.bytes_read),
+            }
+
+
+_ladder: Optional[DupeLadder] = None
+
+
+def install_ladder(ladder: Optional[DupeLadder]) -> Optional[DupeLadder]:
+    """Make ``ladder`` the run's content comparer and return whichever it replaced."""
+    global _ladder
+    previous, _ladder = _ladder, ladder
+    return previous
+
+
+def confirm(a: Path, b: Path) -> bool:
+    """Whether ``a`` and ``b`` hold the same bytes, by the installed ladder (or a throwaway one)."""
+    try:
+        return (_ladder or DupeLadder()).same(a, b)
+    except OSError:
+        return False
+
+
+class _DirVideos:
+    """One destination folder's videos, bucketed for the three --dupe-mode checks."""
+
+    __slots__ = ("by_name", "by_size", "fps", "keys")
+
+    def __init__(self) -> None:
+        self.by_name: Dict[str, List[Path]] = {}
+        self.by_size: Dict[int, List[Path]] = {}
+        self.fps: Dict[Path, Tuple[int, str]] = {}
+        self.keys: Dict[Path, Tuple[str, int]] = {}  # path -> its by_name and by_size keys
+
+    def add(self, p: Path, size: int, fp: Optional[Tuple[int, str]] = None) -> None:
+        name = normalized_stem_ignore_quality(p)
+        self.by_name.setdefault(name, []).append(p)
+        self.by_size.setdefault(size, []).append(p)
+        self.keys[p] = (name, size)
+        if fp is not None:
+            self.fps[p] = fp
+
+    def discard(self, p: Path) -> None:
+        keys = self.keys.pop(p, None)
+        if keys is None:
+            return
+        for table, key in zip((self.by_name, self.by_size), keys):
+            paths = table[key]
+            paths.remove(p)
+            if not paths:
+                del table[key]
+        self.fps.pop(p, None)
+
+
+class DestDirIndex:
+    """
+    The videos in every destination folder a run has deduped against.
+
+    A season folder receives one episode after another, and without this each
+    arrival listed it and stat'ed every file in it again. Here a folder is
+    listed once per run, the first time a video targets it, with each video's
+    normalised stem and size kept and its fingerprint read only when a
+    same-size candidate turns up. :func:`placed` and :func:`gone` — called by
+    the transfer code, on device lane threads as well as the placing thread —
+    keep the folder's entry in step as files land in it or leave it. A lock
+    guards the tables; content is read outside it.
+    """
+
+    def __init__(self) -> None:
+        self._dirs: Dict[Path, _DirVideos] = {}
+        self._lock = threading.Lock()
+        self.listed = 0     # folders read
+        self.lookups = 0    # dedupe checks answered
+
+    def _videos(self, d: Path) -> _DirVideos:
+        vids = self._dirs.get(d)
+        if vids is None:
+            vids = _DirVideos()
+            for existing in snapshot.listdir(d):
+                if existing.suffix.lower() not in VIDEO_EXTS or not snapshot.is_file(existing):
+                    continue
+                try:
+                    vids.add(existing, snapshot.stat(existing).st_size)
+                except OSError:
+                    continue
+            self._dirs[d] = vids
+            self.listed += 1
+        return vids
+
+    def placed(self, p: Path, fp: Optional[Tuple[int, str]] = None) -> None:
+        if p.suffix.lower() not in VIDEO_EXTS:
+            return
+        try:
+            size = fp[0] if fp is not None else p.stat().st_size
+        except OSError:
+            size = None
+        with self._lock:
+            vids = self._dirs.get(p.parent)
+            if vids is None:
+                return  # not looked at yet; its first listing will include p
+            vids.discard(p)
+            if size is not None:
+                vids.add(p, size, fp)
+
+    def gone(self, p: Path) -> None:
+        with self._lock:
+            vids = self._dirs.get(p.parent)
+            if vids is not None:
+                vids.discard(p)
+
+    def find(self, candidate: Path, dest_dir: Path, mode: str) -> Optional[Path]:
+        with self._lock:
+            self.lookups += 1
+            vids = self._videos(dest_dir)
+            if mode == "name":
+                same = vids.by_name.get(normalized_stem_ignore_quality(candidate))
+                return same[0] if same else None
+        cand_size = candidate.stat().st_size
+        if is_content_empty(cand_size):
+            return None
+        with self._lock:
+            same_size = list(vids.by_size.get(cand_size, ()))
+        if mode == "size":
+            return same_size[0] if same_size else None
+        if mode == "full":
+            return next((existing for existing in same_size if confirm(candidate, existing)), None)
+        cand_fp: Optional[Tuple[int, str]] = None
+        for existing in same_size:
+            fp = vids.fps.get(existing)
+            if fp is None:
+                try:
+                    fp = quick_fingerprint(existing)
+                except FileNotFoundError:
+                    with self._lock:
+                        vids.discard(existing)
+                    continue
+                with self._lock:
+                    if existing in vids.keys:
+                        vids.fps[existing] = fp
+            if cand_fp is None:
+                cand_fp = quick_fingerprint(candidate)
+            if fp == cand_fp:
+                return existing
+        return None
+
+
+_dest_index: Optional[DestDirIndex] = None
+
+
+def install_dest_index(index: Optional[DestDirIndex]) -> Optional[DestDirIndex]:
+    """Make ``index`` the run's destination index and return whichever it replaced."""
+    global _dest_index
+    previous, _dest_index = _dest_index, index
+    return previous
+
+
+def placed(p: Path, fp: Optional[Tuple[int, str]] = None) -> None:
+    """A file was just placed at ``p``; ``fp`` is its fingerprint when the copy produced one."""
+    if _dest_index is not None:
+        _dest_index.placed(p, fp)
+
+
+def gone(p: Path) -> None:
+    """The file at ``p`` was moved away or removed."""
+    if _dest_index is not None:
+        _dest_index.gone(p)
+
+
 def is_duplicate_in_dir(candidate: Path, dest_dir: Path, mode: str = "hash") -> Optional[Path]:
     if mode == "off":
         return None
+    if _dest_index is not None:
+        return _dest_index.find(candidate, dest_dir, mode)
     cand_norm = normalized_stem_ignore_quality(candidate)
     cand_size = candidate.stat().st_size
-    if mode in ("size", "hash") and is_content_empty(cand_size):
+    if mode in ("size", "hash", "full") and is_content_empty(cand_size):
         return None
     cand_fp: Optional[Tuple[int, str]] = None
     for existing in dest_dir.glob("*"):
@@ -137,6 +1023,9 @@ def is_duplicate_in_dir(candidate: Path, dest_dir: Path, mode: str = "hash") ->
                     cand_fp = quick_fingerprint(candidate)
                 if quick_fingerprint(existing) == cand_fp:
                     return existing
+            elif mode == "full":
+                if existing.stat().st_size == cand_size and confirm(candidate, existing):
+                    return existing
         except FileNotFoundError:
             continue
     return None
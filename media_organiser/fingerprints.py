@@ -0,0 +1,244 @@
+"""Persistent memo of :func:`~media_organiser.duplicates.quick_fingerprint`.
+
+Fingerprinting reads the first and last MiB of a file, which over NFS is two
+seeks and two round trips per video — for a hash-mode run over a large library
+that dominates everything else. The cache remembers each result keyed by the
+file's identity, ``(st_dev, st_ino, size, mtime_ns)``, plus the sampling scheme,
+so an unchanged file is never read twice and a file the organiser *moved*
+(same inode, new path) is not read again at its destination.
+
+One cache is installed per process with :func:`install` (the CLI) or per
+request with :func:`opened` (the web app); ``quick_fingerprint`` consults it
+transparently, so every caller — the CLI, the fix pipeline, the music dedupe —
+shares the same store without passing it around. With nothing installed,
+fingerprints are computed exactly as before.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+CACHE_NAME = "fingerprints.sqlite"
+
+# A full sweep stats every remembered path, so it is rationed rather than run
+# on every invocation; a watcher fires many times a day.
+EVICT_EVERY = 24 * 3600
+
+# Pending writes are committed in batches; one fsync per fingerprint would
+# cost more than the read it saves on a local disk.
+_COMMIT_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    scheme TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (dev, ino, size, mtime_ns, scheme)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fingerprints_path ON fingerprints (path);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class FingerprintCache:
+    """
+    SQLite-backed fingerprint store with hit/miss counters.
+
+    Safe to share between threads: every statement runs under one lock, and
+    SQLite itself serialises writers across processes (the CLI and the web app
+    may point at the same file).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def fingerprint(self, p: Path, scheme: str, compute: Callable[[Path], tuple[int, str]]) -> tuple[int, str]:
+        """
+        ``compute(p)`` unless an identical file was fingerprinted before.
+
+        The result is only remembered when the file's identity is the same
+        after reading as before it: a file still being written would otherwise
+        be cached under a size and mtime it no longer has.
+        """
+        st = p.stat()
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, scheme)
+        path_str = str(p)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, path FROM fingerprints "
+                "WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND scheme=?",
+                key,
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                if row[1] != path_str:
+                    # Moved or renamed by the organiser: same bytes, new name.
+                    self._conn.execute(
+                        "UPDATE fingerprints SET path=? "
+                        "WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND scheme=?",
+                        (path_str, *key),
+                    )
+                    self._note_write()
+                return st.st_size, row[0]
+            self.misses += 1
+
+        size, digest = compute(p)
+
+        try:
+            after = p.stat()
+        except OSError:
+            return size, digest
+        if (after.st_dev, after.st_ino, after.st_size, after.st_mtime_ns) != key[:4]:
+            return size, digest
+        self._store(key, path_str, digest)
+        return size, digest
+
+    def store(self, p: Path, scheme: str, digest: str) -> None:
+        """
+        Remember ``digest`` for ``p`` as it is now, computed by someone else.
+
+        The transfer engine hashes a file's samples while copying it; storing
+        the result means nobody reads the new copy back to fingerprint it.
+        """
+        st = p.stat()
+        self._store((st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, scheme), str(p), digest)
+
+    def _store(self, key: tuple, path_str: str, digest: str) -> None:
+        with self._lock:
+            # Whatever this path held before is stale now.
+            self._conn.execute("DELETE FROM fingerprints WHERE path=? AND scheme=?", (path_str, key[4]))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (dev, ino, size, mtime_ns, scheme, digest, path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, digest, path_str),
+            )
+            self._note_write()
+
+    def _note_write(self) -> None:
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def evict_missing(self) -> int:
+        """
+        Drop entries whose file is gone or has changed since it was hashed.
+
+        Costs one ``stat`` per remembered path and reads no content.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT dev, ino, size, mtime_ns, scheme, path FROM fingerprints").fetchall()
+        stale = []
+        for dev, ino, size, mtime_ns, scheme, path in rows:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append((dev, ino, size, mtime_ns, scheme))
+                continue
+            if (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) != (dev, ino, size, mtime_ns):
+                stale.append((dev, ino, size, mtime_ns, scheme))
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM fingerprints WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND scheme=?",
+                stale,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_evict', ?)", (str(time.time()),)
+            )
+            self._conn.commit()
+            self._pending = 0
+        self.evicted += len(stale)
+        return len(stale)
+
+    def maybe_evict(self, every: float = EVICT_EVERY) -> Optional[int]:
+        """Run :meth:`evict_missing` if the last sweep is older than ``every`` seconds."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key='last_evict'").fetchone()
+        try:
+            last = float(row[0]) if row else 0.0
+        except ValueError:
+            last = 0.0
+        if time.time() - last < every:
+            return None
+        return self.evict_missing()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.commit()
+            finally:
+                self._conn.close()
+
+
+_active: Optional[FingerprintCache] = None
+# A request handler in the web app opens its own cache for the duration of the
+# request; the override is per thread so concurrent requests do not swap each
+# other's store out from under them.
+_local = threading.local()
+
+
+def active() -> Optional[FingerprintCache]:
+    """The cache ``quick_fingerprint`` currently goes through, if any."""
+    local = getattr(_local, "cache", None)
+    return local if local is not None else _active
+
+
+def install(cache: Optional[FingerprintCache]) -> Optional[FingerprintCache]:
+    """Make ``cache`` the process-wide store and return whichever it replaced."""
+    global _active
+    previous, _active = _active, cache
+    return previous
+
+
+@contextmanager
+def opened(path: Path) -> Iterator[Optional[FingerprintCache]]:
+    """
+    Open the cache at ``path`` and route this thread's fingerprints through it.
+
+    For short-lived callers such as a web request. A cache that cannot be
+    opened — read-only library, full disk — leaves fingerprinting uncached
+    rather than failing the request.
+    """
+    try:
+        cache = FingerprintCache(path)
+    except (OSError, sqlite3.Error):
+        yield None
+        return
+    previous = getattr(_local, "cache", None)
+    _local.cache = cache
+    try:
+        yield cache
+    finally:
+        _local.cache = previous
+        cache.close()
@@ -34,6 +34,8 @@ from pathlib import Path
 from typing import Iterable, Optional
 
 from .audit import VERB_RENAME_FILE, VERB_RENAME_FOLDER, VERB_TRASH, VERB_WRITE_NFO
+from . import localhash
+from .constants import STATE_DIR_NAME
 from .duplicates import quick_fingerprint
 from .library import get_movies_dir
 from .naming import (
@@ -45,7 +47,6 @@ from .naming import (
 from .nfo import read_nfo_to_meta, write_movie_nfo
 
 TRASH_DIR_NAME = ".trash"
-STATE_DIR_NAME = ".media_organiser"
 JOURNAL_NAME = "journal.jsonl"
 
 # Applied low number first. Duplicates go before renames so we never rename a
@@ -442,7 +443,7 @@ def _apply_rename(action: dict, batch: str, seq: int) -> tuple[ActionResult, Opt
 
 def build_nfo_payload(video: Path) -> dict:
     """The ``computed`` dict :func:`write_movie_nfo` expects, matching the CLI."""
-    size, md5 = quick_fingerprint(video)
+    size, digest = localhash.CURRENT.fingerprint(video)
     folder = video.parent
     return {
         "scope": "movie",
@@ -451,7 +452,8 @@ def build_nfo_payload(video: Path) -> dict:
         "quality": detect_quality(video.name),
         "extension": video.suffix.lstrip(".").lower(),
         "size": size,
-        "uniqueid_localhash": md5,
+        "uniqueid_localhash": digest,
+        "uniqueid_localhash_scheme": localhash.CURRENT.key,
         "filenameandpath": str(video),
         "originalfilename": video.name,
         "sourcepath": str(video),
@@ -463,7 +465,9 @@ def build_nfo_payload(video: Path) -> dict:
 # from it or a refresh would faithfully preserve the stale path it was meant to
 # correct. Everything else — title, year, quality, import provenance — is kept,
 # because it may have been edited by hand.
-_REFRESHED_NFO_FIELDS = ("filenameandpath", "size", "uniqueid_localhash", "extension")
+_REFRESHED_NFO_FIELDS = (
+    "filenameandpath", "size", "uniqueid_localhash", "uniqueid_localhash_scheme", "extension",
+)
 
 
 def _apply_write_nfo(action: dict, batch: str, seq: int) -> tuple[list[ActionResult], list[JournalEntry]]:
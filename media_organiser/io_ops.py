@@ -1,7 +1,25 @@
 # io_ops.py
 from pathlib import Path, PurePath, PurePosixPath, PureWindowsPath
+import errno
+import hashlib
+import json
+import os
 import shutil
 import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from . import snapshot
+from . import duplicates
+from . import iorate
+from . import profiling
+from .duplicates import FINGERPRINT_SAMPLE, remember_fingerprint
 
 
 def as_pure(path: str) -> PurePath:
@@ -47,9 +65,26 @@ def _compare_quality(q1: str, q2: str) -> int:
     except (ValueError, AttributeError):
         return 0
 
+def _taken(p: Path) -> bool:
+    """
+    Whether something already sits at ``p``.
+
+    The snapshot only says what was there when the folder was listed, which in
+    a long run can be a while ago, and a name wrongly thought free is a file
+    overwritten. A name the snapshot knows is taken is skipped without asking;
+    one it thinks free is confirmed with a real ``lstat``.
+    """
+    if snapshot.exists(p):
+        return True
+    if os.path.lexists(p):
+        snapshot.added(p)  # created behind the snapshot's back
+        return True
+    return False
+
+
 def safe_path(path: Path, quality: str = None) -> Path:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    if not path.exists():
+    snapshot.makedirs(path.parent)
+    if not _taken(path):
         return path
     stem, suf = path.stem, path.suffix
     
@@ -63,36 +98,437 @@ def safe_path(path: Path, quality: str = None) -> Path:
             if quality_suffix not in stem:
                 new_stem = f"{stem}{quality_suffix}"
                 cand = path.with_name(f"{new_stem}{suf}")
-                if not cand.exists():
+                if not _taken(cand):
                     return cand
     
     # Default behavior: append number
     i = 2
     while True:
         cand = path.with_name(f"{stem} ({i}){suf}")
-        if not cand.exists():
+        if not _taken(cand):
             return cand
         i += 1
 
-def do_move_or_copy(src: Path, dst: Path, mode: str, dry_run: bool, quality: str = None) -> Path:
+# How a file can be placed in the library. Everything but "move" leaves the
+# import where it is, so a torrent client can keep seeding it.
+TRANSFER_MODES = ("move", "copy", "hardlink", "reflink", "symlink")
+# Modes whose import must never be deleted: the library entry may be the import itself.
+LINK_MODES = ("hardlink", "reflink", "symlink")
+
+# What to try next when the filesystem refuses a mode: each step keeps the
+# "no second copy of the bytes" promise as long as it can, and a plain copy
+# always works.
+_FALLBACKS = {
+    "symlink": ("symlink", "hardlink", "reflink", "copy"),
+    "hardlink": ("hardlink", "reflink", "copy"),
+    "reflink": ("reflink", "copy"),
+    "copy": ("copy",),
+}
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# Errors that mean "this filesystem (pair) cannot do that", as opposed to a
+# real failure such as a full disk or a missing source.
+_REFUSALS = {
+    errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EINVAL, errno.ENOTTY, errno.ENOSYS,
+    getattr(errno, "EOPNOTSUPP", errno.EINVAL), getattr(errno, "ENOTSUP", errno.EINVAL),
+}
+
+_COPY_CHUNK = 64 * 1024 * 1024
+_USER_CHUNK = 1024 * 1024
+
+# A large copy syncs and records its progress this often, so an interrupted
+# transfer loses at most this much work.
+_CHECKPOINT_BYTES = 256 * 1024 * 1024
+# How much of the partial file is compared with the source before resuming.
+_RESUME_PROBE = 64 * 1024
+
+# (mode, source device, destination device) combinations already refused this
+# process; they are not attempted again, and the fallback is announced once.
+_refused: set = set()
+_refused_lock = threading.Lock()
+
+
+def _preallocate(fd: int, size: int) -> None:
+    """Reserve the destination's blocks up front: less fragmentation, and ENOSPC before the copy, not midway."""
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            raise
+        # Not supported here (tmpfs on old kernels, network mounts); just copy.
+
+
+def _pread(fd: int, n: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, n, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, n)
+
+
+def _pwrite(fd: int, data, offset: int) -> int:
+    if hasattr(os, "pwrite"):
+        return os.pwrite(fd, data, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, data)
+
+
+def _copy_range(in_fd: int, out_fd: int, start: int, end: int, sink=None) -> int:
     """
-    Place ``src`` at ``dst`` and return where it actually landed.
+    Copy bytes ``[start, end)`` between the same offsets of two files.
+
+    Without a ``sink`` the kernel moves the data (``copy_file_range``, then
+    ``sendfile``); with one, the bytes come through userspace so ``sink`` can
+    see each chunk in order. Returns the offset reached, short of ``end`` only
+    if the source ended early.
+    """
+    pos = start
+    # Under an --io-rate cap the data moves in steps of about a tenth of a
+    # second, each paid for before the next, so the copy runs at an even pace.
+    pace = iorate.pacer(in_fd, out_fd)
+    step = pace.step if pace is not None else _COPY_CHUNK
+    if sink is None and hasattr(os, "copy_file_range"):
+        try:
+            while pos < end:
+                n = os.copy_file_range(in_fd, out_fd, min(step, end - pos), pos, pos)
+                if n == 0:
+                    break
+                pos += n
+                if pace is not None:
+                    pace(n)
+        except OSError as e:
+            if e.errno not in _REFUSALS:
+                raise
+    if sink is None and pos < end and hasattr(os, "sendfile"):
+        try:
+            os.lseek(out_fd, pos, os.SEEK_SET)
+            while pos < end:
+                n = os.sendfile(out_fd, in_fd, pos, min(step, end - pos))
+                if n == 0:
+                    break
+                pos += n
+                if pace is not None:
+                    pace(n)
+        except OSError as e:
+            if e.errno not in _REFUSALS:
+                raise
+    while pos < end:
+        chunk = _pread(in_fd, min(_USER_CHUNK, step, end - pos), pos)
+        if not chunk:
+            break
+        if pace is not None:
+            pace(len(chunk))
+        if sink is not None:
+            sink(chunk)
+        view = memoryview(chunk)
+        while view:
+            n = _pwrite(out_fd, view, pos)
+            pos += n
+            view = view[n:]
+    return pos
+
+
+def _copy_data(in_fd: int, out_fd: int, size: int, sample_bytes: int, verify: bool,
+               start: int = 0, checkpoint: Optional[Callable[[int], None]] = None):
+    """
+    Copy ``size`` bytes and fingerprint them on the way past.
+
+    Only the head and tail samples that :func:`quick_fingerprint` hashes go
+    through userspace — the middle stays in the kernel — unless ``verify``
+    asks for a digest of everything. The middle is copied in
+    :data:`_CHECKPOINT_BYTES` steps, calling ``checkpoint(offset)`` after each;
+    ``start`` resumes after such a checkpoint, re-reading from the source only
+    what the hashes need. Returns ``(bytes copied, md5 of the samples,
+    BLAKE2b of all data or None)``.
+    """
+    samples = hashlib.md5()
+    full = hashlib.blake2b() if verify else None
+
+    def both(chunk):
+        samples.update(chunk)
+        if full is not None:
+            full.update(chunk)
+
+    every = full.update if full is not None else None
+    if size <= 2 * sample_bytes:
+        return _copy_range(in_fd, out_fd, 0, size, both), samples.hexdigest(), full.hexdigest() if full else None
+
+    if start:
+        # Already on disk from an earlier attempt: hash it from the source, copy nothing.
+        samples.update(_pread(in_fd, sample_bytes, 0))
+        pos = 0
+        while full is not None and pos < start:
+            chunk = _pread(in_fd, min(_USER_CHUNK, start - pos), pos)
+            if not chunk:
+                break
+            full.update(chunk)
+            pos += len(chunk)
+        done = start
+    else:
+        done = _copy_range(in_fd, out_fd, 0, sample_bytes, both)
+    middle_end = size - sample_bytes
+    while sample_bytes <= done < middle_end:
+        step = min(middle_end, done + _CHECKPOINT_BYTES)
+        reached = _copy_range(in_fd, out_fd, done, step, every)
+        if reached != step:
+            return reached, samples.hexdigest(), None
+        done = reached
+        if checkpoint is not None and done < middle_end:
+            checkpoint(done)
+    if done == middle_end:
+        done = _copy_range(in_fd, out_fd, done, size, both)
+    return done, samples.hexdigest(), full.hexdigest() if full is not None else None
+
+
+def _file_digest(path: Path) -> str:
+    """BLAKE2b of a whole file, read from disk rather than the page cache where the OS allows."""
+    h = hashlib.blake2b()
+    with open(path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+        pace = iorate.pacer(fd)
+        while True:
+            chunk = f.read(_USER_CHUNK)
+            if not chunk:
+                break
+            if pace is not None:
+                pace(len(chunk))
+            h.update(chunk)
+            profiling.read("verify", len(chunk))
+    return h.hexdigest()
+
+
+def partial_path(dst: Path) -> Path:
+    """Where a transfer to ``dst`` is written until it is complete: hidden, next to it, same filesystem."""
+    return dst.with_name(f".{dst.name}.part")
+
+
+def _state_path(partial: Path) -> Path:
+    return partial.with_name(partial.name + ".json")
+
+
+def _source_identity(st: os.stat_result) -> list:
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _resume_offset(src_fd: int, src_st: os.stat_result, partial: Path) -> int:
+    """
+    How much of ``partial`` an earlier, interrupted copy of the same source
+    left in a usable state, or 0.
+
+    The state file records the last offset that was synced to disk. It only
+    counts if the source is the very same file, unchanged, and the block just
+    before that offset still matches it.
+    """
+    try:
+        state = json.loads(_state_path(partial).read_text(encoding="utf-8"))
+        offset = int(state["offset"])
+        if state.get("source") != _source_identity(src_st) or partial.stat().st_size < offset:
+            return 0
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0
+    probe = min(offset, _RESUME_PROBE)
+    with open(partial, "rb", buffering=0) as f:
+        if _pread(f.fileno(), probe, offset - probe) != _pread(src_fd, probe, offset - probe):
+            return 0
+    return offset
+
+
+def _discard_partial(partial: Path) -> None:
+    partial.unlink(missing_ok=True)
+    _state_path(partial).unlink(missing_ok=True)
+
+
+def copy_file(src: Path, dst: Path, verify: bool = False) -> tuple[tuple[int, str], Optional[str]]:
+    """
+    ``shutil.copy2`` without the bytes passing through Python, and without
+    ever leaving a half-written file at ``dst``.
+
+    Data goes to :func:`partial_path` (preallocated, filled with
+    ``copy_file_range`` — which a CoW filesystem may itself turn into a clone —
+    or ``sendfile``), is synced, given the source's timestamps and permissions,
+    and renamed over ``dst`` in one step. Large copies record their progress
+    next to the partial file; if the process dies, the next attempt at the same
+    source and destination carries on from the last recorded offset instead of
+    starting again. Anything that was not written cleanly — a verification
+    mismatch, a source that changed — is discarded.
+
+    Returns the copy's :func:`quick_fingerprint`, computed from the bytes as
+    they were copied, and with ``verify`` the BLAKE2b of the source data, which
+    the destination, read back once, must match.
+    """
+    partial = partial_path(dst)
+    state = _state_path(partial)
+    try:
+        fp, checksum = _copy_to_partial(src, dst, partial, state, verify)
+    except BaseException:
+        # Without recorded progress a partial file is worth nothing to a retry.
+        if not state.exists():
+            partial.unlink(missing_ok=True)
+        raise
+    shutil.copystat(src, partial)
+    os.replace(partial, dst)
+    state.unlink(missing_ok=True)
+    remember_fingerprint(dst, fp)
+    return fp, checksum
+
+
+def _copy_to_partial(src: Path, dst: Path, partial: Path, state: Path, verify: bool):
+    """The part of :func:`copy_file` that fills ``partial``; returns ``(fingerprint, checksum)``."""
+    with open(src, "rb", buffering=0) as fsrc:
+        in_fd = fsrc.fileno()
+        src_st = os.fstat(in_fd)
+        size = src_st.st_size
+        start = _resume_offset(in_fd, src_st, partial)
+        if start:
+            print(f"RESUME: {src} from byte {start} of {size}")
+        else:
+            state.unlink(missing_ok=True)
+        with open(partial, "r+b" if start else "wb", buffering=0) as fdst:
+            out_fd = fdst.fileno()
+            if start:
+                os.ftruncate(out_fd, start)
+            _preallocate(out_fd, size)
+
+            def checkpoint(offset: int) -> None:
+                os.fsync(out_fd)
+                tmp = state.with_name(state.name + ".tmp")
+                tmp.write_text(json.dumps({"source": _source_identity(src_st), "offset": offset}), encoding="utf-8")
+                os.replace(tmp, state)
+
+            done, samples, checksum = _copy_data(in_fd, out_fd, size, FINGERPRINT_SAMPLE, verify, start, checkpoint)
+            if done != size or _source_identity(os.fstat(in_fd)) != _source_identity(src_st):
+                _discard_partial(partial)
+                raise OSError(errno.EAGAIN, f"source changed while copying: {src}")
+            os.fsync(out_fd)
+    if checksum is not None and _file_digest(partial) != checksum:
+        _discard_partial(partial)
+        raise OSError(errno.EIO, f"verification failed: {dst} does not match {src}")
+    return (size, samples), checksum
+
+
+def reflink_file(src: Path, dst: Path) -> None:
+    """Clone ``src`` into ``dst`` with FICLONE: instant, and no new data blocks until one side changes."""
+    if fcntl is None:
+        raise OSError(errno.ENOTSUP, "reflinks need fcntl")
+    partial = partial_path(dst)
+    try:
+        with open(src, "rb") as fsrc, open(partial, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    shutil.copystat(src, partial)
+    os.replace(partial, dst)
+
+
+@dataclass
+class TransferResult:
+    """Where a file landed, how, and what was learnt about its bytes on the way."""
+    path: Path
+    method: str = "dry-run"  # rename, copy, hardlink, reflink, symlink or dry-run
+    # quick_fingerprint of the placed file when the transfer computed it for free
+    fingerprint: Optional[tuple[int, str]] = None
+    # BLAKE2b of the data when --verify checked the copy end to end
+    checksum: Optional[str] = None
+
+
+def _devices(src: Path, dst: Path) -> tuple:
+    try:
+        return os.stat(src).st_dev, os.stat(dst.parent).st_dev
+    except OSError:
+        return None, None
+
+
+def place_file(src: Path, dst: Path, mode: str, verify: bool = False) -> TransferResult:
+    """
+    Put ``src`` at ``dst`` without removing it, the way ``mode`` asks if the
+    filesystem allows, else the next best way.
+    """
+    devices = _devices(src, dst)
+    chain = _FALLBACKS[mode]
+    for attempt in chain:
+        if attempt != "copy" and (attempt, *devices) in _refused:
+            continue
+        try:
+            if attempt == "symlink":
+                os.symlink(os.path.abspath(src), dst)
+            elif attempt == "hardlink":
+                os.link(src, dst)
+            elif attempt == "reflink":
+                reflink_file(src, dst)
+            else:
+                fp, checksum = copy_file(src, dst, verify)
+                return TransferResult(dst, "copy", fp, checksum)
+            return TransferResult(dst, attempt)
+        except OSError as e:
+            if attempt == "copy" or e.errno not in _REFUSALS:
+                raise
+            with _refused_lock:
+                first_time = (attempt, *devices) not in _refused
+                _refused.add((attempt, *devices))
+            if first_time:
+                nxt = chain[chain.index(attempt) + 1]
+                print(f"[warn] {attempt} not possible from {src.parent} to {dst.parent} ({e.strerror}); using {nxt}")
+    raise AssertionError("unreachable: copy is always the last resort")
+
+
+def transfer(src: Path, dst: Path, mode: str, dry_run: bool, quality: str = None, verify: bool = False) -> TransferResult:
+    """
+    Place ``src`` at ``dst`` and say where it actually landed.
 
     ``safe_path`` may pick a different name when ``dst`` is taken, so callers must
     use the returned path for anything that follows the file (NFO, fingerprint,
     sidecars) — writing those against the requested path describes the wrong file.
+
+    ``mode`` is one of :data:`TRANSFER_MODES`; link and clone modes fall back
+    towards a plain copy where the filesystem refuses them. A move between
+    devices is a copy followed by removing the source, which with ``verify`` is
+    only removed once the copy has been read back and matched.
     """
     dst = safe_path(dst, quality)
-    action = "COPY" if mode == "copy" else "MOVE"
+    action = mode.upper()
     print(f"{action}: {src} -> {dst}")
     if dry_run:
-        return dst
-    if mode == "copy":
-        shutil.copy2(src, dst)
-    else:
-        try:
-            shutil.move(str(src), str(dst))
-        except shutil.Error:
-            shutil.copy2(src, dst)
-            src.unlink(missing_ok=True)
-    return dst
+        return TransferResult(dst)
+    result = _transfer(src, dst, mode, verify)
+    profile = profiling.active()
+    if profile is not None:
+        copied = result.method == "copy"
+        profile.transferred(result.method, os.stat(dst).st_size if copied else 0)
+    snapshot.added(dst)
+    duplicates.placed(dst, result.fingerprint)
+    if mode == "move":
+        snapshot.removed(src)
+        duplicates.gone(src)
+    return result
+
+
+def _transfer(src: Path, dst: Path, mode: str, verify: bool) -> TransferResult:
+    if mode != "move":
+        return place_file(src, dst, mode, verify)
+    src_dev, dst_dev = _devices(src, dst)
+    if src_dev is not None and src_dev != dst_dev:
+        fp, checksum = copy_file(src, dst, verify)
+        src.unlink(missing_ok=True)
+        return TransferResult(dst, "copy", fp, checksum)
+    try:
+        shutil.move(str(src), str(dst))
+    except shutil.Error:
+        fp, checksum = copy_file(src, dst, verify)
+        src.unlink(missing_ok=True)
+        return TransferResult(dst, "copy", fp, checksum)
+    return TransferResult(dst, "rename")
+
+
+def do_move_or_copy(src: Path, dst: Path, mode: str, dry_run: bool, quality: str = None) -> Path:
+    """:func:`transfer`, for callers that only need to know where the file went."""
+    return transfer(src, dst, mode, dry_run, quality).path
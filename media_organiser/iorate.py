@@ -0,0 +1,267 @@
+"""Bandwidth caps and scheduling priority for the organiser's own I/O.
+
+Moving a batch of 4K remuxes onto an array saturates the same disks a media
+server is streaming from. A :class:`Limiter` holds a global byte budget
+(``--io-rate 80M``) and optional per-device budgets (``--io-rate-device
+/mnt/array=40M``); copies draw from it in small steps, so a capped transfer
+runs steadily at the cap instead of bursting and stalling.
+
+Like the fingerprint cache, one limiter is installed per process with
+:func:`install`; :func:`pacer` hands the copy loop a callable to report bytes
+to, or None when nothing is capped, so an uncapped run costs nothing extra.
+
+:func:`lower_priority` additionally puts the calling thread — and the threads
+and processes it goes on to create, which inherit both settings — into the
+idle I/O class with ``ioprio_set`` and raises its nice value. A long-running
+caller that should keep its own priority (the web app) instead lowers each
+child process it starts, from the parent, with :func:`prioritise_child`.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import functools
+import os
+import platform
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+# How much a bucket may bank while idle: a quarter second of its rate. Small
+# enough that a transfer never races ahead, large enough not to sleep per chunk.
+_BURST_SECONDS = 0.25
+# Copies are cut into pieces of about this long at the effective cap.
+_STEP_SECONDS = 0.1
+
+
+def parse_rate(text: str) -> int:
+    """``"80M"`` as bytes per second (K, M and G are powers of 1024; a trailing ``/s`` or ``B`` is allowed)."""
+    raw = text.strip().upper().removesuffix("/S").removesuffix("B").removesuffix("I")
+    unit = raw[-1:] if raw[-1:] in _UNITS else ""
+    number = raw[: len(raw) - len(unit)] if unit else raw
+    try:
+        value = float(number) * _UNITS[unit]
+    except ValueError:
+        raise ValueError(f"not a rate: {text!r} (try 80M)") from None
+    if value <= 0:
+        raise ValueError(f"rate must be positive: {text!r}")
+    return int(value)
+
+
+class TokenBucket:
+    """``rate`` bytes per second shared by every thread that draws on it."""
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.rate = rate
+        self._burst = rate * _BURST_SECONDS
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self._burst
+        self._stamp: Optional[float] = None
+        self.waited = 0.0
+
+    def take(self, n: int) -> None:
+        """Draw ``n`` bytes, sleeping for as long as the rate requires."""
+        with self._lock:
+            now = self._clock()
+            if self._stamp is not None:
+                self._tokens = min(self._burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            # Going into debt reserves the bytes now, so concurrent takers queue up behind.
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait > 0:
+            self._sleep(wait)
+
+
+class Limiter:
+    """A global budget plus one per device, drawn on together."""
+
+    def __init__(self, rate: Optional[int] = None, per_device: Optional[Dict[int, int]] = None) -> None:
+        self.overall = TokenBucket(rate) if rate else None
+        self.devices = {dev: TokenBucket(r) for dev, r in (per_device or {}).items()}
+
+    @classmethod
+    def from_options(cls, rate: Optional[str], device_caps: Iterable[str] = ()) -> Optional["Limiter"]:
+        """
+        Build from ``--io-rate`` and ``--io-rate-device PATH=RATE`` values.
+
+        Returns None when nothing is capped. Raises ValueError for a malformed
+        rate or a path that does not exist.
+        """
+        per_device: Dict[int, int] = {}
+        for spec in device_caps:
+            path, sep, value = spec.rpartition("=")
+            if not sep or not path:
+                raise ValueError(f"expected PATH=RATE, not {spec!r}")
+            try:
+                dev = os.stat(Path(path).expanduser()).st_dev
+            except OSError as e:
+                raise ValueError(f"cannot cap {path}: {e.strerror}") from None
+            per_device[dev] = parse_rate(value)
+        if not rate and not per_device:
+            return None
+        return cls(parse_rate(rate) if rate else None, per_device)
+
+    def buckets(self, devices: Iterable[int]) -> list[TokenBucket]:
+        out = [self.overall] if self.overall is not None else []
+        out += [self.devices[d] for d in dict.fromkeys(devices) if d in self.devices]
+        return out
+
+    def waited(self) -> float:
+        """Seconds transfers spent held back, across every bucket."""
+        return sum(b.waited for b in ([self.overall] if self.overall else []) + list(self.devices.values()))
+
+
+class Pacer:
+    """The buckets one transfer draws on, and the step size that keeps it smooth."""
+
+    def __init__(self, buckets: list[TokenBucket]) -> None:
+        self._buckets = buckets
+        self.step = max(64 << 10, int(min(b.rate for b in buckets) * _STEP_SECONDS))
+
+    def __call__(self, n: int) -> None:
+        for bucket in self._buckets:
+            bucket.take(n)
+
+
+_active: Optional[Limiter] = None
+
+
+def active() -> Optional[Limiter]:
+    return _active
+
+
+def install(limiter: Optional[Limiter]) -> Optional[Limiter]:
+    """Make ``limiter`` the process's and return whichever it replaced."""
+    global _active
+    previous, _active = _active, limiter
+    return previous
+
+
+def pacer(*fds: int) -> Optional[Pacer]:
+    """A :class:`Pacer` for a transfer between ``fds``, or None when none of it is capped."""
+    limiter = _active
+    if limiter is None:
+        return None
+    devices = []
+    for fd in fds:
+        try:
+            devices.append(os.fstat(fd).st_dev)
+        except OSError:
+            pass
+    buckets = limiter.buckets(devices)
+    return Pacer(buckets) if buckets else None
+
+
+# -- priority ---------------------------------------------------------------
+
+_IOPRIO_SET = {"x86_64": 251, "amd64": 251, "i386": 289, "i686": 289, "aarch64": 30, "arm64": 30,
+               "armv7l": 314, "ppc64le": 273, "s390x": 282, "riscv64": 30}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASSES = {"best-effort": 2, "idle": 3}
+
+
+@functools.lru_cache(maxsize=None)
+def _ioprio_set() -> Optional[Callable[[int, int], int]]:
+    """``ioprio_set(IOPRIO_WHO_PROCESS, who, value)`` through libc, looked up once; None off Linux."""
+    number = _IOPRIO_SET.get(platform.machine().lower())
+    if number is None or not hasattr(os, "sched_getaffinity"):
+        return None
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    return lambda who, value: libc.syscall(number, _IOPRIO_WHO_PROCESS, who, value)
+
+
+def set_io_priority(cls: str = "idle", level: int = 7, pid: int = 0) -> bool:
+    """
+    ``ioprio_set`` for the calling thread, or process ``pid`` (Linux only); False where unsupported.
+
+    ``idle`` gets disk time only when nobody else wants it; ``best-effort``
+    ``level`` 7 is the lowest priority that still gets a share under load.
+    """
+    ioprio_set = _ioprio_set()
+    if ioprio_set is None:
+        return False
+    value = (IOPRIO_CLASSES[cls] << _IOPRIO_CLASS_SHIFT) | (0 if cls == "idle" else level)
+    return ioprio_set(pid, value) == 0
+
+
+def set_nice(increment: int, pid: int = 0) -> bool:
+    """Raise the calling thread's (or process ``pid``'s) nice value by ``increment``; False where not allowed."""
+    try:
+        tid = pid or threading.get_native_id()
+        current = os.getpriority(os.PRIO_PROCESS, tid)
+        os.setpriority(os.PRIO_PROCESS, tid, min(19, current + increment))
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+def lower_priority(io_class: Optional[str] = "idle", nice: int = 0, pid: int = 0) -> list[str]:
+    """
+    Apply an I/O class and nice increment to the calling thread; returns what took effect.
+
+    Call it before starting worker threads or child processes (ffmpeg): both
+    inherit the settings. With ``pid``, the process ``pid`` is lowered instead.
+    """
+    applied = []
+    if io_class and set_io_priority(io_class, pid=pid):
+        applied.append(f"io class {io_class}")
+    if nice and set_nice(nice, pid):
+        applied.append(f"nice +{nice}")
+    return applied
+
+
+# What child processes (ffmpeg) are lowered to; see set_child_priority.
+_child_priority: tuple[Optional[str], int] = (None, 0)
+
+
+def set_child_priority(io_class: Optional[str], nice: int = 0) -> None:
+    """Have :func:`prioritise_child` drop child processes to this priority."""
+    global _child_priority
+    _child_priority = (io_class, nice)
+    if io_class:
+        _ioprio_set()  # find libc now, not in the middle of starting a child
+
+
+def prioritise_child(pid: int) -> list[str]:
+    """
+    Lower a just-started child process to :func:`set_child_priority`'s settings.
+
+    Done from the parent once ``Popen`` returns rather than in a ``preexec_fn``,
+    which is not safe in a threaded parent such as the web app.
+    """
+    io_class, nice = _child_priority
+    if not io_class and not nice or os.name != "posix":
+        return []
+    return lower_priority(io_class, nice, pid=pid)
+
+
+def configure_from_env(env=os.environ) -> list[str]:
+    """
+    ``IO_RATE``, ``IO_RATE_DEVICES`` (comma-separated ``PATH=RATE``), ``IO_PRIORITY``
+    and ``IO_NICE`` for long-running callers without a command line (the web app).
+
+    Installs a limiter and child priority; returns a description of what was set.
+    """
+    applied = []
+    devices = [d for d in env.get("IO_RATE_DEVICES", "").split(",") if d.strip()]
+    limiter = Limiter.from_options(env.get("IO_RATE") or None, devices)
+    if limiter is not None:
+        install(limiter)
+        applied.append("io rate cap")
+    io_class = env.get("IO_PRIORITY") or None
+    nice = int(env.get("IO_NICE") or 0)
+    if io_class or nice:
+        if io_class not in (None, *IOPRIO_CLASSES):
+            raise ValueError(f"IO_PRIORITY must be one of {', '.join(IOPRIO_CLASSES)}")
+        set_child_priority(io_class, nice)
+        applied.append("child priority")
+    return applied
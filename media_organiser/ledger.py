@@ -0,0 +1,162 @@
+"""What the organiser already decided about each file left in the import folder.
+
+Files that are not moved stay in the inbox: samples, second copies of an
+episode in the same batch, imports that duplicate something already in the
+destination folder, and everything in copy or link modes. Without a memory of
+that, every run — and a watcher runs often — classifies them again and, in hash
+mode, reads them again to reach the same verdict.
+
+The ledger records one decision per source path together with the size and
+mtime it was made for. A file whose size and mtime are unchanged is skipped
+with a dictionary lookup; any change to it, or ``--reconsider``, sends it
+through the pipeline again. Files that are still being written are never
+recorded, and neither are files the run moved away.
+
+The whole ledger is only rewritten when the run saves it, but a placement in
+copy or link mode is what stops a later run deleting the import as a library
+duplicate, so it cannot wait for that. Each decision is also appended to a
+journal beside the ledger as it is made, and a ledger loaded after a crash
+replays the journal before anything is decided.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+LEDGER_NAME = "import_ledger.json"
+_LEDGER_VERSION = 1
+_JOURNAL_SUFFIX = ".journal"
+
+# Decisions a ledger may hold, for the log and for anyone reading the file.
+SAMPLE = "sample"
+BATCH_DUPLICATE = "batch-duplicate"
+DUPLICATE = "duplicate"
+LIBRARY_DUPLICATE = "library-duplicate"
+PLACED = "placed"
+
+
+class ImportLedger:
+    """
+    Decisions keyed by source path, valid while ``(size, mtime_ns)`` is unchanged.
+
+    With ``journal`` (the default) every :meth:`record` reaches the journal
+    before it returns; a dry run passes False and writes nothing.
+    """
+
+    def __init__(self, path: Path, journal: bool = True) -> None:
+        self.path = path
+        self.journal_path = path.with_name(path.name + _JOURNAL_SUFFIX)
+        self._entries: dict[str, list] = {}
+        self.skipped = 0
+        self._dirty = False
+        self._journal = journal
+        self._journal_fh = None
+        self._lock = threading.Lock()  # records arrive from transfer lanes
+        self._load()
+
+    def _load(self) -> None:
+        self._read()
+        self._replay()
+
+    def _read(self) -> None:
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get("version") != _LEDGER_VERSION:
+            return
+        entries = payload.get("entries")
+        if isinstance(entries, dict):
+            self._entries = entries
+
+    def _replay(self) -> None:
+        """Apply decisions journalled after the ledger was last saved."""
+        try:
+            lines = self.journal_path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                key, entry = json.loads(line)
+            except (ValueError, TypeError):
+                continue  # a line torn by the crash
+            if isinstance(key, str) and isinstance(entry, list) and len(entry) == 5:
+                self._entries[key] = entry
+                self._dirty = True
+
+    def __contains__(self, p: Path) -> bool:
+        return str(p) in self._entries
+
+    def decision(self, p: Path, st: os.stat_result) -> Optional[tuple[str, str]]:
+        """``(decision, reason)`` recorded for ``p`` as it is now, or None if it needs a fresh look."""
+        entry = self._entries.get(str(p))
+        if entry is None or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+            return None
+        return entry[2], entry[3]
+
+    def record(self, p: Path, st: os.stat_result, decision: str, reason: str = "") -> None:
+        """Remember ``decision`` for ``p`` in the state ``st`` it was made for."""
+        entry = [st.st_size, st.st_mtime_ns, decision, reason, int(time.time())]
+        with self._lock:
+            self._entries[str(p)] = entry
+            self._dirty = True
+            if self._journal:
+                self._append(str(p), entry, sync=decision == PLACED)
+
+    def _append(self, key: str, entry: list, sync: bool) -> None:
+        try:
+            if self._journal_fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._journal_fh = open(self.journal_path, "a", encoding="utf-8")
+            self._journal_fh.write(json.dumps([key, entry], ensure_ascii=False) + "\n")
+            self._journal_fh.flush()
+            if sync:
+                # A placed import is deleted as a duplicate on the next run without this.
+                os.fsync(self._journal_fh.fileno())
+        except OSError as e:
+            print(f"[warn] could not journal ledger decision for {key}: {e}")
+
+    def forget(self, p: Path) -> None:
+        if self._entries.pop(str(p), None) is not None:
+            self._dirty = True
+
+    def retain(self, present: Iterable[Path]) -> None:
+        """Drop entries for files that are no longer in the inbox; call with a full listing."""
+        keep = {str(p) for p in present}
+        stale = [k for k in self._entries if k not in keep]
+        for k in stale:
+            del self._entries[k]
+        self._dirty = self._dirty or bool(stale)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def save(self) -> None:
+        """Write the ledger atomically, if anything changed, and start a fresh journal."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as fh:
+                json.dump({"version": _LEDGER_VERSION, "entries": self._entries}, fh, ensure_ascii=False)
+                fh.flush()
+                os.fsync(fh.fileno())
+            tmp.replace(self.path)
+            self._dirty = False
+            # Everything journalled is in the file just written.
+            if self._journal_fh is not None:
+                self._journal_fh.close()
+                self._journal_fh = None
+            try:
+                self.journal_path.unlink()
+            except FileNotFoundError:
+                pass
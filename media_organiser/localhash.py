@@ -0,0 +1,184 @@
+"""The fingerprint schemes behind NFO ``<uniqueid type="localhash">`` values.
+
+A localhash is only meaningful next to the recipe that produced it: which hash
+function, which parts of the file were sampled, and which revision of that
+recipe. NFOs written before schemes existed carry the bare digest, and they all
+mean :data:`LEGACY` — MD5 of the first and last MiB, exactly what
+:func:`~media_organiser.duplicates.quick_fingerprint` computes. New NFOs record
+the scheme as attributes on the element::
+
+    <uniqueid type="localhash" default="true" algorithm="blake2b"
+              layout="ht-1m+4x64k" version="1">…</uniqueid>
+
+Schemes are registered by key (``algorithm/layout/vN``). Two fingerprints are
+comparable only when their keys are equal; a digest from any other scheme —
+including one this version does not know — says nothing either way.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from . import fingerprints, profiling
+
+
+@dataclass(frozen=True)
+class Scheme:
+    """One way of fingerprinting a file: hash function, sample layout and revision."""
+
+    algorithm: str           # a hashlib constructor name
+    sample_bytes: int        # hashed at each end of the file
+    interior: int = 0        # extra samples spread between the ends
+    interior_bytes: int = 0
+    version: int = 1
+
+    @property
+    def layout(self) -> str:
+        out = f"ht-{_size_label(self.sample_bytes)}"
+        if self.interior:
+            out += f"+{self.interior}x{_size_label(self.interior_bytes)}"
+        return out
+
+    @property
+    def key(self) -> str:
+        return f"{self.algorithm}/{self.layout}/v{self.version}"
+
+    def attrs(self) -> Dict[str, str]:
+        """The attributes recorded on the NFO's ``uniqueid`` element."""
+        return {"algorithm": self.algorithm, "layout": self.layout, "version": str(self.version)}
+
+    def _cache_scheme(self) -> str:
+        # The legacy scheme shares its cache entries with quick_fingerprint.
+        return f"md5-ht-{self.sample_bytes}" if self == LEGACY else self.key
+
+    def fingerprint(self, p: Path) -> tuple[int, str]:
+        """``(size, hex digest)`` of ``p``, through the installed fingerprint cache if any."""
+        cache = fingerprints.active()
+        if cache is not None:
+            return cache.fingerprint(p, self._cache_scheme(), self.read)
+        return self.read(p)
+
+    def read(self, p: Path, on_read: Optional[Callable[[int], None]] = None,
+             drop_cache: bool = False) -> tuple[int, str]:
+        """
+        ``(size, hex digest)`` of ``p`` read from the file itself, never the cache.
+
+        ``on_read(n)`` is called after each chunk (a throttle, say), and with
+        ``drop_cache`` the kernel is told to drop every range once it is hashed,
+        so a long verification pass does not push other readers' pages out.
+        """
+        h = self._hasher()
+        read = 0
+        fd = os.open(p, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            if size <= 2 * self.sample_bytes + self.interior * self.interior_bytes:
+                offsets = [(0, size)]
+            else:
+                span = size - 2 * self.sample_bytes - self.interior_bytes
+                offsets = [(0, self.sample_bytes)]
+                offsets += [
+                    (self.sample_bytes + span * i // (self.interior + 1), self.interior_bytes)
+                    for i in range(1, self.interior + 1)
+                ]
+                offsets.append((size - self.sample_bytes, self.sample_bytes))
+            for start, length in offsets:
+                offset = start
+                while offset < start + length:
+                    chunk = os.pread(fd, min(start + length - offset, 1 << 20), offset)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    offset += len(chunk)
+                    read += len(chunk)
+                    if on_read is not None:
+                        on_read(len(chunk))
+                if drop_cache and hasattr(os, "posix_fadvise"):
+                    try:
+                        os.posix_fadvise(fd, start, length, os.POSIX_FADV_DONTNEED)
+                    except OSError:
+                        pass
+        finally:
+            os.close(fd)
+        profiling.read("fingerprint", read)
+        return size, h.hexdigest()
+
+    def _hasher(self):
+        if self.algorithm == "blake2b":
+            return hashlib.blake2b(digest_size=16)
+        return hashlib.new(self.algorithm)
+
+
+def _size_label(n: int) -> str:
+    if n % (1 << 20) == 0:
+        return f"{n >> 20}m"
+    if n % (1 << 10) == 0:
+        return f"{n >> 10}k"
+    return str(n)
+
+
+_REGISTRY: Dict[str, Scheme] = {}
+
+
+def register(scheme: Scheme) -> Scheme:
+    """Make ``scheme`` known to :func:`get` and :func:`scheme_key`."""
+    _REGISTRY[scheme.key] = scheme
+    return scheme
+
+
+def get(key: str) -> Optional[Scheme]:
+    """The registered scheme with ``key``; None for one this version does not know."""
+    return _REGISTRY.get(key)
+
+
+def available() -> list[str]:
+    return sorted(_REGISTRY)
+
+
+# What every NFO without scheme attributes holds.
+LEGACY = register(Scheme("md5", 1 << 20))
+# A faster hash over the same ends plus four 64 KiB samples from the middle.
+BLAKE2_SAMPLED = register(Scheme("blake2b", 1 << 20, interior=4, interior_bytes=64 << 10))
+
+# Written into new NFOs. Kept on the legacy scheme because copies compute it
+# as they stream, so an NFO never has to read the placed file back.
+CURRENT = LEGACY
+
+
+def scheme_key(attrs: Dict[str, str]) -> str:
+    """
+    The scheme key recorded by a ``uniqueid`` element's attributes.
+
+    No attributes means :data:`LEGACY`. Unknown schemes keep their key, so
+    rewriting such an NFO preserves it and comparisons treat it as foreign.
+    """
+    algorithm = (attrs.get("algorithm") or "").strip().lower()
+    if not algorithm:
+        return LEGACY.key
+    layout = (attrs.get("layout") or "").strip().lower()
+    version = (attrs.get("version") or "1").strip().lstrip("v") or "1"
+    return f"{algorithm}/{layout}/v{version}"
+
+
+def key_attrs(key: str) -> Dict[str, str]:
+    """Inverse of :func:`scheme_key`, for writing the element back."""
+    scheme = get(key)
+    if scheme is not None:
+        return scheme.attrs()
+    algorithm, _, rest = key.partition("/")
+    layout, _, version = rest.rpartition("/")
+    return {"algorithm": algorithm, "layout": layout, "version": version.lstrip("v") or "1"}
+
+
+def same_content(a_key: str, a_digest: str, b_key: str, b_digest: str) -> Optional[bool]:
+    """
+    Whether two fingerprints show the same content.
+
+    None when they cannot say: different schemes, or a scheme nobody registered.
+    """
+    if a_key != b_key or get(a_key) is None:
+        return None
+    return a_digest.lower() == b_digest.lower()
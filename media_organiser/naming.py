@@ -1,4 +1,5 @@
 from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import re
@@ -67,6 +68,7 @@ def titlecase_soft(s: str) -> str:
     )
     return result
 
+@lru_cache(maxsize=1 << 17)
 def clean_name(raw: str, *, strip_leading_index: bool = True, strip_scene_words: bool = True) -> str:
     name = Path(raw).stem
     name = re.sub(r"\[.*?\]", " ", name)    # [tags]
@@ -96,6 +98,64 @@ _PATTERNS = [
     re.compile(r"(?i)\s[-–—]\s*(?P<season>\d{1,2})(?P<ep1>\d{2})\s*[-–—]\s*(?=\S)"),
 ]
 
+def _tagged(idx: int, pat: re.Pattern) -> str:
+    """``pat``'s source without its flags, with each group name suffixed by ``_idx``."""
+    src = pat.pattern[len("(?i)"):]
+    return re.sub(r"\(\?P<(\w+)>", lambda m: f"(?P<{m.group(1)}_{idx}>", src)
+
+
+# Every _PATTERNS entry in one scan. The leading lookaheads stop only where at
+# least one of them matches (a one-character test first rules out most places); the optional lookaheads after it then record, for
+# each pattern, the match it would make from there. Being zero-width, the scan
+# sees matches that overlap, which finditer run per pattern would not:
+# _rightmost_episode_token puts finditer's non-overlap back.
+_EPISODE_SCAN = re.compile(
+    # Every pattern starts with a separator, "s" (season ...) or "e" (Ep ...).
+    r"(?i)(?=[.\s_\-se])"
+    + "(?=" + "|".join(re.sub(r"\(\?P<\w+>", "(?:", p.pattern[len("(?i)"):]) for p in _PATTERNS) + ")"
+    + "".join(f"(?=(?P<_{i}>{_tagged(i, p)}))?" for i, p in enumerate(_PATTERNS))
+)
+_SCAN_SLOTS = [_EPISODE_SCAN.groupindex[f"_{i}"] for i in range(len(_PATTERNS))]
+_SCAN_FIELDS = [
+    [(name, _EPISODE_SCAN.groupindex[f"{name}_{i}"]) for name in p.groupindex]
+    for i, p in enumerate(_PATTERNS)
+]
+
+
+def _rightmost_episode_token(stem: str) -> Optional[tuple[int, dict]]:
+    """
+    ``(start, groupdict)`` of the episode token ``is_tv_episode`` keys on: of
+    all matches ``finditer`` finds for each of ``_PATTERNS``, the one starting
+    furthest right, the earlier pattern winning a tie. One regex scan instead
+    of seven; a pattern's match only counts if it starts after that pattern's
+    previous counted match ended, exactly as ``finditer`` would have it.
+    """
+    found = list(_EPISODE_SCAN.finditer(stem))
+    if not found:
+        return None
+    if len(found) == 1:
+        # The usual case: nothing earlier to overlap with.
+        m = found[0]
+        regs = m.regs
+        idx = next(i for i, slot in enumerate(_SCAN_SLOTS) if regs[slot][1] >= 0)
+    else:
+        resume = [0] * len(_PATTERNS)
+        m = idx = None
+        for cand in found:
+            pos, regs = cand.start(), cand.regs
+            chosen = None
+            for i, slot in enumerate(_SCAN_SLOTS):
+                end = regs[slot][1]
+                if end >= 0 and pos >= resume[i]:
+                    resume[i] = end
+                    if chosen is None:
+                        chosen = i
+            if chosen is not None:
+                m, idx = cand, chosen
+    return m.start(), {name: m.group(gi) for name, gi in _SCAN_FIELDS[idx]}
+
+
+@lru_cache(maxsize=1 << 17)
 def _clean_title(s: str) -> str:
     # Title-safe cleaning (don’t strip leading numbers or scene words)
     s = re.sub(r"\[.*?\]", " ", s)
@@ -132,29 +192,36 @@ def is_tv_episode(filename: str, path: Optional[Path] = None) -> tuple[bool, dic
     
     For "Ep XX" patterns without season info, tries to extract season from parent directory.
     """
+    # The answer depends on nothing but the name and, for "Ep 3" style tokens,
+    # its folder's name; siblings, reruns and the library audit ask about the
+    # same ones over and over.
+    is_tv, info = _classify_episode(filename)
+    if is_tv is None:
+        if path is None:
+            path = Path(filename)
+        is_tv, info = _classify_episode(filename, path.parent.name)
+    return is_tv, dict(info)
+
+
+@lru_cache(maxsize=1 << 17)
+def _classify_episode(filename: str, parent_name: Optional[str] = None) -> tuple[Optional[bool], dict]:
+    """``is_tv_episode``'s answer; ``(None, {})`` when it needs ``parent_name`` and was not given it."""
     stem = Path(filename).stem
-    best = None
-    best_pos = -1
-    best_pattern_idx = -1
-    for idx, pat in enumerate(_PATTERNS):
-        for m in pat.finditer(stem):
-            if m.start() > best_pos:
-                best, best_pos, best_pattern_idx = m, m.start(), idx
-    if not best:
+    found = _rightmost_episode_token(stem)
+    if found is None:
         return False, {}
+    start, gd = found
+    if gd.get("season") is None and parent_name is None:
+        return None, {}
     
-    series_raw = stem[:best.start()]
+    series_raw = stem[:start]
     series_raw = re.sub(r"[\.\s_\-]+$", "", series_raw)  # trim trailing separators
     series = _clean_title(series_raw)
-    gd = best.groupdict()
     
     # Handle "Ep XX" pattern (no season in pattern)
     if "season" not in gd or gd["season"] is None:
         season = None
         # Try to extract season from parent directory
-        if path is None:
-            path = Path(filename)
-        parent_name = path.parent.name if path.parent else ""
         # Look for "Season X", "SXX", "Season XX" patterns in parent directory
         season_match = re.search(r"(?i)(?:season\s*)?S?(?P<season>\d{1,2})", parent_name)
         if season_match:
@@ -170,7 +237,7 @@ def is_tv_episode(filename: str, path: Optional[Path] = None) -> tuple[bool, dic
             season = 1
         
         # If series is empty (Ep at start), try to extract from parent directory
-        if not series and path and path.parent:
+        if not series:
             # Try parent directory name, removing season/quality info
             parent_series = parent_name
             # Remove season patterns (S01, Season 1, etc.)
@@ -221,84 +288,94 @@ def movie_name_from_parents(path: Path, src_root=Path) -> Optional[str]:
         if p.name == src_root.name:
             break
 
-        # If your directory regex exposes a "title" group, start from that; else use the raw name
-        m = MOVIE_DIR_RE.match(raw) if "MOVIE_DIR_RE" in globals() else None
-        candidate = m.group("title") if m and "title" in m.groupdict() else raw
-        # Strip leading "N. " or "N - " index when not from MOVIE_DIR_RE (e.g. "1. Philosophor's Stone"), not "3 Idiots"
-        if not m:
-            candidate = re.sub(r"^\s*\d{1,3}(?:[.\-\–—)]|\s{2,})\s*", "", candidate).strip()
-        
-        # Strip scene words from candidate (e.g. "DVDRip", "XviD") and normalize
-        candidate = SCENE_WORDS.sub(" ", candidate)
-        # Replace dots/underscores with spaces, but preserve single-digit decimals (e.g. 1.5, 1-1.5)
-        _dot_placeholder = "\u200b"
-        candidate = re.sub(r"(?<!\d)(\d)[._](\d)(?!\d)", lambda m: m.group(1) + _dot_placeholder + m.group(2), candidate)
-        # Also protect digit.digit after hyphen or start (e.g. "1-1.5" in "The Lion King 1-1.5")
-        candidate = re.sub(
-            r"(?:^|([\s\-]))(\d)[._](\d)(?!\d)",
-            lambda m: (m.group(1) or "") + m.group(2) + _dot_placeholder + m.group(3),
-            candidate,
-        )
-        candidate = re.sub(r"[._]+", " ", candidate)
-        candidate = candidate.replace(_dot_placeholder, ".")
-        # Strip trailing release group patterns (e.g., "-DoNE", "-Larceny")
-        candidate = re.sub(r"-[A-Za-z0-9]+\s*$", "", candidate)
-        # Remove empty bracket pairs left after stripping scene words (e.g. [WEBRip] -> [ ])
-        candidate = re.sub(r"\[\s*\]", "", candidate)
-        # Normalize spaces and strip separators
-        candidate = re.sub(r"\s+", " ", candidate).strip(" .-_")
-        # Allow single-char titles when from MOVIE_DIR_RE (e.g. "9 (2009)")
-        from_movie_dir_re = m and "title" in m.groupdict()
-        if not candidate or (len(candidate) < 2 and not from_movie_dir_re):
-            continue
+        title = _title_from_dir_name(raw)
+        if title:
+            return title
+    return None
 
-        # Tokenize; prefer space so hyphenated words (e.g. Were-Rabbit) stay one token
-        sep = " " if " " in candidate else (find_separator(candidate) or " ")
-        tokens = [t for t in candidate.split(sep=sep) if t]
-
-        # Separate resolution-ish tokens from title tokens
-        res_tokens, title_tokens = [], []
-        for tok in tokens:
-            if RESOLUTION_PATTERN.fullmatch(tok):
-                res_tokens.append(tok)
-            else:
-                title_tokens.append(tok)
-
-
-        # Prefer specific numeric resolutions over generic tags
-        preferred_order = ["4320p", "8k", "2160p", "4k", "1080p", "720p", "576p", "480p"]
-        resolution = None
-        if res_tokens:
-            lower_set = {t.lower() for t in res_tokens}
-            for cand in preferred_order:
-                if cand in lower_set:
-                    resolution = cand
-                    break
-            if resolution is None:
-                resolution = next((t.lower() for t in res_tokens), None)
-
-        # Truncate title at the first plausible release-year token (1900-2030), not e.g. 2049 in "Blade Runner 2049".
-        # Never truncate at index 0: a folder title can legitimately start with a year (e.g. "2001 - A Space Odyssey").
-        for i, tok in enumerate(title_tokens):
-            if i == 0:
-                continue
-            if YEAR_PATTERN.fullmatch(tok):
-                try:
-                    y = int(tok)
-                    if 1900 <= y <= 2030:
-                        title_tokens = title_tokens[:i]
-                        break
-                except ValueError:
-                    pass
-
-        # Build base title
-        base = titlecase_soft(" ".join(title_tokens).strip())
-        if not base:
+
+@lru_cache(maxsize=8192)
+def _title_from_dir_name(raw: str) -> Optional[str]:
+    """
+    The movie title a folder name spells, or None; ``movie_name_from_parents``'s
+    per-folder step, memoised because every video in a folder asks it again.
+    """
+    # If your directory regex exposes a "title" group, start from that; else use the raw name
+    m = MOVIE_DIR_RE.match(raw) if "MOVIE_DIR_RE" in globals() else None
+    candidate = m.group("title") if m and "title" in m.groupdict() else raw
+    # Strip leading "N. " or "N - " index when not from MOVIE_DIR_RE (e.g. "1. Philosophor's Stone"), not "3 Idiots"
+    if not m:
+        candidate = re.sub(r"^\s*\d{1,3}(?:[.\-\–—)]|\s{2,})\s*", "", candidate).strip()
+    
+    # Strip scene words from candidate (e.g. "DVDRip", "XviD") and normalize
+    candidate = SCENE_WORDS.sub(" ", candidate)
+    # Replace dots/underscores with spaces, but preserve single-digit decimals (e.g. 1.5, 1-1.5)
+    _dot_placeholder = "\u200b"
+    candidate = re.sub(r"(?<!\d)(\d)[._](\d)(?!\d)", lambda m: m.group(1) + _dot_placeholder + m.group(2), candidate)
+    # Also protect digit.digit after hyphen or start (e.g. "1-1.5" in "The Lion King 1-1.5")
+    candidate = re.sub(
+        r"(?:^|([\s\-]))(\d)[._](\d)(?!\d)",
+        lambda m: (m.group(1) or "") + m.group(2) + _dot_placeholder + m.group(3),
+        candidate,
+    )
+    candidate = re.sub(r"[._]+", " ", candidate)
+    candidate = candidate.replace(_dot_placeholder, ".")
+    # Strip trailing release group patterns (e.g., "-DoNE", "-Larceny")
+    candidate = re.sub(r"-[A-Za-z0-9]+\s*$", "", candidate)
+    # Remove empty bracket pairs left after stripping scene words (e.g. [WEBRip] -> [ ])
+    candidate = re.sub(r"\[\s*\]", "", candidate)
+    # Normalize spaces and strip separators
+    candidate = re.sub(r"\s+", " ", candidate).strip(" .-_")
+    # Allow single-char titles when from MOVIE_DIR_RE (e.g. "9 (2009)")
+    from_movie_dir_re = m and "title" in m.groupdict()
+    if not candidate or (len(candidate) < 2 and not from_movie_dir_re):
+        return None
+
+    # Tokenize; prefer space so hyphenated words (e.g. Were-Rabbit) stay one token
+    sep = " " if " " in candidate else (find_separator(candidate) or " ")
+    tokens = [t for t in candidate.split(sep=sep) if t]
+
+    # Separate resolution-ish tokens from title tokens
+    res_tokens, title_tokens = [], []
+    for tok in tokens:
+        if RESOLUTION_PATTERN.fullmatch(tok):
+            res_tokens.append(tok)
+        else:
+            title_tokens.append(tok)
+
+
+    # Prefer specific numeric resolutions over generic tags
+    preferred_order = ["4320p", "8k", "2160p", "4k", "1080p", "720p", "576p", "480p"]
+    resolution = None
+    if res_tokens:
+        lower_set = {t.lower() for t in res_tokens}
+        for cand in preferred_order:
+            if cand in lower_set:
+                resolution = cand
+                break
+        if resolution is None:
+            resolution = next((t.lower() for t in res_tokens), None)
+
+    # Truncate title at the first plausible release-year token (1900-2030), not e.g. 2049 in "Blade Runner 2049".
+    # Never truncate at index 0: a folder title can legitimately start with a year (e.g. "2001 - A Space Odyssey").
+    for i, tok in enumerate(title_tokens):
+        if i == 0:
             continue
+        if YEAR_PATTERN.fullmatch(tok):
+            try:
+                y = int(tok)
+                if 1900 <= y <= 2030:
+                    title_tokens = title_tokens[:i]
+                    break
+            except ValueError:
+                pass
 
-        return base
+    # Build base title
+    base = titlecase_soft(" ".join(title_tokens).strip())
+    if not base:
+        return None
 
-    return None
+    return base
 
 
 # A part marker sits at the end of a name, ahead of nothing but release junk:
@@ -3,6 +3,7 @@ import re
 import xml.etree.ElementTree as ET
 from typing import Optional, Dict, Any, List
 
+from . import localhash, snapshot
 from .constants import VIDEO_EXTS
 
 def xml_indent(elem: ET.Element, level: int = 0):
@@ -32,8 +33,8 @@ def holds_single_video(folder: Path) -> bool:
     """
     seen = 0
     try:
-        for p in folder.rglob("*"):
-            if p.is_file() and p.suffix.lower() in VIDEO_EXTS:
+        for p in snapshot.files_under(folder):
+            if p.suffix.lower() in VIDEO_EXTS:
                 seen += 1
                 if seen > 1:
                     return False
@@ -45,7 +46,7 @@ def holds_single_video(folder: Path) -> bool:
 def _folder_nfo(folder: Path) -> Optional[Path]:
     """The folder's own NFO (Kodi ``movie.nfo`` layout), chosen deterministically."""
     try:
-        nfos = sorted(p for p in folder.glob("*.nfo") if p.is_file())
+        nfos = sorted(p for p in snapshot.listdir(folder) if p.match("*.nfo") and snapshot.is_file(p))
     except OSError:
         return None
     if not nfos:
@@ -56,6 +57,51 @@ def _folder_nfo(folder: Path) -> Optional[Path]:
     return nfos[0]
 
 
+class FolderCensus:
+    """
+    For each folder a batch's videos sit in (and the one above), whether it
+    holds a single video and which folder NFO it has, taken once before any
+    file moves.
+
+    ``find_nfo`` asks this of the parent and grandparent of every video, and
+    siblings ask about the same folders: without it each question was a walk
+    of the folder's subtree. Answering from the state at the start of the
+    batch also means a folder NFO is judged against the videos the folder
+    actually came with, not however many the batch has left in it so far.
+    """
+
+    def __init__(self) -> None:
+        self._single: Dict[Path, bool] = {}
+        self._nfo: Dict[Path, Optional[Path]] = {}
+
+    @classmethod
+    def survey(cls, videos) -> "FolderCensus":
+        census = cls()
+        for v in videos:
+            for folder in (v.parent, v.parent.parent):
+                if folder not in census._single:
+                    single = census._single[folder] = holds_single_video(folder)
+                    census._nfo[folder] = _folder_nfo(folder) if single else None
+        return census
+
+    def __contains__(self, folder: Path) -> bool:
+        return folder in self._single
+
+    def folder_nfo(self, folder: Path) -> Optional[Path]:
+        """The NFO that speaks for ``folder``'s lone video; None if it has none or several videos."""
+        return self._nfo.get(folder)
+
+
+_census: Optional[FolderCensus] = None
+
+
+def install_census(census: Optional[FolderCensus]) -> Optional[FolderCensus]:
+    """Make ``census`` the batch's folder census and return whichever it replaced."""
+    global _census
+    previous, _census = _census, census
+    return previous
+
+
 def find_nfo(path: Path) -> Optional[Path]:
     """
     The NFO describing ``path``, or None.
@@ -68,16 +114,20 @@ def find_nfo(path: Path) -> Optional[Path]:
     — silently renames the entire import to one title.
     """
     cand = path.with_suffix(".nfo")
-    if cand.exists():
+    if snapshot.exists(cand):
         return cand
     seen: set[Path] = set()
     for folder in (path.parent, path.parent.parent):
         if folder in seen:
             continue
         seen.add(folder)
-        if not holds_single_video(folder):
+        census = _census
+        if census is not None and folder in census:
+            nfo = census.folder_nfo(folder)
+        elif holds_single_video(folder):
+            nfo = _folder_nfo(folder)
+        else:
             continue
-        nfo = _folder_nfo(folder)
         if nfo is not None:
             return nfo
     return None
@@ -115,6 +165,50 @@ def parse_local_nfo_for_title(nfo_path: Path) -> Optional[str]:
     return None
 
 
+def _read_localhash(root: ET.Element, meta: dict) -> None:
+    for uid in root.findall("uniqueid"):
+        t = uid.attrib.get("type","").lower()
+        if t == "localhash" and (uid.text or "").strip():
+            meta["uniqueid_localhash"] = uid.text.strip()
+            meta["uniqueid_localhash_scheme"] = localhash.scheme_key(uid.attrib)
+            return
+
+
+def _write_localhash(root: ET.Element, merged: dict) -> None:
+    uid = merged.get("uniqueid_localhash")
+    if uid:
+        attrs = {"type": "localhash", "default": "true"}
+        attrs.update(localhash.key_attrs(merged.get("uniqueid_localhash_scheme") or localhash.LEGACY.key))
+        ET.SubElement(root, "uniqueid", attrs).text = uid
+
+
+def set_localhash(nfo_path: Path, digest: str, scheme_key: str) -> bool:
+    """
+    Replace the localhash in an existing NFO, leaving everything else as it is.
+
+    Returns False when the file is not an NFO this module writes.
+    """
+    try:
+        tree = ET.parse(nfo_path)
+    except (OSError, ET.ParseError):
+        return False
+    root = tree.getroot()
+    if root.tag.lower() not in ("movie", "episodedetails"):
+        return False
+    node = next((u for u in root.findall("uniqueid") if u.attrib.get("type", "").lower() == "localhash"), None)
+    if node is None:
+        node = ET.SubElement(root, "uniqueid", {"type": "localhash", "default": "true"})
+    for attr in ("algorithm", "layout", "version"):
+        node.attrib.pop(attr, None)
+    node.attrib.update(localhash.key_attrs(scheme_key))
+    node.text = digest
+    xml_indent(root)
+    tmp = nfo_path.with_name(nfo_path.name + ".tmp")
+    tmp.write_bytes(ET.tostring(root, encoding="utf-8", xml_declaration=True))
+    tmp.replace(nfo_path)
+    return True
+
+
 def read_nfo_to_meta(nfo_path: Path) -> dict:
     meta: dict = {}
     try:
@@ -129,21 +223,13 @@ def read_nfo_to_meta(nfo_path: Path) -> dict:
             for k in ("title","year","quality","extension","size","filenameandpath","originalfilename","sourcepath"):
                 v = txt(k)
                 if v: meta[k] = v
-            for uid in root.findall("uniqueid"):
-                t = uid.attrib.get("type","").lower()
-                if t == "localhash" and (uid.text or "").strip():
-                    meta["uniqueid_localhash"] = uid.text.strip()
-                    break
+            _read_localhash(root, meta)
         elif tag == "episodedetails":
             meta["scope"] = "tv"
             for k in ("showtitle","season","episode","episode_to","title","quality","extension","size","filenameandpath","originalfilename","sourcepath"):
                 v = txt(k)
                 if v: meta[k] = v
-            for uid in root.findall("uniqueid"):
-                t = uid.attrib.get("type","").lower()
-                if t == "localhash" and (uid.text or "").strip():
-                    meta["uniqueid_localhash"] = uid.text.strip()
-                    break
+            _read_localhash(root, meta)
         subs_node = root.find("subtitles")
         subs = []
         if subs_node is not None:
@@ -196,10 +282,7 @@ def write_movie_nfo(dst_video: Path, computed: dict, base_meta: dict | None, ove
     set_el("quality", merged.get("quality"))
     set_el("extension", merged.get("extension"))
     set_el("size", str(merged.get("size")) if merged.get("size") else None)
-    uid = merged.get("uniqueid_localhash")
-    if uid:
-        node = ET.SubElement(root, "uniqueid", {"type":"localhash","default":"true"})
-        node.text = uid
+    _write_localhash(root, merged)
     set_el("filenameandpath", merged.get("filenameandpath"))
     set_el("originalfilename", merged.get("originalfilename"))
     set_el("sourcepath", merged.get("sourcepath"))
@@ -212,6 +295,7 @@ def write_movie_nfo(dst_video: Path, computed: dict, base_meta: dict | None, ove
     xml_indent(root)
     xml_bytes = ET.tostring(root, encoding="utf-8", xml_declaration=True)
     out.write_bytes(xml_bytes)
+    snapshot.added(out)
 
     print(f"NFO WRITE: {out}")
 
@@ -240,10 +324,7 @@ def write_episode_nfo(dst_video: Path, computed: dict, base_meta: dict | None, o
     set_el("quality",   merged.get("quality"))
     set_el("extension", merged.get("extension"))
     set_el("size",      str(merged.get("size")) if merged.get("size") else None)
-    uid = merged.get("uniqueid_localhash")
-    if uid:
-        node = ET.SubElement(root, "uniqueid", {"type":"localhash","default":"true"})
-        node.text = uid
+    _write_localhash(root, merged)
     set_el("filenameandpath", merged.get("filenameandpath"))
     set_el("originalfilename", merged.get("originalfilename"))
     set_el("sourcepath", merged.get("sourcepath"))
@@ -258,5 +339,6 @@ def write_episode_nfo(dst_video: Path, computed: dict, base_meta: dict | None, o
     xml_indent(root)
     xml_bytes = ET.tostring(root, encoding="utf-8", xml_declaration=True)
     out.write_bytes(xml_bytes)
+    snapshot.added(out)
 
     print(f"NFO WRITE: {out}")
@@ -0,0 +1,867 @@
+"""Organise an import tree into a library, as a function: :func:`organise`.
+
+This is the engine behind the command line. :class:`OrganiseConfig` holds the
+same settings as the CLI options (under the same names), and :func:`organise`
+runs one pass over the source and returns a :class:`RunReport` saying what
+became of each video: where it was placed and how, which library file it
+duplicated, the NFO that describes it and the subtitles that went with it.
+:func:`watch` is the ``--watch`` loop, handing a report to a callback after
+every batch.
+
+Building the library duplicate index and opening the fingerprint cache are
+the expensive parts of a small run. A long-lived caller — the web app, a
+watcher of its own — can build them once and pass them to every call; they
+are kept current by the runs that use them. The console log is still printed
+as the run goes; redirect stdout to keep it.
+
+One run at a time per process: a run swaps ``sys.stdout`` to keep each file's
+log together, and its fingerprint cache, snapshot, event sink and profile are
+process-wide. Calls from other threads wait for the current run — a whole
+:func:`watch`, until it stops — to finish.
+"""
+from __future__ import annotations
+
+import os
+import re
+import signal
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
+
+from .stabilize import StabilityCheck, parse_strategies, partition_stable
+from .cleanup import Pruner
+from . import duplicates, events, fingerprints, localhash, profiling
+from . import snapshot
+from .constants import VIDEO_EXTS, IGNORED_PATH_COMPONENTS, STATE_DIR_NAME
+from .naming import (
+    detect_quality, is_tv_episode, _clean_title, guess_movie_name, guess_year_for_movie,
+    normalise_movie_title_for_display, movie_part_suffix, detect_numbered_series, count_distinct_movies,
+)
+from .nfo import (
+    FolderCensus, install_census,
+    find_nfo,  read_nfo_to_meta, nfo_path_for,
+    write_movie_nfo, write_episode_nfo, merge_first, merge_subtitles
+)
+from .duplicates import (
+    INDEX_NAME,
+    DestDirIndex,
+    DupeLadder,
+    LADDER_STAGES,
+    LibraryImportDupIndex,
+    build_library_import_dup_index,
+    is_duplicate_in_dir,
+    normalized_stem_ignore_quality,
+    quick_fingerprint,
+)
+from .devices import DeviceScheduler, device_of, parse_device_jobs
+from .io_ops import LINK_MODES, TRANSFER_MODES, TransferResult, do_move_or_copy, transfer
+from . import ledger as ledger_mod
+from .ledger import LEDGER_NAME, ImportLedger
+from .sidecars import copy_move_sidecars
+from .posters import carry_poster_with_sieve, parse_range_pair  # optional; default off
+from .pipeline import Deferred, run_staged
+from .snapshot import Snapshot
+from .watch import affected_items, batches, open_watcher
+
+# Held by organise() and watch() for the length of a run; see the module docstring.
+_run_lock = threading.RLock()
+
+# Seconds between saves of the library index and ledger in --watch.
+_WATCH_SAVE_EVERY = 60.0
+
+# Outcome for a video left alone because it was still being written; the
+# other decisions are the ledger's (placed, duplicate, library-duplicate, ...).
+UNSTABLE = "unstable"
+
+
+@dataclass
+class OrganiseConfig:
+    """
+    Settings for one organise run; each field is the CLI option of the same name.
+
+    ``dest`` defaults to ``source`` (organise in place). ``fingerprint_cache``
+    is where the SQLite fingerprint store lives, not a cache object; pass an
+    open :class:`~media_organiser.fingerprints.FingerprintCache` to
+    :func:`organise` to share one between runs.
+    """
+    source: Union[str, Path]
+    dest: Union[str, Path, None] = None
+    mode: str = "move"
+    dry_run: bool = False
+    verify: bool = False
+    dupe_mode: str = "hash"
+    no_import_dedupe: bool = False
+    rebuild_index: bool = False
+    reconsider: bool = False
+    emit_nfo: str = "all"
+    nfo_layout: str = "same-stem"
+    overwrite_nfo: bool = False
+    localhash_scheme: str = localhash.CURRENT.key
+    carry_posters: str = "off"
+    poster_min_wh: str = "600x900"
+    poster_aspect: str = "0.66-0.75"
+    poster_keywords: str = "yify,yts,rarbg,ettv,yifytorrent,yify-movie"
+    stability: str = "size-mtime"
+    stable_interval: float = 1.0
+    min_age: float = 0.0
+    fingerprint_cache: Optional[str] = None
+    no_fingerprint_cache: bool = False
+    jobs: int = 4
+    stream: bool = False
+    stream_batch: int = 256
+    device_jobs: str = "hdd=1,ssd=4,other=2"
+    # --watch only
+    debounce: float = 5.0
+    watch_backend: str = "auto"
+    poll_interval: float = 5.0
+
+    def validate(self) -> tuple[str, ...]:
+        """Check the settings that can be wrong; returns the stability checks. Raises ValueError."""
+        if self.mode not in TRANSFER_MODES:
+            raise ValueError(f"unknown mode {self.mode!r}; expected one of {', '.join(TRANSFER_MODES)}")
+        if self.stream_batch < 1:
+            raise ValueError("--stream-batch must be at least 1")
+        if self.device_jobs != "off":
+            parse_device_jobs(self.device_jobs)
+        return parse_strategies(self.stability)
+
+    def roots(self) -> tuple[Path, Path]:
+        """The source and destination roots, absolute."""
+        src_root = Path(self.source).expanduser().resolve()
+        dest_root = Path(self.dest).expanduser().resolve() if self.dest else src_root
+        return src_root, dest_root
+
+
+@dataclass
+class FileOutcome:
+    """What one run did with one import video."""
+    source: Path
+    decision: str                          # placed, duplicate, library-duplicate, batch-duplicate, sample or unstable
+    bytes: int = 0
+    destination: Optional[Path] = None     # where it was placed (or would be, in a dry run)
+    method: Optional[str] = None           # rename, copy, hardlink, reflink, symlink or dry-run
+    duplicate_of: Optional[Path] = None    # the file that made it a duplicate
+    nfo: Optional[Path] = None             # the NFO describing it, written or kept
+    subtitles: list[Path] = field(default_factory=list)  # subtitles placed beside it
+
+
+@dataclass
+class RunReport:
+    """Every outcome of a run (or of one ``watch`` batch), in the order they were decided."""
+    source: Path
+    dest: Path
+    outcomes: list[FileOutcome] = field(default_factory=list)
+    already_decided: int = 0   # unchanged files the ledger had decided before; see --reconsider
+    elapsed: float = 0.0
+    # The index the run checked and updated; pass it to the next call to skip rebuilding it.
+    library_index: Optional[LibraryImportDupIndex] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def _add(self, outcome: FileOutcome) -> None:
+        with self._lock:
+            self.outcomes.append(outcome)
+
+    def by_decision(self, decision: str) -> list[FileOutcome]:
+        return [o for o in self.outcomes if o.decision == decision]
+
+    @property
+    def placed(self) -> list[FileOutcome]:
+        return self.by_decision(ledger_mod.PLACED)
+
+    @property
+    def unstable(self) -> list[Path]:
+        return [o.source for o in self.by_decision(UNSTABLE)]
+
+    def counts(self) -> dict[str, int]:
+        return dict(Counter(o.decision for o in self.outcomes))
+
+
+def organise(
+    config: OrganiseConfig,
+    *,
+    library_index: Optional[LibraryImportDupIndex] = None,
+    fingerprint_cache: Optional[fingerprints.FingerprintCache] = None,
+) -> RunReport:
+    """
+    Organise everything under ``config.source`` once and report what happened.
+
+    ``library_index`` is an index over ``dest``'s library built for
+    ``config.dupe_mode`` — :attr:`RunReport.library_index` from an earlier
+    call, or :func:`~media_organiser.duplicates.build_library_import_dup_index`
+    — used instead of loading and revalidating the saved one.
+    ``fingerprint_cache`` is used instead of opening the one ``config`` names;
+    the caller keeps ownership and closes it. Raises ValueError for bad settings.
+    Waits for any run already going in another thread.
+    """
+    stability = config.validate()
+    src_root, dest_root = config.roots()
+    started = time.monotonic()
+    with _run_lock, _fingerprints(config, dest_root, fingerprint_cache):
+        session = _open_session(config, src_root, dest_root, stability, library_index)
+        report = _report_for(session)
+        with _batch_state() as snap:
+            _organise_tree(config, session, snap, report)
+            _report_snapshot(snap)
+        _close_session(config, session)
+    report.elapsed = round(time.monotonic() - started, 3)
+    return report
+
+
+def watch(
+    config: OrganiseConfig,
+    *,
+    library_index: Optional[LibraryImportDupIndex] = None,
+    fingerprint_cache: Optional[fingerprints.FingerprintCache] = None,
+    on_batch: Optional[Callable[[RunReport], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Organise the source once, then each burst of changes under it, until ``stop`` is set.
+
+    ``on_batch`` is given the :class:`RunReport` of the first pass and of
+    every batch after it. The other arguments are as for :func:`organise`.
+    """
+    stability = config.validate()
+    src_root, dest_root = config.roots()
+    with _run_lock, _fingerprints(config, dest_root, fingerprint_cache):
+        session = _open_session(config, src_root, dest_root, stability, library_index)
+        _watch(config, session, stop=stop, on_batch=on_batch)
+
+
+@contextmanager
+def _fingerprints(
+    config: OrganiseConfig, dest_root: Path, cache: Optional[fingerprints.FingerprintCache]
+) -> Iterator[Optional[fingerprints.FingerprintCache]]:
+    """Install ``cache`` for the run, or open (and afterwards close) the one ``config`` asks for."""
+    owned = None
+    if cache is None and not config.no_fingerprint_cache:
+        cache_path = (
+            Path(config.fingerprint_cache).expanduser()
+            if config.fingerprint_cache
+            else dest_root / STATE_DIR_NAME / fingerprints.CACHE_NAME
+        )
+        try:
+            owned = cache = fingerprints.FingerprintCache(cache_path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[warn] fingerprint cache unavailable, hashing uncached: {e}")
+    previous = fingerprints.install(cache)
+    try:
+        yield cache
+        if owned is not None:
+            if not config.dry_run:
+                owned.maybe_evict()
+            st = owned.stats()
+            print(f"FINGERPRINT CACHE: {st['hits']} hits, {st['misses']} misses, {st['evicted']} evicted")
+    finally:
+        fingerprints.install(previous)
+        if owned is not None:
+            owned.close()
+
+
+@dataclass
+class _Session:
+    """What one organiser process keeps between batches: roots, settings and the warm library index."""
+    src_root: Path
+    dest_root: Path
+    movies_root: Path
+    tv_root: Path
+    stability: tuple[str, ...]
+    lib_import_index: Optional[LibraryImportDupIndex]
+    index_path: Path
+    ledger: ImportLedger
+    min_w: int
+    min_h: int
+    aspect_lo: float
+    aspect_hi: float
+    bad_words: list[str]
+
+
+def _open_session(
+    args, src_root: Path, dest_root: Path, stability: tuple[str, ...],
+    library_index: Optional[LibraryImportDupIndex] = None,
+) -> _Session:
+    movies_root = dest_root / "movies"
+    tv_root     = dest_root / "tv"
+    movies_root.mkdir(parents=True, exist_ok=True)
+    tv_root.mkdir(parents=True, exist_ok=True)
+
+    lib_import_index = None
+    index_path = dest_root / STATE_DIR_NAME / INDEX_NAME
+    if args.dupe_mode != "off" and not args.no_import_dedupe:
+        if library_index is not None:
+            if library_index.mode != args.dupe_mode:
+                raise ValueError(
+                    f"library index was built for --dupe-mode {library_index.mode}, not {args.dupe_mode}"
+                )
+            lib_import_index = library_index
+        else:
+            with profiling.timed("index"):
+                lib_import_index = build_library_import_dup_index(
+                    movies_root, tv_root, args.dupe_mode, state_path=index_path, rebuild=args.rebuild_index
+                )
+
+    ledger = ImportLedger(dest_root / STATE_DIR_NAME / LEDGER_NAME, journal=not args.dry_run)
+
+    # Poster sieve config
+    min_w, min_h = map(int, args.poster_min_wh.lower().split("x"))
+    aspect_lo, aspect_hi = parse_range_pair(args.poster_aspect, "-", float)
+    bad_words = [w.strip().lower() for w in args.poster_keywords.split(",") if w.strip()]
+    return _Session(
+        src_root, dest_root, movies_root, tv_root, stability, lib_import_index, index_path, ledger,
+        min_w, min_h, aspect_lo, aspect_hi, bad_words,
+    )
+
+
+def _close_session(args, session: _Session) -> None:
+    """Save the library index and ledger, each only if it changed."""
+    if args.dry_run:
+        return
+    if session.lib_import_index is not None and session.lib_import_index.dirty:
+        try:
+            session.lib_import_index.save(session.index_path)
+        except OSError as e:
+            print(f"[warn] could not save library index {session.index_path}: {e}")
+    try:
+        session.ledger.save()
+    except OSError as e:
+        print(f"[warn] could not save import ledger {session.ledger.path}: {e}")
+
+
+def _organise_tree(args, session: _Session, snap: Snapshot, report: Optional[RunReport] = None) -> list[Path]:
+    """
+    Organise everything under the source root; returns the videos still being written.
+
+    One batch over the whole tree, or with ``--stream`` a few directories at a
+    time in walk order: each batch is organised once it holds
+    ``--stream-batch`` videos, and the listings of directories already dealt
+    with are dropped, so memory follows the largest directory rather than the
+    tree and the first files move before the walk is over.
+    """
+    if not args.stream:
+        with profiling.timed("walk"):
+            items = snap.walk(session.src_root)
+        session.ledger.retain(items)
+        return _organise(args, session, items, report=report)
+
+    unstable: list[Path] = []
+    known: list[Path] = []   # what the ledger still needs to hear is present
+    episodes: dict = {}      # batch duplicate tracking spans the whole walk
+    batch: list[Path] = []
+    batch_dirs: list[Path] = []
+
+    def flush() -> None:
+        if batch:
+            unstable.extend(_organise(args, session, batch, episodes, report))
+        for d in batch_dirs:
+            snap.forget(d)
+        batch.clear()
+        batch_dirs.clear()
+
+    for d, paths in snap.walk_dirs(session.src_root):
+        videos = [p for p in paths if p.suffix.lower() in VIDEO_EXTS]
+        known.extend(p for p in videos if p in session.ledger)
+        if not videos:
+            snap.forget(d)
+            continue
+        batch.extend(videos)
+        batch_dirs.append(d)
+        if len(batch) >= args.stream_batch:
+            flush()
+    flush()
+    session.ledger.retain(known)
+    return unstable
+
+
+@contextmanager
+def _batch_state() -> Iterator[Snapshot]:
+    """Install a fresh directory snapshot and destination index for one batch."""
+    previous = duplicates.install_dest_index(DestDirIndex())
+    previous_ladder = duplicates.install_ladder(DupeLadder())
+    try:
+        with snapshot.installed(Snapshot()) as snap:
+            yield snap
+        _report_ladder(duplicates.install_ladder(None))
+    finally:
+        duplicates.install_dest_index(previous)
+        duplicates.install_ladder(previous_ladder)
+
+
+def _report_snapshot(snap: Snapshot) -> None:
+    c = snap.counters()
+    print(f"SNAPSHOT: {c['scans']} directory listings, {c['stats']} stats, {c['lookups']} lookups answered from memory")
+
+
+def _report_ladder(ladder: DupeLadder) -> None:
+    if not ladder.used():
+        return
+    st = ladder.stats()
+    rungs = ", ".join(f"{stage} {st['rejected'][stage]}/{st['checked'][stage]}" for stage in LADDER_STAGES)
+    print(
+        f"DUPE LADDER: rejected at {rungs}; {st['confirmed']} confirmed; "
+        f"read {_mib(st['bytes_read'])}, saved {_mib(st['bytes_saved'])}"
+    )
+
+
+def _mib(n: int) -> str:
+    return f"{n / (1 << 20):.1f} MiB"
+
+
+def _watch(
+    args, session: _Session, watcher=None, stop: Optional[threading.Event] = None,
+    on_batch: Optional[Callable[[RunReport], None]] = None,
+) -> None:
+    """
+    Organise the whole source once, then each burst of changes as it settles.
+
+    The library index and fingerprint cache stay open across batches, so a new
+    upload costs a look at its own folder rather than a walk of both trees.
+    Runs until ``stop`` is set, SIGTERM arrives or the user hits Ctrl-C.
+    """
+    # The organiser's own moves into movies/ and tv/ (source == dest) and its
+    # state files are not news.
+    exclude = [session.movies_root, session.tv_root, session.dest_root / STATE_DIR_NAME]
+    if watcher is None:
+        watcher = open_watcher(session.src_root, args.watch_backend, args.poll_interval)
+    print(f"[watch] {session.src_root} ({type(watcher).__name__})")
+    retry: set[Path] = set()
+    last_saved = float("-inf")
+
+    def batch_done(report: RunReport, started: float) -> None:
+        nonlocal last_saved
+        # Saving rewrites the whole index and ledger, so a burst of small batches
+        # saves once a while; the ledger's journal keeps placements safe meanwhile.
+        if time.monotonic() - last_saved >= _WATCH_SAVE_EVERY:
+            _close_session(args, session)
+            last_saved = time.monotonic()
+        report.elapsed = round(time.monotonic() - started, 3)
+        if on_batch is not None:
+            on_batch(report)
+
+    previous_sigterm = None
+    if stop is None:
+        stop = threading.Event()
+        # Only the main thread may set handlers; elsewhere the caller owns shutdown.
+        if threading.current_thread() is threading.main_thread():
+            previous_sigterm = signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            if previous_sigterm is None:  # set outside Python; the default is the nearest we can restore
+                previous_sigterm = signal.SIG_DFL
+    try:
+        # Each batch gets a fresh snapshot: between batches the world moves on.
+        started, report = time.monotonic(), _report_for(session)
+        with _batch_state() as snap:
+            retry.update(_organise_tree(args, session, snap, report))
+            _report_snapshot(snap)
+        batch_done(report, started)
+        for changed in batches(watcher, args.debounce, stop=stop, retry=retry):
+            items = affected_items(session.src_root, changed, exclude)
+            if not items:
+                continue
+            print(f"[watch] {len(changed)} change(s), {len(items)} path(s) to look at")
+            started, report = time.monotonic(), _report_for(session)
+            with _batch_state() as snap:
+                retry.update(_organise(args, session, items, report=report))
+                _report_snapshot(snap)
+            batch_done(report, started)
+            cache = fingerprints.active()
+            if cache is not None:
+                cache.flush()
+            log = events.active()
+            if log is not None:
+                log.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, previous_sigterm)
+        watcher.close()
+        _close_session(args, session)
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    """Whether ``a`` and ``b`` are one file: a hardlink, or a symlink resolving to it."""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _report_for(session: _Session) -> RunReport:
+    return RunReport(session.src_root, session.dest_root, library_index=session.lib_import_index)
+
+
+@dataclass
+class _Plan:
+    """Where one video goes, decided from its name before anything is touched."""
+    path: Path
+    quality: str
+    target_dir: Path
+    out_file: Path
+    series: Optional[str] = None  # set for episodes; None for movies
+    season: int = 0
+    episode: int = 0
+    episode_to: Optional[int] = None
+    movie_name: str = ""
+    used_nfo: Optional[Path] = None
+    year: Optional[str] = None
+    durations: dict = field(default_factory=dict)  # stage -> seconds, for the event log
+
+
+def _organise(
+    args, session: _Session, items: list[Path], episodes: Optional[dict] = None,
+    report: Optional[RunReport] = None,
+) -> list[Path]:
+    """
+    Classify, dedupe, move and describe every video among ``items``.
+
+    ``items`` is the whole source tree for a one-off run, a stretch of it when
+    streaming, or just the folders a watcher saw change; ``episodes`` carries
+    the batch's duplicate-episode tracking across stretches. Each video's
+    outcome is added to ``report``. Returns the videos held back as still
+    being written, so a watcher can look at them again.
+    """
+    src_root, dest_root = session.src_root, session.dest_root
+    movies_root, tv_root = session.movies_root, session.tv_root
+    lib_import_index = session.lib_import_index
+    ledger = session.ledger
+    min_w, min_h = session.min_w, session.min_h
+    aspect_lo, aspect_hi = session.aspect_lo, session.aspect_hi
+    bad_words = session.bad_words
+
+    # Track files being processed in this batch to detect duplicates
+    tv_episodes_processing = episodes if episodes is not None else {}  # (series, season, episode) -> list of paths
+
+    # Pre-scan: group videos per directory so we can distinguish a single-movie folder
+    # from a container (several distinct movies, e.g. a "James Bond" folder) and from a
+    # loose numbered series (e.g. "BUZZYBEE-1..13"). Container folders take their title
+    # from each filename; numbered-series folders are routed to /tv as episodes.
+    dir_videos = defaultdict(list)
+    for p in items:
+        if p.suffix.lower() not in VIDEO_EXTS or not snapshot.is_file(p):
+            continue
+        if any(part in IGNORED_PATH_COMPONENTS for part in p.parts):
+            continue
+        dir_videos[p.parent].append(p)
+
+    numbered_series = {}    # path -> (series, season, episode)
+    container_dirs = set()  # dirs holding >1 distinct movie -> title from filename
+    for d, vids in dir_videos.items():
+        if count_distinct_movies(vids) > 1:
+            container_dirs.add(d)
+        if d == src_root:
+            continue  # never treat the source root (a dumping ground) as one series
+        ser = detect_numbered_series(vids)
+        if ser:
+            series_name = _clean_title(d.name) or ser["series"]
+            for vp, ep in ser["episodes"].items():
+                numbered_series[vp] = (series_name, 1, ep)
+
+    candidates = []
+    seen_as: dict[Path, os.stat_result] = {}  # the state each decision below is recorded against
+    already_decided = 0
+    for path in items:
+        if path.suffix.lower() not in VIDEO_EXTS: continue
+        if not snapshot.is_file(path): continue
+        if any(part in IGNORED_PATH_COMPONENTS for part in path.parts):
+            continue
+        # skip items already in /movies or /tv under dest
+        if dest_root in path.parents and (movies_root in path.parents or tv_root in path.parents):
+            continue
+        try:
+            st = snapshot.stat(path)
+        except OSError:
+            continue
+        # unchanged since an earlier run decided what to do with it
+        if not args.reconsider and ledger.decision(path, st) is not None:
+            already_decided += 1
+            continue
+        # skip obvious samples
+        if re.search(r"(?i)\bsample\b", path.name):
+            ledger.record(path, st, ledger_mod.SAMPLE)
+            events.emit("sample", source=str(path), bytes=st.st_size)
+            if report is not None:
+                report._add(FileOutcome(path, ledger_mod.SAMPLE, st.st_size))
+            continue
+        seen_as[path] = st
+        candidates.append(path)
+    if report is not None:
+        report.already_decided += already_decided
+    if already_decided:
+        print(f"LEDGER: {already_decided} unchanged import file(s) already decided; --reconsider to look again")
+
+    # skip incomplete uploads (e.g., vsftpd client still writing); skip check in dry-run for speed.
+    # Every candidate shares one wait, so the gate costs one interval per run, not per file.
+    unstable: list[Path] = []
+    if not args.dry_run and candidates:
+        with profiling.timed("stability"):
+            candidates, unstable = partition_stable(
+                candidates,
+                session.stability,
+                StabilityCheck(interval=args.stable_interval, min_age=args.min_age),
+            )
+        for path in unstable:
+            print(f"[skip] file not stable or still growing: {path}")
+            events.emit("unstable", source=str(path))
+            if report is not None:
+                report._add(FileOutcome(path, UNSTABLE, seen_as[path].st_size))
+
+    def plan(path: Path) -> _Plan:
+        started = time.perf_counter()
+        pl = classify(path)
+        pl.durations["classify"] = time.perf_counter() - started
+        return pl
+
+    def classify(path: Path) -> _Plan:
+        """Where ``path`` goes; names only, nothing is created or moved."""
+        quality = detect_quality(path.name)
+        if path in numbered_series:
+            series_name, forced_season, forced_ep = numbered_series[path]
+            is_tv, info = True, {"series": series_name, "season": forced_season, "ep1": forced_ep, "ep2": None}
+        else:
+            is_tv, info = is_tv_episode(path.name, path)
+
+        if is_tv:
+            series = _clean_title(info["series"])
+
+            s_no = info["season"]
+            e_no = info["ep1"]
+            e2 = info.get("ep2")
+            ep_tag = f"S{s_no:02d}E{e_no:02d}" + (f"-E{e2:02d}" if e2 and e2 != e_no else "")
+            season_folder = "Specials" if s_no == 0 else f"Season {s_no:02d}"
+            season_dir = tv_root / series / season_folder
+            out_file = season_dir / f"{series} - {ep_tag} ({quality}){path.suffix.lower()}"
+            return _Plan(path, quality, season_dir, out_file, series=series, season=s_no, episode=e_no, episode_to=e2)
+
+        movie_name, used_nfo = guess_movie_name(path, src_root, parent_is_container=path.parent in container_dirs)
+        # Prefer (YYYY) over bare year in title (e.g. Blade Runner 2049)
+        year_guess = guess_year_for_movie(path)
+        part_suffix = movie_part_suffix(path)
+        # Base title without trailing (year)/[quality] so we add them once
+        folder_name = normalise_movie_title_for_display(movie_name)
+        full_name = f"{folder_name} {f'({year_guess}) ' if year_guess else ''}[{quality}]{part_suffix}"
+        out_dir = movies_root / folder_name
+        out_file = out_dir / f"{full_name}{path.suffix.lower()}"
+        return _Plan(path, quality, out_dir, out_file, movie_name=movie_name, used_nfo=used_nfo, year=year_guess)
+
+    def place(pl: _Plan):
+        """
+        Dedupe and transfer one planned video, in input order.
+
+        Returns the job that fingerprints it and writes its NFO, or None. With
+        device lanes, the decisions are made here and the transfer is returned
+        as a Deferred for the file's devices; the job it returns in turn runs
+        in the describe pool, not on the lane.
+        """
+        path = pl.path
+        if lanes is not None:
+            # What an earlier file still moving could change about the checks below:
+            # its folder, and the library index entries its size and name will make.
+            lanes.settle((("dir", pl.target_dir), ("size", seen_as[path].st_size),
+                          ("name", normalized_stem_ignore_quality(path))))
+        with events.timed(pl.durations, "dedupe"):
+            skipped = dedupe(pl)
+        if skipped is not None:
+            decision, match = skipped
+            decided(pl, decision, match=match)
+            return None
+
+        if lanes is None or args.dry_run:
+            return finish(pl)
+        devices = (seen_as[path].st_dev, device_of(pl.target_dir))
+        holds = (("dir", pl.target_dir), ("size", seen_as[path].st_size),
+                 ("name", normalized_stem_ignore_quality(pl.out_file)))
+        return Deferred(devices, lambda: finish(pl), holds)
+
+    def decided(
+        pl: _Plan, decision: str, match: Optional[Path] = None,
+        placed: Optional[TransferResult] = None, subs: Optional[list] = None, nfo: Optional[Path] = None,
+    ) -> None:
+        size = seen_as[pl.path].st_size
+        fields: dict = {}
+        if match is not None:
+            fields["duplicate_of"] = str(match)
+        if placed is not None:
+            fields.update(destination=str(placed.path), sidecars=len(subs or ()))
+        profiling.add_stages(pl.durations)
+        events.emit(decision, pl.durations, source=str(pl.path), bytes=size,
+                    mode=args.mode, dupe_mode=args.dupe_mode, **fields)
+        if report is None:
+            return
+        outcome = FileOutcome(pl.path, decision, size, duplicate_of=match, nfo=nfo)
+        if placed is not None:
+            outcome.destination, outcome.method = placed.path, placed.method
+            outcome.subtitles = [placed.path.with_name(sub["file"]) for sub in subs or () if sub.get("file")]
+        report._add(outcome)
+
+    def dedupe(pl: _Plan) -> Optional[tuple[str, Path]]:
+        """The duplicate check that keeps ``pl`` out of the library, as ``(decision, match)``; None to place it."""
+        path = pl.path
+        if lib_import_index is not None:
+            with index_lock:
+                lib_match = lib_import_index.find_duplicate(path)
+            if lib_match is not None and (args.mode in LINK_MODES or _same_file(path, lib_match)):
+                # The library entry may be this very file (a link to it): deleting the
+                # import would leave the library pointing at nothing. Keep it.
+                print(f"SKIP DUPLICATE IMPORT: {path} -> already in library as {lib_match} [{args.dupe_mode}]")
+                ledger.record(path, seen_as[path], ledger_mod.LIBRARY_DUPLICATE, str(lib_match))
+                return ledger_mod.LIBRARY_DUPLICATE, lib_match
+            if lib_match is not None:
+                print(
+                    f"REMOVED DUPLICATE IMPORT: {path} -> already in library as {lib_match} [{args.dupe_mode}]"
+                )
+                if not args.dry_run:
+                    try:
+                        path.unlink(missing_ok=True)
+                        snapshot.removed(path)
+                    except OSError as e:
+                        print(f"[warn] could not remove duplicate import {path}: {e}")
+                        ledger.record(path, seen_as[path], ledger_mod.LIBRARY_DUPLICATE, str(lib_match))
+                    if args.mode == "move":
+                        pruner.touch(path.parent)
+                return ledger_mod.LIBRARY_DUPLICATE, lib_match
+
+        snapshot.makedirs(pl.target_dir)
+        if pl.series is not None:
+            # Check for duplicates in the same batch; skip second and later copies
+            episode_key = (pl.series.lower(), pl.season, pl.episode)
+            if episode_key in tv_episodes_processing:
+                existing_paths = tv_episodes_processing[episode_key]
+                print(f"[WARNING] Potential duplicate in batch: {path} (same episode as {existing_paths})")
+                ledger.record(path, seen_as[path], ledger_mod.BATCH_DUPLICATE, str(existing_paths[0]))
+                tv_episodes_processing[episode_key].append(path)
+                return ledger_mod.BATCH_DUPLICATE, existing_paths[0]
+            tv_episodes_processing[episode_key] = [path]
+
+        if args.dupe_mode != "off":  # noqa
+            dup = is_duplicate_in_dir(path, pl.target_dir, args.dupe_mode)
+            if dup:
+                print(f"SKIP DUPLICATE: {path} == {dup} [{args.dupe_mode}]")
+                ledger.record(path, seen_as[path], ledger_mod.DUPLICATE, str(dup))
+                return ledger_mod.DUPLICATE, dup
+        return None
+
+    def finish(pl: _Plan):
+        """Transfer a video place() decided to keep, with its sidecars and posters."""
+        path = pl.path
+        is_tv = pl.series is not None
+        # safe_path may rename on collision; everything below must follow the real file
+        with events.timed(pl.durations, "transfer"):
+            placed = transfer(path, pl.out_file, args.mode, args.dry_run, pl.quality, verify=args.verify)
+        out_file = placed.path
+        if args.mode != "move":
+            # Still in the inbox; without this the next run finds it in the library and deletes it.
+            ledger.record(path, seen_as[path], ledger_mod.PLACED, str(out_file))
+        if lib_import_index is not None and not args.dry_run:
+            with index_lock:
+                lib_import_index.add(out_file)
+        with events.timed(pl.durations, "sidecar"):
+            # Read source NFO before moving sidecars (sidecars include .nfo and get moved)
+            src_nfo = find_nfo(path) if is_tv else pl.used_nfo
+            base_meta_from_src = merge_first({}, read_nfo_to_meta(src_nfo)) if src_nfo else {}
+            subs = copy_move_sidecars(path, out_file, do_move_or_copy, args.mode, args.dry_run)
+
+            # optional: carry posters through sieve
+            if not is_tv and args.carry_posters != "off":
+                carry_poster_with_sieve(
+                    src_context=path, dst_dir=pl.target_dir, policy=args.carry_posters,
+                    min_w=min_w, min_h=min_h, aspect_lo=aspect_lo, aspect_hi=aspect_hi, bad_words=bad_words,
+                    mover=do_move_or_copy, mode=args.mode, dry_run=args.dry_run
+                )
+
+        if args.mode == "move" and not args.dry_run:
+            pruner.touch(path.parent)
+
+        if args.dry_run or args.emit_nfo not in (("tv", "all") if is_tv else ("movie", "all")):
+            decided(pl, ledger_mod.PLACED, placed=placed, subs=subs)
+            return None
+
+        def describe_and_record() -> None:
+            with events.timed(pl.durations, "nfo"):
+                nfo = describe(pl, out_file, placed.fingerprint, base_meta_from_src, subs)
+            decided(pl, ledger_mod.PLACED, placed=placed, subs=subs, nfo=nfo)
+        return describe_and_record
+
+    def describe(pl: _Plan, out_file: Path, fingerprint, base_meta: dict, subs: list) -> Path:
+        """Fingerprint the placed file and write its NFO; runs in the worker pool. Returns the NFO's path."""
+        path = pl.path
+        # A copy was fingerprinted as it streamed past; only a rename or link is read here.
+        scheme = localhash.get(args.localhash_scheme) or localhash.CURRENT
+        if scheme == localhash.LEGACY:
+            size, digest = fingerprint or quick_fingerprint(out_file)
+        else:
+            size, digest = scheme.fingerprint(out_file)
+        if pl.series is not None:
+            s_no, e_no, e2 = pl.season, pl.episode, pl.episode_to
+            computed = {
+                "scope":"tv",
+                "showtitle": pl.series,
+                "season": s_no,
+                "episode": e_no,
+                "episode_to": e2,
+                "title": f"{pl.series} S{s_no:02d}E{e_no:02d}" + (f"-E{e2:02d}" if e2 and e2 != e_no else ""),
+                "quality": pl.quality,
+                "extension": out_file.suffix.lstrip(".").lower(),
+                "size": size,
+                "uniqueid_localhash": digest,
+                "uniqueid_localhash_scheme": scheme.key,
+                "filenameandpath": str(out_file),
+                "originalfilename": path.name,
+                "sourcepath": str(path),
+                "subtitles": subs,
+            }
+            scope, write_nfo = "tv", write_episode_nfo
+        else:
+            computed = {
+                "scope":"movie",
+                "title": pl.movie_name,
+                "year": pl.year,
+                "quality": pl.quality,
+                "extension": out_file.suffix.lstrip(".").lower(),
+                "size": size,
+                "uniqueid_localhash": digest,
+                "uniqueid_localhash_scheme": scheme.key,
+                "filenameandpath": str(out_file),
+                "originalfilename": path.name,
+                "sourcepath": str(path),
+                "subtitles": subs,
+            }
+            scope, write_nfo = "movie", write_movie_nfo
+        dest_nfo = nfo_path_for(out_file, scope, args.nfo_layout)
+        if snapshot.exists(dest_nfo):
+            base_meta = merge_first(base_meta, read_nfo_to_meta(dest_nfo))
+        if "subtitles" in base_meta or subs:
+            base_meta["subtitles"] = merge_subtitles(base_meta.get("subtitles"), subs)
+        write_nfo(out_file, computed, base_meta, overwrite=args.overwrite_nfo, layout=args.nfo_layout)
+        return dest_nfo
+
+    # Which folders hold a lone video, and the NFO that speaks for it, as the
+    # batch found them; naming and NFO lookup read this instead of walking.
+    census = FolderCensus.survey(candidates)
+    # Planning a video may read its own NFO, which placing an earlier video
+    # from the same folder could carry off as a sidecar; same-folder files
+    # are therefore planned one placement at a time.
+    # Folders emptied by the moves are pruned once, deepest first, after the batch.
+    pruner = Pruner(src_root, bad_words)
+    # Transfers run on per-device lanes: one stream per spinning disk, several
+    # per SSD, concurrently across disks; decisions above stay in input order.
+    lanes = None if args.device_jobs == "off" else DeviceScheduler(parse_device_jobs(args.device_jobs))
+    index_lock = threading.Lock()
+    previous_census = install_census(census)
+    try:
+        with profiling.timed("organise"):
+            run_staged(candidates, plan, place, jobs=args.jobs, key=lambda p: p.parent, lanes=lanes)
+    finally:
+        if lanes is not None:
+            lanes.close()
+        install_census(previous_census)
+        pruned: dict = {}
+        with events.timed(pruned, "prune"):
+            removed = pruner.run()
+        events.emit("prune", pruned, folders=removed)
+        profiling.add_stages(pruned)
+
+    return unstable
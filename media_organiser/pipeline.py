@@ -0,0 +1,246 @@
+"""Staged execution of the per-file organise loop.
+
+Organising one video is three steps with very different costs: working out
+where it goes (string work on the name, perhaps a small NFO read), putting it
+there (a rename, or a copy that can take minutes off a USB disk), and
+describing it (fingerprinting the result and writing its NFO, which reads from
+the library disk). Run back to back, the copy and the hashing alternate; here
+they overlap:
+
+* **plan** runs in a feeder thread, ahead of placement, in input order;
+* **place** runs on the calling thread, strictly in input order, so every
+  decision that depends on earlier files — batch duplicate bookkeeping, the
+  collision suffix ``safe_path`` picks, the library index — is made exactly as
+  in a serial run;
+* **describe** jobs returned by ``place`` run in a pool of ``jobs`` threads.
+
+``place`` may instead return a :class:`Deferred`: the decisions are made, and
+the transfer itself is handed to a device scheduler
+(:class:`~media_organiser.devices.DeviceScheduler`), so files on different
+disks move at the same time while files sharing a disk queue up. The describe
+job a transfer returns goes to the same pool as any other, so a device slot is
+never held for work that moves no bytes.
+
+Queues between the stages are bounded, so neither planning nor describing runs
+arbitrarily far ahead of the files actually placed. Everything a file prints is
+held back and written out in input order once the file is finished, so the log
+reads the same as a serial run's whatever the interleaving.
+"""
+from __future__ import annotations
+
+import io
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Hashable, Iterable, Iterator, Optional, TypeVar, Union
+
+T = TypeVar("T")
+P = TypeVar("P")
+
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class Deferred:
+    """
+    What ``place`` returns to have the rest of a file's work run on its device lane.
+
+    ``run`` moves the file and returns its describe job, if any, which then
+    runs in the describe pool. ``holds`` stay in force until the move has finished.
+    """
+    devices: tuple[int, ...]
+    run: Callable[[], Optional[Callable[[], None]]]
+    holds: tuple[Hashable, ...] = ()
+
+
+class _RoutedStdout:
+    """``sys.stdout`` stand-in that sends each thread's writes to its own buffer, when it has one."""
+
+    def __init__(self, real) -> None:
+        self._real = real
+        self._local = threading.local()
+
+    @contextmanager
+    def capture(self, buf: io.StringIO) -> Iterator[None]:
+        previous = getattr(self._local, "buf", None)
+        self._local.buf = buf
+        try:
+            yield
+        finally:
+            self._local.buf = previous
+
+    def write(self, s: str) -> int:
+        buf = getattr(self._local, "buf", None)
+        return (buf if buf is not None else self._real).write(s)
+
+    def flush(self) -> None:
+        if getattr(self._local, "buf", None) is None:
+            self._real.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+
+def run_staged(
+    items: Iterable[T],
+    plan: Callable[[T], P],
+    place: Callable[[P], Union[Deferred, Callable[[], None], None]],
+    jobs: int = 1,
+    depth: Optional[int] = None,
+    key: Optional[Callable[[T], Hashable]] = None,
+    lanes=None,
+) -> None:
+    """
+    ``place(plan(item))`` for every item in order, then the job it returns in a pool.
+
+    ``key(item)`` names what planning reads that placing may change — the
+    source folder, whose NFOs and sidecars move with each video. An item is
+    not planned while an earlier item with the same key is still waiting to be
+    placed — or, when ``place`` deferred it to ``lanes``, until it has been moved.
+    A :class:`Deferred` with no ``lanes`` runs on the calling thread. Exceptions
+    from any stage stop the run and are re-raised here.
+
+    ``sys.stdout`` is replaced for the length of the call, so only one staged
+    run may be going in a process; :func:`~media_organiser.organiser.organise`
+    sees to that.
+    """
+    items = list(items)
+    jobs = max(1, jobs)
+    depth = depth or 2 * jobs
+    real = sys.stdout
+    routed = _RoutedStdout(real)
+    planned: "queue.Queue" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    gate = threading.Condition()
+    unplaced: dict[Hashable, int] = {}
+
+    def put(entry) -> None:
+        while not stop.is_set():
+            try:
+                planned.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def feed() -> None:
+        try:
+            for item in items:
+                k = key(item) if key is not None else None
+                if k is not None:
+                    with gate:
+                        gate.wait_for(lambda: stop.is_set() or not unplaced.get(k))
+                        unplaced[k] = unplaced.get(k, 0) + 1
+                if stop.is_set():
+                    return
+                buf = io.StringIO()
+                try:
+                    with routed.capture(buf):
+                        result, error = plan(item), None
+                except BaseException as e:  # handed to the main thread
+                    result, error = None, e
+                put((k, buf, result, error))
+                if error is not None:
+                    return
+        finally:
+            put(_DONE)
+
+    pending: deque[tuple[io.StringIO, Optional[Future]]] = deque()
+
+    def emit(block: bool) -> None:
+        while pending:
+            buf, fut = pending[0]
+            if fut is not None:
+                if not block and not fut.done():
+                    return
+                fut.result()
+            pending.popleft()
+            real.write(buf.getvalue())
+            block = block and len(pending) > depth
+
+    def describe(buf: io.StringIO, job: Callable[[], None]) -> None:
+        with routed.capture(buf):
+            job()
+
+    def carry(buf: io.StringIO, deferred: Deferred) -> Optional[Callable[[], None]]:
+        with routed.capture(buf):
+            return deferred.run()
+
+    def then_describe(buf: io.StringIO, moved: Future, pool: ThreadPoolExecutor) -> Future:
+        # Done once the lane's transfer and then the describe job it returned have both run.
+        done: Future = Future()
+
+        def settle(step: Future) -> None:
+            if done.set_running_or_notify_cancel():
+                try:
+                    done.set_result(step.result())
+                except BaseException as e:  # handed to the main thread
+                    done.set_exception(e)
+
+        def transferred(f: Future) -> None:
+            if f.cancelled() or f.exception() is not None or f.result() is None:
+                settle(f)
+                return
+            try:
+                pool.submit(describe, buf, f.result()).add_done_callback(settle)
+            except RuntimeError as e:  # the pool has shut down: the run is already failing
+                if done.set_running_or_notify_cancel():
+                    done.set_exception(e)
+
+        moved.add_done_callback(transferred)
+        return done
+
+    def release(k: Hashable) -> None:
+        with gate:
+            unplaced[k] -= 1
+            gate.notify_all()
+
+    feeder = threading.Thread(target=feed, name="organise-plan", daemon=True)
+    sys.stdout = routed
+    try:
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="organise-describe") as pool:
+            try:
+                feeder.start()
+                while True:
+                    entry = planned.get()
+                    if entry is _DONE:
+                        break
+                    k, buf, result, error = entry
+                    if error is not None:
+                        raise error
+                    job = None
+                    try:
+                        with routed.capture(buf):
+                            job = place(result)
+                            if isinstance(job, Deferred) and lanes is None:
+                                job = job.run()
+                    finally:
+                        if k is not None and not isinstance(job, Deferred):
+                            release(k)
+                    if isinstance(job, Deferred):
+                        moved = lanes.submit(job.devices, lambda buf=buf, job=job: carry(buf, job), job.holds)
+                        if k is not None:
+                            moved.add_done_callback(lambda _f, k=k: release(k))
+                        fut = then_describe(buf, moved, pool)
+                    else:
+                        fut = pool.submit(describe, buf, job) if job is not None else None
+                    pending.append((buf, fut))
+                    emit(block=len(pending) > depth)
+                while pending:
+                    emit(block=True)
+            finally:
+                stop.set()
+                with gate:
+                    gate.notify_all()
+                for _buf, fut in pending:
+                    if fut is not None:
+                        fut.cancel()
+        feeder.join()
+    finally:
+        sys.stdout = real
+        # Whatever was said about files the run did not finish still belongs in the log.
+        for buf, _fut in pending:
+            real.write(buf.getvalue())
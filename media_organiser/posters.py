@@ -1,5 +1,6 @@
 from pathlib import Path
 from typing import List
+from . import snapshot
 from .constants import POSTER_NAMES
 import shutil
 
@@ -75,14 +76,14 @@ def carry_poster_with_sieve(src_context: Path, dst_dir: Path, policy: str,
         return
 
     candidates = []
-    if src_context.is_file():
+    if snapshot.is_file(src_context):
         candidates.append(src_context)
 
     for base in (src_context.parent, src_context.parent.parent):
-        if base and base.exists():
+        if base and snapshot.exists(base):
             for nm in POSTER_NAMES:
                 p = base / nm
-                if p.exists():
+                if snapshot.exists(p):
                     candidates.append(p)
     for src in candidates:
         suspect, reason = is_suspect_poster(src, min_w, min_h, aspect_lo, aspect_hi, bad_words)
@@ -91,7 +92,7 @@ def carry_poster_with_sieve(src_context: Path, dst_dir: Path, policy: str,
             print(f"POSTER SKIP (suspect:{reason}): {src}")
             continue
         if suspect and policy == "quarantine":
-            qdir = dst_dir / "_quarantine"; qdir.mkdir(parents=True, exist_ok=True)
+            qdir = dst_dir / "_quarantine"; snapshot.makedirs(qdir)
             dst = qdir / src.name
             print(f"POSTER QUARANTINE ({reason}): {src} -> {dst}")
         else:
@@ -0,0 +1,346 @@
+"""Where an organise run spent its time: ``--profile``.
+
+A slow run can be slow for quite different reasons — a library index rebuilt
+over NFS, a naming regex that backtracks, a hash-mode dedupe reading whole
+files — and the console log does not say which. A :class:`Profile` gathers, for
+one run:
+
+* wall time per stage: the per-file ``classify``, ``dedupe``, ``transfer``,
+  ``sidecar`` and ``nfo`` stages (summed over files, so with worker threads
+  they can add up to more than the run took) and the batch-level ``index``,
+  ``walk``, ``stability``, ``organise`` and ``prune`` stages;
+* calls to, and time spent in, ``stat``, ``exists``, ``glob``, ``iterdir`` and
+  ``mkdir`` — through :mod:`os` and :mod:`pathlib`, counted once per outermost
+  call so ``Path.exists`` calling ``os.stat`` is one ``exists``;
+* bytes read to fingerprint files and to verify copies, against the bytes
+  copied and the files placed by each method;
+* how many times each regular expression in :mod:`~media_organiser.naming`
+  was evaluated;
+* the process's peak resident set size.
+
+The filesystem and regex counters work by swapping in counting wrappers for
+the duration of :meth:`Profile.instrument`, so an unprofiled run pays nothing
+for them. Like the other run-scoped helpers, one profile is installed with
+:func:`install` and the module functions do nothing without one.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+FS_CALLS = ("stat", "exists", "glob", "iterdir", "mkdir")
+
+# (owner, attribute, category); owners are patched for the run and restored after.
+_FS_TARGETS = (
+    (os, "stat", "stat"), (os, "lstat", "stat"), (Path, "stat", "stat"), (Path, "lstat", "stat"),
+    (os.path, "exists", "exists"), (os.path, "isfile", "exists"), (os.path, "isdir", "exists"),
+    (Path, "exists", "exists"), (Path, "is_file", "exists"), (Path, "is_dir", "exists"),
+    (os, "listdir", "iterdir"), (os, "mkdir", "mkdir"), (os, "makedirs", "mkdir"), (Path, "mkdir", "mkdir"),
+)
+# These return iterators whose iteration is where the work happens.
+_FS_ITERATORS = (
+    (os, "scandir", "iterdir"), (Path, "iterdir", "iterdir"),
+    (Path, "glob", "glob"), (Path, "rglob", "glob"), (os, "walk", "glob"),
+)
+_REGEX_METHODS = ("search", "match", "fullmatch", "sub", "subn", "findall", "finditer", "split")
+
+
+class Profile:
+    """Counters for one run; thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = time.perf_counter()
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.fs: Dict[str, list] = {name: [0, 0.0] for name in FS_CALLS}   # calls, seconds
+        self.bytes: Counter = Counter()        # fingerprint / verify reads, copied
+        self.placed: Counter = Counter()       # transfer method -> files
+        self.regex: Counter = Counter()        # naming pattern -> evaluations
+
+    # -- recording ---------------------------------------------------------
+
+    def stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] += seconds
+
+    def add_stages(self, durations: Dict[str, float]) -> None:
+        with self._lock:
+            for name, seconds in durations.items():
+                self.stages[name] += seconds
+
+    def read(self, kind: str, n: int) -> None:
+        with self._lock:
+            self.bytes[f"{kind}_read"] += n
+
+    def transferred(self, method: str, copied: int) -> None:
+        with self._lock:
+            self.placed[method] += 1
+            self.bytes["copied"] += copied
+
+    def _fs(self, category: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            entry = self.fs[category]
+            entry[0] += calls
+            entry[1] += seconds
+
+    def _hit(self, pattern) -> None:
+        text = pattern if isinstance(pattern, str) else getattr(pattern, "pattern", str(pattern))
+        with self._lock:
+            self.regex[text] += 1
+
+    # -- instrumentation ---------------------------------------------------
+
+    @contextmanager
+    def instrument(self) -> Iterator["Profile"]:
+        """Count filesystem calls and naming regexes until the block ends."""
+        from . import naming
+        with ExitStack() as stack:
+            for owner, name, category in _FS_TARGETS:
+                stack.enter_context(_patched(owner, name, self._timed_call(getattr(owner, name), category)))
+            for owner, name, category in _FS_ITERATORS:
+                stack.enter_context(_patched(owner, name, self._timed_iter(getattr(owner, name), category)))
+            for name, value in list(vars(naming).items()):
+                counted = self._counting(value)
+                if counted is not value:
+                    stack.enter_context(_patched(naming, name, counted))
+            yield self
+
+    def _outermost(self) -> bool:
+        return not getattr(self._local, "depth", 0)
+
+    def _timed_call(self, fn: Callable, category: str) -> Callable:
+        profile = self
+
+        def wrapper(*args, **kwargs):
+            if not profile._outermost():
+                return fn(*args, **kwargs)
+            profile._local.depth = 1
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile._local.depth = 0
+                profile._fs(category, time.perf_counter() - start)
+        return wrapper
+
+    def _timed_iter(self, fn: Callable, category: str) -> Callable:
+        profile = self
+
+        def wrapper(*args, **kwargs):
+            if not profile._outermost():
+                return fn(*args, **kwargs)
+            profile._local.depth = 1
+            start = time.perf_counter()
+            try:
+                inner = fn(*args, **kwargs)
+            finally:
+                profile._local.depth = 0
+                profile._fs(category, time.perf_counter() - start)
+            return _TimedIterator(inner, profile, category)
+        return wrapper
+
+    def _counting(self, value):
+        if value is re:
+            return _CountingRe(self._hit)
+        if isinstance(value, re.Pattern):
+            return _CountingPattern(value, self._hit)
+        if isinstance(value, (list, tuple)) and value and all(isinstance(v, re.Pattern) for v in value):
+            return type(value)(_CountingPattern(v, self._hit) for v in value)
+        return value
+
+    # -- reporting ---------------------------------------------------------
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "elapsed": round(time.perf_counter() - self._started, 3),
+                "stages": {k: round(v, 3) for k, v in sorted(self.stages.items())},
+                "fs": {k: {"calls": n, "seconds": round(s, 3)} for k, (n, s) in self.fs.items()},
+                "bytes": {"fingerprint_read": self.bytes["fingerprint_read"],
+                          "verify_read": self.bytes["verify_read"],
+                          "copied": self.bytes["copied"]},
+                "placed": dict(self.placed),
+                "regex": {"evaluations": sum(self.regex.values()),
+                          "by_pattern": dict(self.regex.most_common())},
+                "peak_rss": peak_rss(),
+            }
+
+
+class _TimedIterator:
+    """An iterator (or ``scandir`` context manager) whose every step is timed as filesystem work."""
+
+    def __init__(self, inner, profile: Profile, category: str) -> None:
+        self._inner = inner
+        self._profile = profile
+        self._category = category
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        profile = self._profile
+        if not profile._outermost():
+            return next(self._inner)
+        profile._local.depth = 1
+        start = time.perf_counter()
+        try:
+            return next(self._inner)
+        finally:
+            profile._local.depth = 0
+            profile._fs(self._category, time.perf_counter() - start, calls=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        close = getattr(self._inner, "close", None)
+        if close is not None:
+            close()
+
+
+class _CountingPattern:
+    """A compiled pattern that reports each evaluation."""
+
+    def __init__(self, pattern: re.Pattern, hit: Callable) -> None:
+        self._pattern = pattern
+        self._hit = hit
+        for name in _REGEX_METHODS:
+            setattr(self, name, self._counted(getattr(pattern, name)))
+
+    def _counted(self, method: Callable) -> Callable:
+        def call(*args, **kwargs):
+            self._hit(self._pattern)
+            return method(*args, **kwargs)
+        return call
+
+    def __getattr__(self, name):
+        return getattr(self._pattern, name)
+
+
+class _CountingRe:
+    """Stands in for the ``re`` module, reporting each module-level evaluation."""
+
+    def __init__(self, hit: Callable) -> None:
+        self._hit = hit
+        for name in _REGEX_METHODS:
+            setattr(self, name, self._counted(getattr(re, name)))
+
+    def _counted(self, function: Callable) -> Callable:
+        def call(pattern, *args, **kwargs):
+            pattern = _unwrap(pattern)
+            self._hit(pattern)
+            return function(pattern, *args, **kwargs)
+        return call
+
+    def compile(self, pattern, flags=0):
+        return re.compile(_unwrap(pattern), flags)
+
+    def __getattr__(self, name):
+        return getattr(re, name)
+
+
+def _unwrap(pattern):
+    return pattern._pattern if isinstance(pattern, _CountingPattern) else pattern
+
+
+_INHERITED = object()
+
+
+@contextmanager
+def _patched(owner, name: str, value) -> Iterator[None]:
+    # A class may inherit the method; restoring then means removing our override.
+    original = vars(owner).get(name, _INHERITED) if isinstance(owner, type) else getattr(owner, name)
+    setattr(owner, name, value)
+    try:
+        yield
+    finally:
+        if original is _INHERITED:
+            delattr(owner, name)
+        else:
+            setattr(owner, name, original)
+
+
+def peak_rss() -> Optional[int]:
+    """The process's peak resident set size in bytes, where the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_report(report: dict) -> list[str]:
+    """The report as ``PROFILE:`` lines for the console."""
+    mib = 1 << 20
+    lines = [f"PROFILE: {report['elapsed']:.2f}s elapsed"]
+    stages = ", ".join(f"{k} {v:.2f}s" for k, v in report["stages"].items())
+    lines.append(f"PROFILE: stages: {stages or 'none'}")
+    fs = ", ".join(f"{k} {v['calls']} ({v['seconds']:.2f}s)" for k, v in report["fs"].items())
+    lines.append(f"PROFILE: filesystem: {fs}")
+    b = report["bytes"]
+    placed = ", ".join(f"{n} {method}" for method, n in sorted(report["placed"].items())) or "none"
+    lines.append(
+        f"PROFILE: read {b['fingerprint_read'] / mib:.1f} MiB to fingerprint, {b['verify_read'] / mib:.1f} MiB "
+        f"to verify; copied {b['copied'] / mib:.1f} MiB; placed {placed}"
+    )
+    top = list(report["regex"]["by_pattern"].items())[:3]
+    busiest = "; ".join(f"{n}x {p[:40]!r}" for p, n in top)
+    lines.append(f"PROFILE: naming regex evaluations: {report['regex']['evaluations']}"
+                 + (f" (most: {busiest})" if busiest else ""))
+    if report["peak_rss"] is not None:
+        lines.append(f"PROFILE: peak RSS {report['peak_rss'] / mib:.1f} MiB")
+    return lines
+
+
+_active: Optional[Profile] = None
+
+
+def active() -> Optional[Profile]:
+    return _active
+
+
+def install(profile: Optional[Profile]) -> Optional[Profile]:
+    """Make ``profile`` the run's and return whichever it replaced."""
+    global _active
+    previous, _active = _active, profile
+    return previous
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Add the block's wall time to ``stage`` in the installed profile, if any."""
+    profile = _active
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.stage(stage, time.perf_counter() - start)
+
+
+def add_stages(durations: Dict[str, float]) -> None:
+    profile = _active
+    if profile is not None:
+        profile.add_stages(durations)
+
+
+def read(kind: str, n: int) -> None:
+    """``n`` bytes read to ``kind`` (``fingerprint`` or ``verify``) a file."""
+    profile = _active
+    if profile is not None:
+        profile.read(kind, n)
@@ -0,0 +1,335 @@
+"""Slow, resumable verification of the library against its own NFOs.
+
+Every NFO the organiser writes records the video's ``size`` and a
+``uniqueid_localhash``. Nothing reads them back, so a file truncated by a
+failed disk or flipped by bit rot goes unnoticed until it will not play. The
+scrubber walks ``movies/`` and ``tv/``, re-fingerprints each video with the
+scheme its NFO names, and reports every disagreement as an
+:class:`~media_organiser.audit.Issue`.
+
+A pass over tens of terabytes takes days, and the library is in use while it
+runs, so the scrubber is deliberately gentle:
+
+* reads are paced to a byte budget (``--rate`` MB/s);
+* an optional quiet-hours window (``--quiet-hours 18:00-23:30``) pauses it
+  while the media server is busiest;
+* every range it hashes is dropped from the page cache straight after
+  (``POSIX_FADV_DONTNEED``), so it does not evict what the server is playing;
+* progress is checkpointed to ``DEST/.media_organiser/scrub_state.json``, and
+  a restarted scrub carries on after the last video it finished.
+
+Like the audit dashboards it only reports; nothing in the library is touched::
+
+    python -m media_organiser.scrub /data/content --rate 40 --quiet-hours 18:00-23:30
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from . import localhash
+from .audit import Issue, sort_issues
+from .constants import STATE_DIR_NAME, VIDEO_EXTS
+from .nfo import read_nfo_to_meta
+
+SCRUB_STATE_NAME = "scrub_state.json"
+_STATE_VERSION = 1
+
+# Progress is written at least this often, and after this many videos.
+_CHECKPOINT_SECONDS = 30.0
+_CHECKPOINT_EVERY = 64
+
+
+class Throttle:
+    """Paces a stream of reads to ``rate`` bytes per second; 0 means unlimited."""
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._start: Optional[float] = None
+        self._spent = 0
+
+    def spend(self, n: int) -> None:
+        """Account for ``n`` bytes read, sleeping until the budget allows them."""
+        if self.rate <= 0:
+            return
+        now = self._clock()
+        if self._start is None:
+            self._start = now
+        self._spent += n
+        ahead = self._spent / self.rate - (now - self._start)
+        if ahead > 0:
+            self._sleep(ahead)
+
+    def restart(self) -> None:
+        """Forget past reads, so time spent paused is not banked as budget."""
+        self._start, self._spent = None, 0
+
+
+def parse_quiet_hours(text: Optional[str]) -> Optional[tuple[int, int]]:
+    """``"HH:MM-HH:MM"`` as minutes past midnight; the window may cross midnight."""
+    if not text:
+        return None
+    try:
+        start, end = text.split("-")
+        bounds = []
+        for part in (start, end):
+            hh, mm = part.strip().split(":")
+            minutes = int(hh) * 60 + int(mm)
+            if not 0 <= minutes < 24 * 60:
+                raise ValueError
+            bounds.append(minutes)
+    except ValueError:
+        raise ValueError(f"quiet hours must look like 18:00-23:30, not {text!r}") from None
+    return bounds[0], bounds[1]
+
+
+def seconds_until_allowed(window: Optional[tuple[int, int]], now: datetime) -> float:
+    """How long to wait before scrubbing may continue at local time ``now``; 0 outside the window."""
+    if window is None:
+        return 0.0
+    start, end = window
+    minute = now.hour * 60 + now.minute
+    inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+    if not inside:
+        return 0.0
+    left = (end - minute) % (24 * 60)
+    return max(1.0, left * 60 - now.second)
+
+
+def _nfo_for(video: Path) -> Optional[Path]:
+    same_stem = video.with_suffix(".nfo")
+    if same_stem.is_file():
+        return same_stem
+    kodi = video.parent / "movie.nfo"
+    return kodi if kodi.is_file() else None
+
+
+def _order(rel: str) -> tuple[str, ...]:
+    return tuple(rel.split("/"))
+
+
+def library_videos(root: Path) -> list[str]:
+    """Videos under ``root``'s movies/ and tv/, relative to it, in scrub order."""
+    out = []
+    for top in ("movies", "tv"):
+        for dirpath, dirnames, filenames in os.walk(root / top):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() in VIDEO_EXTS and not name.startswith("."):
+                    out.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return sorted(out, key=_order)
+
+
+def check_video(video: Path, on_read: Optional[Callable[[int], None]] = None) -> tuple[list[Issue], bool]:
+    """
+    Compare one video with its NFO.
+
+    Returns the issues found and whether the content could be checked at all
+    (a missing NFO, or a localhash from an unknown scheme, cannot be).
+    """
+    nfo = _nfo_for(video)
+    meta = read_nfo_to_meta(nfo) if nfo is not None else {}
+    try:
+        size = video.stat().st_size
+    except OSError as exc:
+        return [Issue(kind="unreadable-video", severity="high", message=f"Could not stat {video.name!r}: {exc}")], True
+
+    recorded = str(meta.get("size") or "").strip()
+    if recorded.isdigit() and int(recorded) != size:
+        short = size < int(recorded)
+        return [Issue(
+            kind="truncated-video" if short else "size-mismatch",
+            severity="high" if short else "medium",
+            message=f"{video.name!r} is {size:,} bytes but its NFO recorded {int(recorded):,}.",
+            suggestion=("Restore the file from a backup or the original source." if short
+                        else "If the file was replaced on purpose, refresh its NFO with --overwrite-nfo."),
+        )], True
+
+    digest = meta.get("uniqueid_localhash")
+    scheme = localhash.get(meta.get("uniqueid_localhash_scheme") or localhash.LEGACY.key)
+    if not digest or scheme is None:
+        return [], False
+    try:
+        _size, actual = scheme.read(video, on_read=on_read, drop_cache=True)
+    except OSError as exc:
+        return [Issue(kind="unreadable-video", severity="high", message=f"Could not read {video.name!r}: {exc}")], True
+    if not localhash.same_content(scheme.key, actual, scheme.key, digest):
+        return [Issue(
+            kind="content-mismatch",
+            severity="high",
+            message=f"{video.name!r} no longer matches the fingerprint in its NFO (bit rot, or replaced in place).",
+            suggestion="Compare with a backup; if the file was replaced on purpose, refresh its NFO.",
+        )], True
+    return [], True
+
+
+class Scrubber:
+    """One library's scrub, resumable from its state file."""
+
+    def __init__(self, root: Path, rate_mb: float = 0.0, quiet_hours: Optional[str] = None,
+                 state_path: Optional[Path] = None, stop: Optional[threading.Event] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 now: Callable[[], datetime] = datetime.now) -> None:
+        self.root = Path(root)
+        self.state_path = state_path or self.root / STATE_DIR_NAME / SCRUB_STATE_NAME
+        self.window = parse_quiet_hours(quiet_hours)
+        self.throttle = Throttle(rate_mb * 1_000_000, clock, sleep)
+        self.stop = stop or threading.Event()
+        self._clock, self._sleep, self._now = clock, sleep, now
+        self.bytes_read = 0
+        self.state = self._load()
+
+    def _fresh(self) -> dict:
+        return {
+            "version": _STATE_VERSION, "root": str(self.root),
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "position": None, "checked": 0, "unverified": 0, "issues": [],
+            "last_completed": None,
+        }
+
+    def _load(self) -> dict:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return self._fresh()
+        if not isinstance(state, dict) or state.get("version") != _STATE_VERSION or state.get("root") != str(self.root):
+            return self._fresh()
+        return state
+
+    def save(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    def _read(self, n: int) -> None:
+        self.bytes_read += n
+        self.throttle.spend(n)
+
+    def _wait_for_quiet_hours_to_end(self) -> None:
+        paused = False
+        while not self.stop.is_set():
+            wait = seconds_until_allowed(self.window, self._now())
+            if not wait:
+                break
+            if not paused:
+                self.save()
+                paused = True
+            self._sleep(min(wait, 60.0))
+        if paused:
+            self.throttle.restart()
+
+    def _pending(self) -> Iterator[str]:
+        position = self.state.get("position")
+        for rel in library_videos(self.root):
+            if position is None or _order(rel) > _order(position):
+                yield rel
+
+    def run(self, limit: int = 0) -> dict:
+        """
+        Scrub until the pass completes, ``stop`` is set or ``limit`` videos are done.
+
+        A completed pass is recorded with its findings and the next run starts
+        a new one.
+        """
+        done = 0
+        last_save = self._clock()
+        complete = True
+        for rel in self._pending():
+            self._wait_for_quiet_hours_to_end()
+            if self.stop.is_set() or (limit and done >= limit):
+                complete = False
+                break
+            issues, verified = check_video(self.root / rel, on_read=self._read)
+            for issue in sort_issues(issues):
+                self.state["issues"].append({"path": rel, **issue.to_dict()})
+            self.state["checked"] += 1
+            self.state["unverified"] += 0 if verified else 1
+            self.state["position"] = rel
+            done += 1
+            if done % _CHECKPOINT_EVERY == 0 or self._clock() - last_save >= _CHECKPOINT_SECONDS:
+                self.save()
+                last_save = self._clock()
+
+        report = self.report(complete)
+        if complete:
+            finished = self._fresh()
+            finished["last_completed"] = report
+            self.state = finished
+        self.save()
+        return report
+
+    def report(self, complete: bool) -> dict:
+        return {
+            "root": str(self.root),
+            "started": self.state["started"],
+            "complete": complete,
+            "checked": self.state["checked"],
+            "unverified": self.state["unverified"],
+            "bytes_read": self.bytes_read,
+            "issues": list(self.state["issues"]),
+        }
+
+
+def scrub_status(root: Path, state_path: Optional[Path] = None) -> dict:
+    """The scrub in progress under ``root`` and the last completed pass, from the state file."""
+    state = Scrubber(root, state_path=state_path).state
+    return {
+        "root": str(root),
+        "in_progress": {
+            "started": state["started"], "position": state["position"], "checked": state["checked"],
+            "issues": state["issues"],
+        } if state["position"] is not None else None,
+        "last_completed": state["last_completed"],
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m media_organiser.scrub",
+                                 description="Verify library videos against the size and fingerprint in their NFOs.")
+    ap.add_argument("dest", help="library root holding movies/ and tv/")
+    ap.add_argument("--rate", type=float, default=20.0, help="read budget in MB/s (default: 20; 0 = unlimited)")
+    ap.add_argument("--quiet-hours", default=None, help="local time window to pause in, e.g. 18:00-23:30")
+    ap.add_argument("--limit", type=int, default=0, help="stop after this many videos (default: the whole pass)")
+    ap.add_argument("--state", default=None,
+                    help=f"checkpoint file (default: DEST/{STATE_DIR_NAME}/{SCRUB_STATE_NAME})")
+    args = ap.parse_args(argv)
+
+    root = Path(args.dest).expanduser()
+    if not root.is_dir():
+        print(f"not a directory: {root}")
+        return 2
+    try:
+        scrubber = Scrubber(root, args.rate, args.quiet_hours, Path(args.state) if args.state else None)
+    except ValueError as e:
+        print(e)
+        return 2
+    try:
+        signal.signal(signal.SIGTERM, lambda *_: scrubber.stop.set())
+    except ValueError:
+        pass
+    try:
+        report = scrubber.run(args.limit)
+    except KeyboardInterrupt:
+        scrubber.save()
+        return 130
+    for item in report["issues"]:
+        print(f"SCRUB ISSUE [{item['severity']}] {item['kind']}: {item['path']} - {item['message']}")
+    state = "pass complete" if report["complete"] else "paused; rerun to continue"
+    print(f"SCRUB: {report['checked']} video(s) checked, {report['unverified']} without a usable NFO, "
+          f"{len(report['issues'])} issue(s), {report['bytes_read'] / 1e6:.1f} MB read this run ({state})")
+    return 1 if report["issues"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,18 +1,62 @@
 from pathlib import Path
 from typing import Iterable, List, Dict
 import re
+from bisect import bisect_left
+from media_organiser import snapshot
 from media_organiser.constants import SUB_EXTS, SIDECAR_EXTS
 
 
 _LANG_RE = re.compile(r"(?i)[\.\- _]([a-z]{2,3}(?:-[A-Z]{2})?)(?=($|\.[^.]+))")
 
+def _fold(s: str) -> str:
+    """
+    Case-insensitive key for prefix lookups.
+
+    ``casefold`` agrees with the ``re.IGNORECASE`` matching below on every
+    character bar the dotless i, which ``re`` also equates with ``i``.
+    """
+    return s.casefold().replace("ı", "i")
+
+
+class _SidecarIndex:
+    """
+    A folder's sidecars, sorted by folded stem.
+
+    A dump folder can hold thousands of videos and many more subtitles; rather
+    than match every file in it against each video, the sidecars whose stem
+    starts with the video's are found by bisection and only those go through
+    the full pattern.
+    """
+
+    __slots__ = ("keys", "entries")
+
+    def __init__(self, d: Path) -> None:
+        found = [
+            (_fold(p.stem), pos, p)
+            for pos, p in enumerate(snapshot.listdir(d))
+            if p.suffix.lower() in SIDECAR_EXTS and snapshot.is_file(p)
+        ]
+        found.sort(key=lambda t: (t[0], t[1]))
+        self.keys = [k for k, _pos, _p in found]
+        self.entries = [(pos, p) for _k, pos, p in found]
+
+    def starting_with(self, prefix: str) -> List[tuple]:
+        """``(listing position, path)`` of every sidecar whose folded stem starts with ``prefix``."""
+        lo = bisect_left(self.keys, prefix)
+        hi = lo
+        while hi < len(self.keys) and self.keys[hi].startswith(prefix):
+            hi += 1
+        return self.entries[lo:hi]
+
+
 def find_related_sidecars(src: Path) -> Iterable[Path]:
     base = re.escape(src.stem)
     pat = re.compile(rf"(?i)^({base})(?P<suffix>(?:[ ._\-](?!S\d{{1,2}}E)\w[\w.\-]*)?)$")
-    for p in src.parent.iterdir():
-        if p.is_file() and p.suffix.lower() in SIDECAR_EXTS:
-            if pat.match(p.stem):
-                yield p
+    index = snapshot.derived(src.parent, "sidecars", _SidecarIndex)
+    # In folder order, as a plain listing would give them; entries moved away since are skipped.
+    for _pos, p in sorted(index.starting_with(_fold(src.stem)), key=lambda e: e[0]):
+        if pat.match(p.stem) and snapshot.is_file(p):
+            yield p
 
 def guess_lang_from_suffix(suffix: str) -> str | None:
     m = _LANG_RE.search(suffix)
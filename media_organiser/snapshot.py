@@ -0,0 +1,375 @@
+"""A run-scoped, in-memory picture of the directories the organiser looks at.
+
+Working out where one video goes asks the filesystem the same questions over
+and over: is this a file, does ``X.nfo`` exist, how many videos are under this
+folder, which subtitles sit next to it, is ``Name (2).mkv`` free. On a local
+disk each answer is cheap; over SMB or NFS each is a network round trip, and a
+run over a large inbox makes tens of thousands of them.
+
+A :class:`Snapshot` answers from directory listings taken once with
+``os.scandir``, keeping each ``DirEntry`` so its type (and, once asked, its
+``stat``) comes for free. Listings are taken lazily the first time a directory
+is asked about, or all at once by :meth:`Snapshot.walk` for the import tree.
+The organiser reports what it changes — files placed or removed, folders
+created or pruned — so the picture stays true for the rest of the run.
+
+Like the fingerprint cache, one snapshot is installed per run with
+:func:`install`; the module-level helpers (:func:`exists`, :func:`is_file`,
+:func:`listdir`, ...) consult it when there is one and the filesystem when
+there is not, so callers outside a run behave exactly as before.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional, TypeVar, Union
+
+
+class _Placed:
+    """Listing entry for something the organiser created after the directory was read."""
+
+    __slots__ = ("name", "path", "_is_dir", "_stat")
+
+    def __init__(self, path: Path, is_dir: bool) -> None:
+        self.name = path.name
+        self.path = str(path)
+        self._is_dir = is_dir
+        self._stat = None
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._is_dir
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return not self._is_dir
+
+    def is_symlink(self) -> bool:
+        return False
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+Entry = Union[os.DirEntry, _Placed]
+T = TypeVar("T")
+
+
+class Snapshot:
+    """
+    Directory listings keyed by path, with counters for what they saved.
+
+    Thread-safe: the plan stage reads while the place stage records changes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._listings: dict[Path, dict[str, Entry]] = {}
+        self._stats: dict[Path, os.stat_result] = {}
+        self._derived: dict[Path, dict[str, object]] = {}
+        # Listed directories (and the folders leading to them) directly below each
+        # directory, so dropping a removed tree visits that tree, not every listing.
+        self._below: dict[Path, set[Path]] = {}
+        self.scans = 0      # os.scandir calls
+        self.stats = 0      # stat calls made on a lookup's behalf
+        self.lookups = 0    # questions answered
+
+    # -- reading -----------------------------------------------------------
+
+    def _listing(self, d: Path) -> Optional[dict[str, Entry]]:
+        """The cached listing of ``d``, reading it on first use; None if it cannot be listed."""
+        with self._lock:
+            listing = self._listings.get(d)
+            if listing is not None:
+                return listing
+            try:
+                with os.scandir(d) as it:
+                    listing = {e.name: e for e in it}
+            except OSError:
+                return None
+            self.scans += 1
+            self._listings[d] = listing
+            self._track(d)
+            return listing
+
+    def _track(self, d: Path) -> None:
+        # Caller holds the lock.
+        cur = d
+        while cur.parent != cur:
+            below = self._below.setdefault(cur.parent, set())
+            if cur in below:
+                return
+            below.add(cur)
+            cur = cur.parent
+
+    def _untrack(self, d: Path) -> None:
+        # Caller holds the lock. Drops d, and each folder above it left with nothing listed below.
+        cur = d
+        while cur not in self._listings and not self._below.get(cur):
+            self._below.pop(cur, None)
+            below = self._below.get(cur.parent) if cur.parent != cur else None
+            if below is None:
+                return
+            below.discard(cur)
+            cur = cur.parent
+
+    def walk(self, root: Path) -> list[Path]:
+        """
+        Every path under ``root``, like ``list(root.rglob("*"))``, from one
+        ``scandir`` per directory. Symlinked directories are not descended.
+        """
+        return [p for _d, paths in self.walk_dirs(root) for p in paths]
+
+    def walk_dirs(self, root: Path) -> Iterator[tuple[Path, list[Path]]]:
+        """
+        ``(directory, paths directly in it)`` for every directory under ``root``,
+        depth first and in :meth:`walk`'s order, listing each one only when it
+        is reached. Holds the directories still to visit, never the whole tree.
+        """
+        pending = [root]
+        while pending:
+            d = pending.pop()
+            listing = self._listing(d)
+            if listing is None:
+                continue
+            paths, subdirs = [], []
+            for name, entry in list(listing.items()):
+                p = d / name
+                paths.append(p)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(p)
+                except OSError:
+                    continue
+            pending.extend(reversed(subdirs))  # a stack: the first subdirectory is visited next
+            yield d, paths
+
+    def entry(self, p: Path) -> Optional[Entry]:
+        """The listing entry for ``p``; None when it does not exist."""
+        with self._lock:
+            self.lookups += 1
+        parent = p.parent
+        if parent == p:
+            return None
+        listing = self._listing(parent)
+        if listing is None:
+            return None
+        return listing.get(p.name)
+
+    def exists(self, p: Path) -> bool:
+        if p.parent == p:
+            return p.exists()
+        return self.entry(p) is not None
+
+    def is_file(self, p: Path) -> bool:
+        e = self.entry(p)
+        try:
+            return e is not None and e.is_file()
+        except OSError:
+            return False
+
+    def is_dir(self, p: Path) -> bool:
+        if p.parent == p:
+            return p.is_dir()
+        e = self.entry(p)
+        try:
+            return e is not None and e.is_dir()
+        except OSError:
+            return False
+
+    def stat(self, p: Path) -> os.stat_result:
+        """``p.stat()``, once per path per run."""
+        with self._lock:
+            st = self._stats.get(p)
+            if st is not None:
+                self.lookups += 1
+                return st
+        e = self.entry(p)
+        if e is None:
+            raise FileNotFoundError(2, "No such file or directory", str(p))
+        with self._lock:
+            self.stats += 1
+        st = e.stat()
+        with self._lock:
+            self._stats[p] = st
+        return st
+
+    def listdir(self, d: Path) -> list[Path]:
+        """Children of ``d``, like ``list(d.iterdir())``; empty if it cannot be listed."""
+        with self._lock:
+            self.lookups += 1
+        listing = self._listing(d)
+        if listing is None:
+            return []
+        return [d / name for name in listing]
+
+    def files_under(self, d: Path) -> Iterator[Path]:
+        """Files anywhere below ``d``, lazily, so a caller that stops early reads little."""
+        with self._lock:
+            self.lookups += 1
+        pending = [d]
+        while pending:
+            cur = pending.pop()
+            listing = self._listing(cur)
+            if listing is None:
+                continue
+            for name, entry in list(listing.items()):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(cur / name)
+                    elif entry.is_file():
+                        yield cur / name
+                except OSError:
+                    continue
+
+    def derived(self, d: Path, name: str, build: Callable[[Path], T]) -> T:
+        """
+        ``build(d)``, kept until something is added to ``d``.
+
+        For structures callers build from a listing (an index of its sidecars,
+        say). Removals do not discard them, so a directory emptied one file at a
+        time is not rebuilt each time; their users recheck what they find.
+        """
+        with self._lock:
+            per_dir = self._derived.setdefault(d, {})
+            if name not in per_dir:
+                per_dir[name] = build(d)
+            return per_dir[name]
+
+    # -- recording changes -------------------------------------------------
+
+    def added(self, p: Path, is_dir: bool = False) -> None:
+        """``p`` was just created (or replaced) by the organiser."""
+        with self._lock:
+            self._stats.pop(p, None)
+            listing = self._listings.get(p.parent)
+            if listing is not None:
+                listing[p.name] = _Placed(p, is_dir)
+            self._derived.pop(p.parent, None)
+
+    def removed(self, p: Path) -> None:
+        """``p`` (a file, or a whole directory) is gone."""
+        with self._lock:
+            self._stats.pop(p, None)
+            listing = self._listings.get(p.parent)
+            entry = listing.pop(p.name, None) if listing is not None else None
+            try:
+                if entry is not None and not entry.is_dir():
+                    return  # a file: nothing was listed below it
+            except OSError:
+                pass
+            pending = [p]
+            while pending:
+                d = pending.pop()
+                self._listings.pop(d, None)
+                self._derived.pop(d, None)
+                pending.extend(self._below.pop(d, ()))
+            self._untrack(p)
+
+    def forget(self, d: Path) -> None:
+        """Drop what is held about ``d``'s contents; it is read afresh if asked about again."""
+        with self._lock:
+            listing = self._listings.pop(d, None)
+            for name in listing or ():
+                self._stats.pop(d / name, None)
+            self._derived.pop(d, None)
+            self._untrack(d)
+
+    def makedirs(self, d: Path) -> None:
+        """``d.mkdir(parents=True, exist_ok=True)``, skipped when ``d`` is known to exist."""
+        missing = []
+        cur = d
+        while cur.parent != cur and not self.is_dir(cur):
+            missing.append(cur)
+            cur = cur.parent
+        for made in reversed(missing):
+            try:
+                os.mkdir(made)
+            except FileExistsError:
+                # Created behind our back (or unlistable): forget what we thought and look again later.
+                with self._lock:
+                    self._listings.pop(made.parent, None)
+                    self._derived.pop(made.parent, None)
+                continue
+            with self._lock:
+                self.added(made, is_dir=True)
+                self._listings[made] = {}
+                self._track(made)
+
+    def counters(self) -> dict:
+        return {"scans": self.scans, "stats": self.stats, "lookups": self.lookups}
+
+
+_active: Optional[Snapshot] = None
+
+
+def active() -> Optional[Snapshot]:
+    """The snapshot the helpers below currently consult, if any."""
+    return _active
+
+
+def install(snap: Optional[Snapshot]) -> Optional[Snapshot]:
+    """Make ``snap`` the run's snapshot and return whichever it replaced."""
+    global _active
+    previous, _active = _active, snap
+    return previous
+
+
+@contextmanager
+def installed(snap: Snapshot) -> Iterator[Snapshot]:
+    previous = install(snap)
+    try:
+        yield snap
+    finally:
+        install(previous)
+
+
+# Helpers for call sites: the snapshot when one is installed, else the filesystem.
+
+def exists(p: Path) -> bool:
+    return _active.exists(p) if _active is not None else p.exists()
+
+
+def is_file(p: Path) -> bool:
+    return _active.is_file(p) if _active is not None else p.is_file()
+
+
+def is_dir(p: Path) -> bool:
+    return _active.is_dir(p) if _active is not None else p.is_dir()
+
+
+def stat(p: Path) -> os.stat_result:
+    return _active.stat(p) if _active is not None else p.stat()
+
+
+def listdir(d: Path) -> list[Path]:
+    return _active.listdir(d) if _active is not None else list(d.iterdir())
+
+
+def files_under(d: Path) -> Iterator[Path]:
+    if _active is not None:
+        return _active.files_under(d)
+    return (p for p in d.rglob("*") if p.is_file())
+
+
+def makedirs(d: Path) -> None:
+    if _active is not None:
+        _active.makedirs(d)
+    else:
+        d.mkdir(parents=True, exist_ok=True)
+
+
+def added(p: Path, is_dir: bool = False) -> None:
+    if _active is not None:
+        _active.added(p, is_dir)
+
+
+def removed(p: Path) -> None:
+    if _active is not None:
+        _active.removed(p)
+
+
+def derived(d: Path, name: str, build: Callable[[Path], T]) -> T:
+    return _active.derived(d, name, build) if _active is not None else build(d)
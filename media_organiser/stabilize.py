@@ -1,15 +1,162 @@
-from pathlib import Path
+"""Decide which import files are finished arriving.
+
+An FTP or SMB client may still be writing a file when the organiser runs, and
+moving a half-written video loses the rest of it. The checks here are batched:
+every candidate is stat'ed once, the run waits a single interval, and all of
+them are re-stat'ed together, so stability costs a fixed amount of time per run
+rather than one interval per file.
+
+Strategies are looked up by name in :data:`STRATEGIES`. Each receives the
+candidates with their first ``stat`` and returns the ones it considers still
+in flux; a file is stable only when no strategy objects to it.
+"""
+from __future__ import annotations
+
+import os
 import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Optional
 
-def is_file_size_stable(path: Path, interval: float = 1.0) -> bool:
+# Flags in /proc/<pid>/fdinfo/<fd> are octal; either of these means the
+# descriptor can write.
+_O_ACCMODE = 0o3
+_O_WRONLY = 0o1
+_O_RDWR = 0o2
+
+
+@dataclass
+class StabilityCheck:
+    """Settings shared by the strategies for one batch."""
+    interval: float = 1.0
+    min_age: float = 0.0
+    sleep: Callable[[float], None] = time.sleep
+    clock: Callable[[], float] = time.time
+    proc_root: Path = field(default_factory=lambda: Path("/proc"))
+
+
+def _signature(st: os.stat_result) -> tuple[int, int]:
+    return st.st_size, st.st_mtime_ns
+
+
+def _unstable_by_size_mtime(first: dict[Path, os.stat_result], check: StabilityCheck) -> set[Path]:
+    """Size or mtime moved during one shared interval."""
+    if check.interval > 0:
+        check.sleep(check.interval)
+    unstable: set[Path] = set()
+    for path, st in first.items():
+        try:
+            again = path.stat()
+        except OSError:
+            unstable.add(path)
+            continue
+        if _signature(again) != _signature(st):
+            unstable.add(path)
+    return unstable
+
+
+def open_writer_inodes(proc_root: Path = Path("/proc")) -> Optional[set[tuple[int, int]]]:
     """
-    Return True if file size is stable across `interval` seconds.
-    Useful for skipping incomplete uploads (e.g., via vsftpd).
+    ``(st_dev, st_ino)`` of every file some process holds open for writing.
+
+    Reads ``/proc/*/fd`` once for the whole batch. Returns None where there is
+    no ``/proc`` to read (macOS, Windows), so the caller can tell "nobody is
+    writing" from "cannot tell". Processes we may not inspect are skipped: a
+    writer owned by another user is invisible without privileges.
     """
+    if not proc_root.is_dir():
+        return None
+    writers: set[tuple[int, int]] = set()
     try:
-        size1 = path.stat().st_size
-        time.sleep(interval)
-        size2 = path.stat().st_size
-        return size1 == size2
-    except FileNotFoundError:
-        return False
\ No newline at end of file
+        pids = [e for e in os.scandir(proc_root) if e.name.isdigit()]
+    except OSError:
+        return None
+    for pid in pids:
+        fd_dir = os.path.join(pid.path, "fd")
+        try:
+            fds = list(os.scandir(fd_dir))
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                with open(os.path.join(pid.path, "fdinfo", fd.name), "r", encoding="ascii") as fh:
+                    flags = next((int(line.split()[1], 8) for line in fh if line.startswith("flags:")), 0)
+                if flags & _O_ACCMODE not in (_O_WRONLY, _O_RDWR):
+                    continue
+                st = os.stat(fd.path)
+            except (OSError, ValueError, IndexError):
+                continue
+            writers.add((st.st_dev, st.st_ino))
+    return writers
+
+
+def _unstable_by_open_writers(first: dict[Path, os.stat_result], check: StabilityCheck) -> set[Path]:
+    """Some process still holds the file open for writing."""
+    writers = open_writer_inodes(check.proc_root)
+    if not writers:
+        return set()
+    return {path for path, st in first.items() if (st.st_dev, st.st_ino) in writers}
+
+
+def _unstable_by_min_age(first: dict[Path, os.stat_result], check: StabilityCheck) -> set[Path]:
+    """Modified more recently than ``min_age`` seconds ago."""
+    if check.min_age <= 0:
+        return set()
+    now = check.clock()
+    return {path for path, st in first.items() if now - st.st_mtime < check.min_age}
+
+
+STRATEGIES: dict[str, Callable[[dict[Path, os.stat_result], StabilityCheck], set[Path]]] = {
+    "size-mtime": _unstable_by_size_mtime,
+    "open-writers": _unstable_by_open_writers,
+    "min-age": _unstable_by_min_age,
+}
+
+DEFAULT_STRATEGIES = ("size-mtime",)
+
+
+def parse_strategies(raw: str) -> tuple[str, ...]:
+    """``"size-mtime,min-age"`` as a tuple, rejecting names nobody implements."""
+    names = tuple(s.strip().lower() for s in raw.split(",") if s.strip())
+    unknown = [n for n in names if n not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"unknown stability strategy: {', '.join(unknown)} (choose from {', '.join(STRATEGIES)})")
+    return names
+
+
+def partition_stable(
+    paths: Iterable[Path],
+    strategies: Iterable[str] = DEFAULT_STRATEGIES,
+    check: Optional[StabilityCheck] = None,
+) -> tuple[list[Path], list[Path]]:
+    """
+    Split ``paths`` into ``(stable, unstable)``, preserving input order.
+
+    A file that vanished before the first ``stat`` counts as unstable. Cheap
+    strategies run first so the timed one only waits on files that are still
+    in the running.
+    """
+    check = check or StabilityCheck()
+    paths = list(paths)
+    first: dict[Path, os.stat_result] = {}
+    unstable: set[Path] = set()
+    for path in paths:
+        try:
+            first[path] = path.stat()
+        except OSError:
+            unstable.add(path)
+
+    ordered = sorted(set(strategies), key=lambda n: n == "size-mtime")
+    for name in ordered:
+        remaining = {p: st for p, st in first.items() if p not in unstable}
+        if not remaining:
+            break
+        unstable |= STRATEGIES[name](remaining, check)
+
+    stable = [p for p in paths if p not in unstable]
+    return stable, [p for p in paths if p in unstable]
+
+
+def is_file_size_stable(path: Path, interval: float = 1.0) -> bool:
+    """Whether one file is stable across ``interval`` seconds, by :func:`partition_stable`'s default rule."""
+    return bool(partition_stable([path], check=StabilityCheck(interval=interval))[0])
@@ -7,10 +7,14 @@ from flask import Flask, request, render_template, jsonify, redirect, url_for, s
 from werkzeug.exceptions import RequestEntityTooLarge
 
 from . import audio_tools
+from . import fingerprints
 from . import fixes
+from . import iorate
 from . import musicbrainz_client
-from .library import audit_movies, get_movies_dir
+from .constants import STATE_DIR_NAME
+from .library import audit_movies, get_library_dir, get_movies_dir
 from .music import scan_music
+from .scrub import scrub_status
 
 app = Flask(
     __name__,
@@ -22,6 +26,11 @@ app = Flask(
 max_upload_size = int(os.environ.get("MAX_UPLOAD_SIZE", 30 * 1024 * 1024 * 1024))
 app.config["MAX_CONTENT_LENGTH"] = max_upload_size
 
+# I/O cap and ffmpeg priority from IO_RATE, IO_RATE_DEVICES, IO_PRIORITY and
+# IO_NICE. Set here rather than in run_server so gunicorn, which only imports
+# ``app``, applies them too.
+iorate.configure_from_env()
+
 
 # Scanning a large library is slow, so dashboard payloads are memoised for a
 # short window. "Rescan" in the UI sends ?refresh=1 to bypass the cache.
@@ -63,6 +72,14 @@ def _env_flag(name: str, default: bool = True) -> bool:
     return str(raw).strip().lower() not in {"0", "false", "no", "off"}
 
 
+def _fingerprint_cache_path(state_parent: Path) -> Path:
+    """Where a request's fingerprints are memoised; ``FINGERPRINT_CACHE`` shares one file."""
+    override = os.environ.get("FINGERPRINT_CACHE")
+    if override:
+        return Path(override).expanduser()
+    return state_parent / STATE_DIR_NAME / fingerprints.CACHE_NAME
+
+
 def get_import_dir() -> Path:
     path = Path(os.environ.get("IMPORT_DIR", "./data/import"))
     path.mkdir(parents=True, exist_ok=True)
@@ -234,11 +251,12 @@ def music_transcode():
     scan_library_duplicates = _env_flag("MUSIC_IMPORT_DEDUPE", default=True)
     if "scan_library_duplicates" in payload:
         scan_library_duplicates = bool(payload.get("scan_library_duplicates"))
-    result = audio_tools.ensure_mp3_320(
-        dest,
-        music_dir,
-        scan_library_duplicates=scan_library_duplicates,
-    )
+    with fingerprints.opened(_fingerprint_cache_path(music_dir)):
+        result = audio_tools.ensure_mp3_320(
+            dest,
+            music_dir,
+            scan_library_duplicates=scan_library_duplicates,
+        )
     if result.get("output_path"):
         out_path = Path(result["output_path"])
         try:
@@ -333,6 +351,12 @@ def api_movie_library():
     return jsonify(_cached("movies", audit_movies, refresh=_wants_refresh()))
 
 
+@app.route("/api/library/scrub")
+def api_scrub_status():
+    """Progress and findings of ``python -m media_organiser.scrub`` over the library."""
+    return jsonify(scrub_status(get_library_dir()))
+
+
 @app.route("/library/music")
 def music_library():
     """Read-only listing of the beets music library."""
@@ -395,7 +419,8 @@ def api_fix_apply():
     if len(actions) > 5000:
         return jsonify({"error": "Too many actions in one batch; apply in smaller runs"}), 400
 
-    result = fixes.apply_actions(actions, dry_run=bool(payload.get("dry_run")))
+    with fingerprints.opened(_fingerprint_cache_path(fixes.get_state_dir().parent)):
+        result = fixes.apply_actions(actions, dry_run=bool(payload.get("dry_run")))
     if not result.get("dry_run"):
         _invalidate_dashboard_cache()
     return jsonify(result)
@@ -439,7 +464,8 @@ def api_triage_folder():
         return jsonify({"error": "Unknown folder"}), 404
     if folder != movies_root and movies_root not in folder.parents:
         return jsonify({"error": "Folder is outside the movie library"}), 400
-    return jsonify(fixes.inspect_folder(folder))
+    with fingerprints.opened(_fingerprint_cache_path(fixes.get_state_dir().parent)):
+        return jsonify(fixes.inspect_folder(folder))
 
 
 @app.route("/api/library/trash")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Measure how fast filenames are classified as episodes or movies.
+
+Every video in an import, and every file in a library audit, goes through
+``naming.is_tv_episode``. This generates a large, fixed corpus of realistic
+release names (episodes in every token style the matcher knows, films with
+years and scene tags, loose "Ep 3" rips under season folders) and reports
+names per second, cold (every name seen for the first time) and warm (the
+same names again, as siblings and reruns ask them).
+
+    python scripts/bench_naming.py                 # 100k names
+    python scripts/bench_naming.py --count 500000 --check
+
+``--check`` also classifies each name the slow way - a separate ``finditer``
+per episode pattern, keeping the rightmost match - and fails if any answer
+differs from the single-scan matcher's.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from media_organiser import naming  # noqa: E402
+
+_TITLES = [
+    "The Matrix", "Breaking Bad", "Young-Sheldon", "Penguins of Madagascar", "Blade Runner 2049",
+    "Spirited Away", "Lucifer", "Marvel's Agents of S.H.I.E.L.D", "9-1-1", "2001 A Space Odyssey",
+    "The Office US", "Schitt's Creek", "Dark", "Monsters University", "Grey's Anatomy",
+]
+_TAGS = ["1080p", "720p", "2160p", "WEB-DL", "BluRay", "x264", "x265", "HEVC", "AAC", "HDTV", "REPACK"]
+_GROUPS = ["-GRP", "-DoNE", "-NTb", "[eztv]", "[YTS.MX]", ""]
+_PARENTS = ["", "Season 1", "Season 02", "S03", "Show.S01.1080p", "Extras", "Downloads"]
+
+
+def corpus(count: int, seed: int = 1) -> list[tuple[str, str]]:
+    """``count`` ``(filename, parent folder name)`` pairs, the same every time for a given seed."""
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(count):
+        title = rnd.choice(_TITLES)
+        sep = rnd.choice([".", " ", "_"])
+        t = title.replace(" ", sep)
+        tags = sep.join(rnd.sample(_TAGS, rnd.randint(0, 3)))
+        tail = (sep + tags if tags else "") + rnd.choice(_GROUPS)
+        s, e = rnd.randint(0, 15), rnd.randint(1, 30)
+        style = rnd.random()
+        if style < 0.30:
+            name = f"{t}{sep}S{s:02d}E{e:02d}{tail}"
+        elif style < 0.38:
+            name = f"{t}{sep}S{s:02d}E{e:02d}-E{e + 1:02d}{tail}"
+        elif style < 0.44:
+            name = f"{t}{sep}{s}x{e:02d}{tail}"
+        elif style < 0.50:
+            name = f"{title} - {max(s, 1)}{e:02d} - Episode Title"
+        elif style < 0.55:
+            name = f"{t} season {s} episode {e}{tail}"
+        elif style < 0.60:
+            name = f"Ep {e:02d}{tail}" if rnd.random() < 0.5 else f"{t} Ep {e}"
+        else:
+            name = f"{t}{sep}{rnd.randint(1930, 2025)}{tail}"
+        out.append((name + rnd.choice([".mkv", ".mp4", ".avi"]), rnd.choice(_PARENTS)))
+    return out
+
+
+def rightmost_token_per_pattern(stem: str) -> Optional[tuple[int, dict]]:
+    """The episode token as the matcher used to find it: one ``finditer`` per pattern."""
+    best, best_pos = None, -1
+    for pat in naming._PATTERNS:
+        for m in pat.finditer(stem):
+            if m.start() > best_pos:
+                best, best_pos = m, m.start()
+    return (best.start(), best.groupdict()) if best is not None else None
+
+
+def _classify_all(names: list[tuple[str, Path]]) -> float:
+    start = time.perf_counter()
+    for name, path in names:
+        naming.is_tv_episode(name, path)
+    return time.perf_counter() - start
+
+
+def run(count: int, seed: int = 1, check: bool = False) -> dict:
+    names = [(n, Path(parent) / n) for n, parent in corpus(count, seed)]
+    naming._classify_episode.cache_clear()
+    naming._clean_title.cache_clear()
+    cold = _classify_all(names)
+    warm = _classify_all(names)
+    result = {
+        "names": count,
+        "distinct": len(set(names)),
+        "episodes": sum(naming.is_tv_episode(n, p)[0] for n, p in names),
+        "cold_per_sec": round(count / cold),
+        "warm_per_sec": round(count / warm),
+    }
+    if check:
+        stems = {Path(n).stem for n, _p in names}
+        result["mismatches"] = sum(
+            naming._rightmost_episode_token(s) != rightmost_token_per_pattern(s) for s in stems
+        )
+    return result
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--count", type=int, default=100_000, help="names to classify (default: 100000)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--check", action="store_true", help="compare every answer with the per-pattern matcher")
+    args = ap.parse_args()
+
+    r = run(args.count, args.seed, args.check)
+    print(f"{r['names']} names ({r['distinct']} distinct, {r['episodes']} episodes)")
+    print(f"  cold: {r['cold_per_sec']:>10,} names/s")
+    print(f"  warm: {r['warm_per_sec']:>10,} names/s")
+    if args.check:
+        print(f"  mismatches against the per-pattern matcher: {r['mismatches']}")
+        return 1 if r["mismatches"] else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
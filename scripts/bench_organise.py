@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Measure how fast the organiser gets through a large synthetic import.
+
+Builds an import folder and a library out of sparse files — scene-named
+movies, season packs with subtitles, flat dump folders, loose numbered series
+and collection folders, with a share of the imports already in the library —
+then runs the organiser over it in a fresh process for every combination of
+``--mode`` and ``--dupe-mode`` asked for. Each run reports videos decided per
+second (placed or turned away as duplicates; sidecars and NFOs that ride
+along are not counted), the filesystem calls the organiser made (from
+``--profile``; with ``--strace``, real system calls) and its peak memory.
+Every run over the same tree must place the same files, give or take the
+library copies its dupe mode turns away; a run that does not fails.
+
+Results can be stored as a baseline and later runs compared against it; a run
+slower, busier or larger than the baseline by more than ``--tolerance`` fails.
+
+    python scripts/bench_organise.py                          # 1k and 10k videos, every mode
+    python scripts/bench_organise.py --sizes 100000 --modes move --dupe-modes off,hash
+    python scripts/bench_organise.py --save-baseline scripts/bench_organise_baseline.json
+    python scripts/bench_organise.py --baseline scripts/bench_organise_baseline.json
+
+Videos are sparse, so a 100k-file tree takes little disk until it is copied;
+``--video-size`` sets their apparent size (default 3M, just past the two MiB a
+fingerprint reads). Copy mode writes every byte, so size the scratch disk for it:
+about 30 GiB at 10k videos and 300 GiB at 100k, which is why the stored
+baseline has 100k results for move mode only.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+_REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_REPO))
+
+from media_organiser.iorate import parse_rate  # noqa: E402
+
+MODES = ("move", "copy")
+DUPE_MODES = ("off", "name", "size", "hash")
+# Share of the import, by layout.
+_LAYOUTS = (("movie", 0.35), ("season", 0.25), ("dump", 0.20), ("numbered", 0.10), ("collection", 0.10))
+_WORDS = ["Amber", "Harbor", "Silent", "Crimson", "Winter", "Echo", "Iron", "Velvet", "Paper", "Hollow",
+          "Neon", "Golden", "Distant", "Broken", "Lunar", "Wild", "Glass", "Northern", "Saint", "Quiet"]
+_TAGS = ["BluRay.x264", "WEB-DL.x265", "HDTV.x264", "WEBRip.AAC", "BluRay.HEVC"]
+_GROUPS = ["-GRP", "-DoNE", "-NTb", "-RARBG", ""]
+_QUALITIES = ["1080p", "720p", "2160p"]
+# How far past the baseline a run may fall before it counts as a regression.
+_TOLERANCE = 0.25
+
+
+def _code(i: int) -> str:
+    """A short letters-only tag, so titles stay unique without digits the name parser would read."""
+    out = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        out = chr(ord("a") + r) + out
+    return out.capitalize()
+
+
+def _sparse(path: Path, size: int, tag: str) -> None:
+    """A file of apparent ``size`` with a few unique bytes at each end and a hole between."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    marker = hashlib.sha256(tag.encode()).digest()
+    with open(path, "wb") as f:
+        f.write(marker)
+        f.truncate(size)
+        if size > 2 * len(marker):
+            f.seek(size - len(marker))
+            f.write(marker)
+
+
+def build_tree(root: Path, count: int, video_size: int = 3 << 20, library_share: float = 0.1,
+               seed: int = 1) -> dict:
+    """
+    ``count`` import videos under ``root/import`` and a library under ``root/library``.
+
+    About ``library_share`` of the imported movies are already in the library,
+    filed under their title and year and with the same bytes, so ``name``,
+    ``size`` and ``hash`` all find the same copies. Every video has its own
+    size, so ``size`` matches nothing else. Returns how many folders of each
+    layout were made, and how many videos, sidecars and library copies.
+    """
+    rnd = random.Random(seed)
+    inbox, library = root / "import", root / "library"
+    counts = {name: 0 for name, _share in _LAYOUTS}
+    counts.update(sidecars=0, library=0)
+    made = 0
+    n = 0
+    while made < count:
+        n += 1
+        layout = rnd.choices([name for name, _ in _LAYOUTS], [share for _, share in _LAYOUTS])[0]
+        title = f"{rnd.choice(_WORDS)} {rnd.choice(_WORDS)} {_code(n)}"
+        dotted = title.replace(" ", ".")
+        quality = rnd.choice(_QUALITIES)
+        year = rnd.randint(1960, 2024)
+        release = f"{dotted}.{year}.{quality}.{rnd.choice(_TAGS)}{rnd.choice(_GROUPS)}"
+        if layout == "movie":
+            folder = inbox / release
+            size = video_size + made
+            _sparse(folder / f"{release}.mkv", size, release)
+            if rnd.random() < 0.5:
+                (folder / f"{release}.nfo").write_text(f"<movie><title>{title}</title><year>{year}</year></movie>")
+                counts["sidecars"] += 1
+            if rnd.random() < library_share:
+                placed = library / "movies" / title / f"{title} {year} [{quality}].mkv"
+                _sparse(placed, size, release)
+                counts["library"] += 1
+            made += 1
+        elif layout == "season":
+            season = rnd.randint(1, 9)
+            folder = inbox / f"{dotted}.S{season:02d}.{quality}.{rnd.choice(_TAGS)}"
+            for ep in range(1, min(10, count - made) + 1):
+                name = f"{dotted}.S{season:02d}E{ep:02d}.{quality}"
+                _sparse(folder / f"{name}.mkv", video_size + made, name)
+                (folder / f"{name}.en.srt").write_text("1\n00:00:01,000 --> 00:00:02,000\nhi\n")
+                counts["sidecars"] += 1
+                made += 1
+        elif layout == "dump":
+            folder = inbox / "downloads"
+            name = f"{dotted}.{year}.{quality}"
+            _sparse(folder / f"{name}.mp4", video_size + made, name)
+            (folder / f"{name}.en.srt").write_text("1\n00:00:01,000 --> 00:00:02,000\nhi\n")
+            counts["sidecars"] += 1
+            made += 1
+        elif layout == "numbered":
+            folder = inbox / title.upper().replace(" ", "")
+            for ep in range(1, min(8, count - made) + 1):
+                name = f"{folder.name}-{ep}"
+                _sparse(folder / f"{name}.mp4", video_size + made, name)
+                made += 1
+        else:
+            folder = inbox / f"{rnd.choice(_WORDS)} {_code(n)} Collection"
+            for part in range(1, min(4, count - made) + 1):
+                name = f"{dotted}.Part.{_code(part)}.{year + part}.{quality}"
+                _sparse(folder / f"{name}.mkv", video_size + made, name)
+                made += 1
+        counts[layout] += 1
+    (library / "movies").mkdir(parents=True, exist_ok=True)
+    counts["videos"] = made
+    return counts
+
+
+def _strace_calls(path: Path) -> Optional[int]:
+    """The total from an ``strace -c`` summary; columns are right-aligned under the header."""
+    end = None
+    for line in path.read_text(errors="replace").splitlines():
+        if "calls" in line and "syscall" in line:
+            end = line.index("calls") + len("calls")
+        elif end is not None and line.split()[-1:] == ["total"]:
+            cell = line[:end].split()[-1:]
+            return int(cell[0]) if cell and cell[0].isdigit() else None
+    return None
+
+
+def run_once(root: Path, mode: str, dupe_mode: str, videos: int, use_strace: bool = False) -> dict:
+    """
+    Organise ``root/import`` into ``root/library`` in a fresh interpreter; returns its measurements.
+
+    ``videos`` is how many the import holds, as :func:`build_tree` counted them.
+    """
+    report_path = root / "profile.json"
+    argv = [str(root / "import"), str(root / "library"), "--mode", mode, "--dupe-mode", dupe_mode,
+            "--stable-interval", "0", "--no-fingerprint-cache", "--profile-json", str(report_path)]
+    cmd = [sys.executable, "-c", "from media_organiser.cli import main; main()", *argv]
+    trace = root / "strace.txt"
+    if use_strace:
+        cmd = ["strace", "-f", "-c", "-o", str(trace), *cmd]
+    env = dict(os.environ, PYTHONPATH=str(_REPO) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    started = time.perf_counter()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, env=env)
+    wall = time.perf_counter() - started
+    report = json.loads(report_path.read_text())
+    return {
+        "wall": round(wall, 3),
+        "elapsed": report["elapsed"],
+        "videos": videos,
+        "placed": sum(report["placed"].values()),  # every file moved, sidecars and NFOs included
+        "videos_per_sec": round(videos / report["elapsed"], 1) if report["elapsed"] else None,
+        "fs_calls": sum(v["calls"] for v in report["fs"].values()),
+        "syscalls": _strace_calls(trace) if use_strace else None,
+        "peak_rss": report["peak_rss"],
+        "fingerprint_read": report["bytes"]["fingerprint_read"],
+        "copied": report["bytes"]["copied"],
+        "stages": report["stages"],
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = _TOLERANCE) -> list[str]:
+    """Regressions against ``baseline``: slower, more filesystem calls or more memory than it allows."""
+    problems = []
+    for key, now in results.items():
+        then = baseline.get(key)
+        if then is None:
+            continue
+        if then.get("videos_per_sec") and now["videos_per_sec"] < then["videos_per_sec"] * (1 - tolerance):
+            problems.append(f"{key}: {now['videos_per_sec']} videos/s, baseline {then['videos_per_sec']}")
+        for metric in ("fs_calls", "syscalls", "peak_rss"):
+            if then.get(metric) and now.get(metric) and now[metric] > then[metric] * (1 + tolerance):
+                problems.append(f"{key}: {metric} {now[metric]}, baseline {then[metric]}")
+    return problems
+
+
+def uneven_counts(results: dict) -> list[str]:
+    """
+    Runs that placed a different number of files from the others over the same tree.
+
+    Transfer modes must not change what is placed, and every dupe mode other
+    than ``off`` turns away the same library copies, so within one size the
+    runs with ``off`` must agree with each other, and so must the rest.
+    """
+    groups: dict[tuple[str, bool], dict[str, int]] = {}
+    for key, r in results.items():
+        count, _mode, dupe_mode = key.split("/")
+        groups.setdefault((count, dupe_mode == "off"), {})[key] = r["placed"]
+    problems = []
+    for placed in groups.values():
+        if len(set(placed.values())) > 1:
+            problems.append("placed " + ", ".join(f"{key} {n}" for key, n in sorted(placed.items())))
+    return problems
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000", help="import sizes in videos (default: 1000,10000)")
+    ap.add_argument("--modes", default=",".join(MODES), help="transfer modes to run (default: move,copy)")
+    ap.add_argument("--dupe-modes", default=",".join(DUPE_MODES), help="dupe modes to run (default: all four)")
+    ap.add_argument("--video-size", default="3M", help="apparent size of each video (default: 3M)")
+    ap.add_argument("--library-share", type=float, default=0.1,
+                    help="share of imported movies already in the library (default: 0.1)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--workdir", default=None, help="scratch directory (default: a temporary one)")
+    ap.add_argument("--strace", action="store_true", help="count real system calls with strace -c")
+    ap.add_argument("--baseline", default=None, help="compare with results stored here; exit 1 on regression")
+    ap.add_argument("--save-baseline", default=None, help="store these results here")
+    ap.add_argument("--tolerance", type=float, default=_TOLERANCE,
+                    help=f"allowed slowdown or growth against the baseline (default: {_TOLERANCE})")
+    args = ap.parse_args()
+
+    if args.strace and shutil.which("strace") is None:
+        print("strace not found", file=sys.stderr)
+        return 2
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    modes = [m for m in args.modes.split(",") if m.strip()]
+    dupe_modes = [d for d in args.dupe_modes.split(",") if d.strip()]
+    video_size = parse_rate(args.video_size)
+
+    results = {}
+    scratch = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="bench-organise-"))
+    try:
+        for count in sizes:
+            for mode in modes:
+                for dupe_mode in dupe_modes:
+                    root = scratch / f"{count}-{mode}-{dupe_mode}"
+                    shutil.rmtree(root, ignore_errors=True)
+                    made = build_tree(root, count, video_size, args.library_share, args.seed)
+                    r = results[f"{count}/{mode}/{dupe_mode}"] = run_once(
+                        root, mode, dupe_mode, made["videos"], args.strace)
+                    shutil.rmtree(root, ignore_errors=True)
+                    calls = f"{r['syscalls']:,} syscalls" if r["syscalls"] is not None else f"{r['fs_calls']:,} fs calls"
+                    rss = f"{r['peak_rss'] / (1 << 20):.0f} MiB" if r["peak_rss"] else "?"
+                    print(f"{count:>7} {mode:<5} {dupe_mode:<5} {r['videos_per_sec']:>9,.1f} videos/s  "
+                          f"{calls}  peak {rss}  ({r['videos']} videos, {r['placed']} files placed in {r['elapsed']:.1f}s)")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    uneven = uneven_counts(results)
+    for p in uneven:
+        print(f"MISMATCH: {p}")
+    if args.save_baseline and not uneven:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION: {p}")
+        return 1 if problems or uneven else 0
+    return 1 if uneven else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
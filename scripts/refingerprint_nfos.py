@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Rewrite the localhash in every NFO under a library to a newer fingerprint scheme.
+
+NFOs written before fingerprint schemes were recorded hold a bare MD5 of the
+first and last MiB of their video. Those still read correctly - they are taken
+to be that legacy scheme - but they can only be compared with fingerprints made
+the same way. This walks a library, fingerprints each NFO's video with the
+target scheme and rewrites just the ``uniqueid type="localhash"`` element,
+leaving titles and anything edited by hand alone.
+
+A video is only re-fingerprinted once it still matches the hash its NFO holds.
+One that does not has rotted or been replaced since the NFO was written; its
+NFO is left as it is, as the evidence ``media_organiser.scrub`` looks for, and
+the file is reported as a mismatch.
+
+Meant to run in the background: it lowers its own CPU priority, can pause
+between files, stops after ``--limit`` upgrades so a large library can be done
+a slice at a time, and skips NFOs already on the target scheme, so rerunning it
+carries on where the last run stopped.
+
+    python scripts/refingerprint_nfos.py /data/content
+    python scripts/refingerprint_nfos.py /data/content/movies --limit 500 --sleep 0.2
+    python scripts/refingerprint_nfos.py /data/content --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from media_organiser import fingerprints, localhash  # noqa: E402
+from media_organiser.constants import STATE_DIR_NAME, VIDEO_EXTS  # noqa: E402
+from media_organiser.nfo import read_nfo_to_meta, set_localhash  # noqa: E402
+
+_SKIP_DIRS = {STATE_DIR_NAME, ".trash"}
+
+
+def iter_nfos(root: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in _SKIP_DIRS)
+        for name in sorted(filenames):
+            if name.lower().endswith(".nfo"):
+                yield Path(dirpath) / name
+
+
+def video_for(nfo: Path, meta: dict) -> Optional[Path]:
+    """The video an NFO describes: its recorded path, its namesake, or a Kodi folder's only video."""
+    recorded = meta.get("filenameandpath")
+    if recorded and Path(recorded).is_file() and Path(recorded).parent == nfo.parent:
+        return Path(recorded)
+    videos = [p for p in nfo.parent.iterdir() if p.is_file() and p.suffix.lower() in VIDEO_EXTS]
+    same_stem = [p for p in videos if p.stem == nfo.stem]
+    if same_stem:
+        return same_stem[0]
+    if nfo.name.lower() == "movie.nfo" and len(videos) == 1:
+        return videos[0]
+    return None
+
+
+def upgrade(root: Path, target: localhash.Scheme, limit: int = 0, sleep: float = 0.0,
+            dry_run: bool = False, log=print) -> dict:
+    """Bring every NFO under ``root`` onto ``target``; returns counts by outcome."""
+    counts = {"upgraded": 0, "current": 0, "no-hash": 0, "no-video": 0, "mismatch": 0, "failed": 0}
+    for nfo in iter_nfos(root):
+        if limit and counts["upgraded"] >= limit:
+            break
+        meta = read_nfo_to_meta(nfo)
+        if not meta.get("uniqueid_localhash"):
+            counts["no-hash"] += 1
+            continue
+        old = meta.get("uniqueid_localhash_scheme") or localhash.LEGACY.key
+        if old == target.key:
+            counts["current"] += 1
+            continue
+        video = video_for(nfo, meta)
+        if video is None:
+            counts["no-video"] += 1
+            continue
+        old_scheme = localhash.get(old)
+        if old_scheme is None:
+            log(f"FAILED: {nfo}: unknown fingerprint scheme {old}")
+            counts["failed"] += 1
+            continue
+        try:
+            # Read from the file itself: rot that left the mtime alone would still match a cached hash.
+            _size, now = old_scheme.read(video)
+            if not localhash.same_content(old, now, old, meta["uniqueid_localhash"].strip()):
+                log(f"MISMATCH: {nfo}: {video.name} no longer matches its {old} hash; left alone")
+                counts["mismatch"] += 1
+                continue
+            _size, digest = target.fingerprint(video)
+        except OSError as e:
+            log(f"FAILED: {nfo}: {e}")
+            counts["failed"] += 1
+            continue
+        if not dry_run and not set_localhash(nfo, digest, target.key):
+            counts["failed"] += 1
+            continue
+        log(f"{'WOULD UPGRADE' if dry_run else 'UPGRADED'}: {nfo} ({old} -> {target.key})")
+        counts["upgraded"] += 1
+        if sleep:
+            time.sleep(sleep)
+    return counts
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("root", help="library (or part of one) to walk")
+    ap.add_argument("--scheme", choices=localhash.available(), default=localhash.BLAKE2_SAMPLED.key,
+                    help=f"scheme to upgrade to (default: {localhash.BLAKE2_SAMPLED.key})")
+    ap.add_argument("--limit", type=int, default=0, help="stop after this many upgrades (default: no limit)")
+    ap.add_argument("--sleep", type=float, default=0.0, help="seconds to pause after each upgrade")
+    ap.add_argument("--fingerprint-cache", default=None,
+                    help="fingerprint cache to read and fill (default: none)")
+    ap.add_argument("--dry-run", action="store_true", help="report what would change, write nothing")
+    args = ap.parse_args()
+
+    root = Path(args.root).expanduser()
+    if not root.is_dir():
+        print(f"not a directory: {root}", file=sys.stderr)
+        return 2
+    if hasattr(os, "nice"):
+        try:
+            os.nice(10)
+        except OSError:
+            pass
+
+    cache = fingerprints.FingerprintCache(Path(args.fingerprint_cache)) if args.fingerprint_cache else None
+    previous = fingerprints.install(cache)
+    try:
+        counts = upgrade(root, localhash.get(args.scheme), args.limit, args.sleep, args.dry_run)
+    finally:
+        fingerprints.install(previous)
+        if cache is not None:
+            cache.close()
+    print(", ".join(f"{n} {k}" for k, n in counts.items()))
+    return 1 if counts["failed"] or counts["mismatch"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,7 @@
 """Tests for ffprobe/mutagen bitrate detection (cross-platform)."""
 
 from pathlib import Path
+import os
 
 import pytest
 
@@ -58,3 +59,74 @@ def test_detect_bitrate_rejects_below_minimum(tmp_path: Path, monkeypatch: pytes
     q = audio_tools.detect_bitrate_and_quality(p)
     assert q["quality_status"] == "rejected"
     assert q["rejected_reason"] is not None
+
+
+def test_a_320_mp3_is_written_as_a_fresh_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_ffprobe(path: Path) -> dict:
+        return {
+            "format": {"duration": "120.0", "bit_rate": "320000"},
+            "streams": [{"codec_name": "mp3", "sample_rate": "44100"}],
+        }
+
+    monkeypatch.setattr(audio_tools, "_run_ffprobe", fake_ffprobe)
+    src = tmp_path / "upload" / "Artist - Song.mp3"
+    src.parent.mkdir()
+    src.write_bytes(b"ID3" + bytes(range(256)) * 40)
+    src.chmod(0o600)
+    os.utime(src, (1_000_000_000, 1_000_000_000))
+    library = tmp_path / "music"
+    result = audio_tools.ensure_mp3_320(src, library, scan_library_duplicates=False)
+
+    out = Path(result["output_path"])
+    assert result["status"] == "ok" and out.read_bytes() == src.read_bytes()
+    assert out.stat().st_mtime > 1_000_000_000, "not the upload's mtime"
+    assert [p.name for p in out.parent.iterdir()] == [out.name], "nothing left beside it"
+
+
+def test_a_failed_copy_leaves_nothing_in_the_library(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def pace(n: int) -> None:
+        raise OSError("disk full")
+
+    pace.step = 1 << 10
+    monkeypatch.setattr(audio_tools.iorate, "pacer", lambda *fds: pace)
+    src = tmp_path / "Artist - Song.mp3"
+    src.write_bytes(b"ID3" + bytes(range(256)) * 40)
+    target = tmp_path / "music" / "Song.mp3"
+    target.parent.mkdir()
+    with pytest.raises(OSError):
+        audio_tools._write_copy(src, target)
+    assert list(target.parent.iterdir()) == []
+
+
+def test_an_interrupted_transcode_does_not_leave_ffmpeg_running(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls = []
+
+    class FakeFfmpeg:
+        pid = 0
+        returncode = None
+
+        def __init__(self, cmd, **kwargs) -> None:
+            calls.append("start")
+
+        def communicate(self):
+            raise KeyboardInterrupt
+
+        def kill(self) -> None:
+            calls.append("kill")
+
+        def wait(self) -> int:
+            calls.append("wait")
+            return -9
+
+    monkeypatch.setattr(audio_tools, "_run_ffprobe", lambda path: {
+        "format": {"duration": "120.0", "bit_rate": "900000"},
+        "streams": [{"codec_name": "flac", "sample_rate": "44100"}],
+    })
+    monkeypatch.setattr(audio_tools.subprocess, "Popen", FakeFfmpeg)
+    src = tmp_path / "Artist - Song.flac"
+    src.write_bytes(b"fLaC" + bytes(64))
+    with pytest.raises(KeyboardInterrupt):
+        audio_tools.ensure_mp3_320(src, tmp_path / "music", scan_library_duplicates=False)
+    assert calls == ["start", "kill", "wait"]
@@ -0,0 +1,68 @@
+# tests/test_bench_organise.py
+import importlib.util
+from pathlib import Path
+
+_SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "bench_organise.py"
+_spec = importlib.util.spec_from_file_location("bench_organise", _SCRIPT)
+bench = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench)
+
+
+def test_build_tree_makes_every_layout_out_of_sparse_files(tmp_path):
+    counts = bench.build_tree(tmp_path, 120, video_size=3 << 20, library_share=0.5)
+    videos = [p for p in (tmp_path / "import").rglob("*") if p.suffix in (".mkv", ".mp4")]
+    assert counts["videos"] == len(videos) == 120
+    assert all(counts[layout] for layout, _share in bench._LAYOUTS)
+    assert counts["library"] and any((tmp_path / "library" / "movies").rglob("*.mkv"))
+    assert any(p.suffix == ".srt" for p in (tmp_path / "import").rglob("*"))
+    st = videos[0].stat()
+    assert st.st_size >= 3 << 20
+    if hasattr(st, "st_blocks"):
+        assert st.st_blocks * 512 < st.st_size  # a hole, not 3 MiB of zeros
+    # Deterministic for a seed: the same tree twice.
+    again = bench.build_tree(tmp_path / "again", 120, library_share=0.5)
+    assert sorted(p.name for p in (tmp_path / "again" / "import").rglob("*")) == \
+        sorted(p.name for p in (tmp_path / "import").rglob("*"))
+    assert again == counts
+
+
+def test_compare_flags_slower_busier_or_larger_runs_only():
+    baseline = {"1000/move/off": {"videos_per_sec": 200.0, "fs_calls": 10000, "syscalls": None, "peak_rss": 100}}
+    same = {"1000/move/off": {"videos_per_sec": 180.0, "fs_calls": 11000, "syscalls": 5, "peak_rss": 110}}
+    assert bench.compare(same, baseline) == []
+    worse = {"1000/move/off": {"videos_per_sec": 100.0, "fs_calls": 20000, "syscalls": None, "peak_rss": 100},
+             "10/copy/hash": {"videos_per_sec": 1.0, "fs_calls": 1, "syscalls": None, "peak_rss": 1}}
+    problems = bench.compare(worse, baseline)
+    assert len(problems) == 2 and all(p.startswith("1000/move/off") for p in problems)
+
+
+def test_strace_summary_total_is_read_from_the_calls_column(tmp_path):
+    summary = tmp_path / "strace.txt"
+    summary.write_text(
+        "% time     seconds  usecs/call     calls    errors syscall\n"
+        "------ ----------- ----------- --------- --------- ----------------\n"
+        " 60.00    0.000600           3       200        12 openat\n"
+        "------ ----------- ----------- --------- --------- ----------------\n"
+        "100.00    0.001000                  1234        56 total\n"
+    )
+    assert bench._strace_calls(summary) == 1234
+
+
+def test_rate_counts_videos_not_the_sidecars_that_ride_along(tmp_path):
+    counts = bench.build_tree(tmp_path, 30, video_size=1 << 16)
+    r = bench.run_once(tmp_path, "move", "off", counts["videos"])
+    assert r["videos"] == 30 and r["placed"] > 30  # subtitles and NFOs are placed too
+    assert r["videos_per_sec"] == round(30 / r["elapsed"], 1)
+
+
+def test_every_dupe_mode_turns_away_the_same_library_copies(tmp_path):
+    results = {}
+    for dupe_mode in bench.DUPE_MODES:
+        root = tmp_path / dupe_mode
+        counts = bench.build_tree(root, 200, video_size=1 << 16, library_share=0.5)
+        results[f"200/move/{dupe_mode}"] = bench.run_once(root, "move", dupe_mode, counts["videos"])
+    assert bench.uneven_counts(results) == []
+    assert results["200/move/hash"]["placed"] < results["200/move/off"]["placed"]
+    results["200/copy/size"] = dict(results["200/move/size"], placed=1)
+    [problem] = bench.uneven_counts(results)
+    assert problem.startswith("placed 200/copy/size 1, 200/move/hash ")
@@ -51,3 +51,41 @@ def test_prune_keeps_folder_with_non_junk_leftovers(tmp_path):
     _run_cli(src, dst, ["--mode", "move", "--emit-nfo", "off", "--dupe-mode", "off"])
     # Folder should remain because non-junk file still there
     assert movie_dir.exists(), "folder must remain when non-junk files are present"
+
+
+def test_pruner_visits_each_folder_once_deepest_first(tmp_path, monkeypatch):
+    from media_organiser import cleanup
+    from media_organiser.cleanup import Pruner
+
+    src = tmp_path / "in"
+    season = src / "Show" / "Season 1"
+    season.mkdir(parents=True)
+    (season / "Show.S01.YTS.jpg").write_bytes(b"img")
+    (src / "Other").mkdir()
+    (src / "Other" / "keep.mkv").write_bytes(b"v")
+
+    listed = []
+    real = cleanup.snapshot.listdir
+    monkeypatch.setattr(cleanup.snapshot, "listdir", lambda d: listed.append(d) or real(d))
+    pruner = Pruner(src, ["yts"])
+    for _ in range(24):  # one touch per moved episode
+        pruner.touch(season)
+    pruner.touch(src / "Other")
+    assert pruner.run() == 2
+
+    assert not (src / "Show").exists()
+    assert (src / "Other" / "keep.mkv").exists() and src.exists()
+    assert listed[0] == season and sorted(listed[1:]) == [src / "Other", src / "Show"]
+
+
+def test_season_pack_folder_is_pruned_after_the_run(tmp_path):
+    src = tmp_path / "in"; dst = tmp_path / "out"
+    pack = src / "Show.S01.1080p"
+    pack.mkdir(parents=True)
+    for ep in range(1, 5):
+        (pack / f"Show.S01E{ep:02d}.1080p.mkv").write_bytes(bytes([ep]) * 64)
+    (pack / "RARBG.txt").write_text("junk")
+
+    _run_cli(src, dst, ["--mode", "move", "--emit-nfo", "off", "--dupe-mode", "off", "--stable-interval", "0"])
+    assert not pack.exists()
+    assert src.exists(), "the source root itself is never pruned"
@@ -139,7 +139,7 @@ def test_skip_videos_under_apple_double_and_macosx(tmp_path):
     (src / ".AppleDouble").mkdir()
     (src / "__MACOSX").mkdir()
 
-    # Enough bytes so is_file_size_stable passes (interval=1.0)
+    # Enough bytes to pass the stability check
     (src / ".AppleDouble" / "Some.Movie.2020.720p.mkv").write_bytes(b"X" * 4096)
     (src / "__MACOSX" / "foo.mkv").write_bytes(b"Y" * 4096)
 
@@ -377,12 +377,12 @@ def test_tv_nfo_merges_src_dest_and_subtitles(tmp_path, monkeypatch):
         return (a or []) + (b or [])
 
     # Patch into the cli module namespace (important!)
-    monkeypatch.setattr("media_organiser.cli.find_nfo", fake_find_nfo)
-    monkeypatch.setattr("media_organiser.cli.read_nfo_to_meta", fake_read_nfo_to_meta)
-    monkeypatch.setattr("media_organiser.cli.nfo_path_for", fake_nfo_path_for)
-    monkeypatch.setattr("media_organiser.cli.merge_first", fake_merge_first)
-    monkeypatch.setattr("media_organiser.cli.merge_subtitles", fake_merge_subtitles)
-    monkeypatch.setattr("media_organiser.cli.copy_move_sidecars", fake_copy_move_sidecars)
+    monkeypatch.setattr("media_organiser.organiser.find_nfo", fake_find_nfo)
+    monkeypatch.setattr("media_organiser.organiser.read_nfo_to_meta", fake_read_nfo_to_meta)
+    monkeypatch.setattr("media_organiser.organiser.nfo_path_for", fake_nfo_path_for)
+    monkeypatch.setattr("media_organiser.organiser.merge_first", fake_merge_first)
+    monkeypatch.setattr("media_organiser.organiser.merge_subtitles", fake_merge_subtitles)
+    monkeypatch.setattr("media_organiser.organiser.copy_move_sidecars", fake_copy_move_sidecars)
 
     # Run TV flow (must not be dry-run for NFO creation path)
     buf = io.StringIO()
@@ -545,7 +545,7 @@ def test_carry_posters_called_in_movie_flow(tmp_path, monkeypatch):
         called["dst_dir"] = dst_dir
         called["policy"] = policy
 
-    monkeypatch.setattr("media_organiser.cli.carry_poster_with_sieve", fake_carry_poster_with_sieve)
+    monkeypatch.setattr("media_organiser.organiser.carry_poster_with_sieve", fake_carry_poster_with_sieve)
 
     # Don't waste time writing NFOs here
     run_cli_in_proc(src, dst, ["--mode", "copy", "--emit-nfo", "off", "--dupe-mode", "off", "--carry-posters", "keep"])
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+import pytest
+
+from media_organiser.devices import DeviceScheduler, device_class, parse_device_jobs
+from media_organiser.pipeline import Deferred, run_staged
+
+
+def test_parse_device_jobs_overrides_defaults_and_rejects_nonsense():
+    assert parse_device_jobs("ssd=8") == {"hdd": 1, "ssd": 8, "other": 2}
+    assert parse_device_jobs("HDD=2, other=1") == {"hdd": 2, "ssd": 4, "other": 1}
+    for bad in ("nvme=2", "hdd", "hdd=0", "ssd=many"):
+        with pytest.raises(ValueError):
+            parse_device_jobs(bad)
+
+
+def test_device_class_reads_rotational_flag_from_disk_or_parent(tmp_path):
+    disk = tmp_path / "devices" / "sda"
+    (disk / "queue").mkdir(parents=True)
+    (disk / "queue" / "rotational").write_text("1\n")
+    (disk / "sda1").mkdir()
+    nvme = tmp_path / "devices" / "nvme0n1" / "queue"
+    nvme.mkdir(parents=True)
+    (nvme / "rotational").write_text("0\n")
+    block = tmp_path / "block"
+    block.mkdir()
+    (block / "8:0").symlink_to(disk)
+    (block / "8:1").symlink_to(disk / "sda1")
+    (block / "259:0").symlink_to(nvme.parent)
+
+    assert device_class(os.makedev(8, 0), block) == "hdd"
+    assert device_class(os.makedev(8, 1), block) == "hdd"
+    assert device_class(os.makedev(259, 0), block) == "ssd"
+    assert device_class(os.makedev(0, 42), block) == "other"
+    assert device_class(os.makedev(9, 9), block) == "other"
+
+
+def _recording(active, peak, lock, dev, order, n):
+    def work():
+        with lock:
+            active[dev] += 1
+            peak[dev] = max(peak[dev], active[dev])
+            order.append((dev, n))
+        time.sleep(0.02)
+        with lock:
+            active[dev] -= 1
+    return work
+
+
+def test_one_stream_per_spindle_runs_in_parallel_across_disks():
+    classes = {1: "hdd", 2: "hdd", 3: "ssd"}
+    active, peak, order, lock = {1: 0, 2: 0, 3: 0}, {1: 0, 2: 0, 3: 0}, [], threading.Lock()
+    started = time.monotonic()
+    with DeviceScheduler({"ssd": 3}, classify=classes.get) as lanes:
+        futures = [lanes.submit((dev,), _recording(active, peak, lock, dev, order, n))
+                   for n in range(3) for dev in (1, 2, 3)]
+    elapsed = time.monotonic() - started
+
+    assert all(f.done() for f in futures)
+    assert peak[1] == peak[2] == 1          # spinning disks never see two streams
+    assert peak[3] == 3                     # the SSD takes all three at once
+    assert [n for dev, n in order if dev == 1] == [0, 1, 2]  # a disk's queue keeps submission order
+    assert elapsed < 9 * 0.02               # the two disks and the SSD overlapped
+    assert lanes.peak[1] == 1 and lanes.ran[1] == 3
+
+
+def test_settle_waits_for_holders_and_deferred_work_keeps_output_order(capsys):
+    release = threading.Event()
+    with DeviceScheduler(classify=lambda dev: "hdd") as lanes:
+        slow = lanes.submit((1,), lambda: release.wait(1.0), holds=[("dir", "a")])
+        threading.Timer(0.05, release.set).start()
+        lanes.settle([("dir", "b")])          # nothing holds this: returns at once
+        assert not slow.done()
+        lanes.settle([("dir", "a")])
+        assert slow.done()
+
+        def place(n):
+            print(f"place {n}")
+
+            def move():
+                time.sleep(0.03 if n == 0 else 0)
+                print(f"move {n}")
+            # 0 and 2 share a disk; 1 is on its own and finishes first.
+            return Deferred((10 + n % 2,), move)
+
+        run_staged(range(3), lambda n: n, place, jobs=2, lanes=lanes)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [f"{stage} {n}" for n in range(3) for stage in ("place", "move")]
+
+
+def test_describe_jobs_run_in_the_pool_and_free_the_lane():
+    threads, events, lock = {}, [], threading.Lock()
+    first_described = threading.Event()
+
+    def place(n):
+        def move():
+            with lock:
+                events.append(f"move {n}")
+            threads[f"move {n}"] = threading.current_thread().name
+
+            def describe():
+                threads[f"describe {n}"] = threading.current_thread().name
+                if n == 0:
+                    # The second move shares the one hdd slot; it must not wait for this.
+                    first_described.wait(1.0)
+                with lock:
+                    events.append(f"describe {n}")
+                if n == 1:
+                    first_described.set()
+            return describe
+        return Deferred((1,), move)
+
+    with DeviceScheduler(classify=lambda dev: "hdd") as lanes:
+        assert lanes._pool._max_workers == 1 + 4 + 2, "a worker per slot of each class"
+        run_staged(range(2), lambda n: n, place, jobs=2, lanes=lanes)
+    assert events == ["move 0", "move 1", "describe 1", "describe 0"]
+    assert all(threads[f"move {n}"].startswith("organise-lane") for n in range(2))
+    assert all(threads[f"describe {n}"].startswith("organise-describe") for n in range(2))
@@ -1,6 +1,10 @@
 # tests/test_duplicates.py
 from pathlib import Path
+import hashlib
+import json
 import os
+import threading
+import tracemalloc
 
 import media_organiser.duplicates as dup
 from media_organiser.duplicates import (
@@ -305,3 +309,321 @@ def test_nonempty_matching_still_works_alongside_empty_files(tmp_path):
     idx = build_library_import_dup_index(movies, tv, "hash")
     assert idx.find_duplicate(cand) == real
     assert is_duplicate_in_dir(cand, movies, "hash") == real
+
+
+# ---------- persistent library index ----------
+
+def test_saved_index_is_revalidated_without_relisting_unchanged_dirs(tmp_path, monkeypatch):
+    movies = tmp_path / "movies"
+    tv = tmp_path / "tv"
+    blob = os.urandom(900)
+    existing = movies / "Keep (2001)" / "Keep (2001) [Other].mkv"
+    write(existing, blob)
+    write(movies / "Other (2002)" / "Other (2002) [Other].mkv", os.urandom(900))
+    state = tmp_path / "state" / "library_index.json"
+
+    idx = build_library_import_dup_index(movies, tv, "hash", state_path=state)
+    idx.save(state)
+
+    listed = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(dup.os, "scandir", lambda p: (listed.append(Path(p)), real_scandir(p))[1])
+    reloaded = build_library_import_dup_index(movies, tv, "hash", state_path=state)
+    assert listed == [], "no directory changed, so none is listed again"
+
+    cand = tmp_path / "in.mkv"
+    write(cand, blob)
+    assert reloaded.find_duplicate(cand) == existing
+
+
+def test_index_notices_added_and_removed_files(tmp_path):
+    movies = tmp_path / "movies"
+    tv = tmp_path / "tv"
+    gone = movies / "Gone (1999)" / "Gone (1999) [Other].mkv"
+    write(gone, b"G" * 500)
+    state = tmp_path / "library_index.json"
+    build_library_import_dup_index(movies, tv, "size", state_path=state).save(state)
+
+    gone.unlink()
+    added = tv / "Show" / "Season 01" / "Show - S01E01 (Other).mkv"
+    write(added, b"A" * 700)
+
+    idx = build_library_import_dup_index(movies, tv, "size", state_path=state)
+    cand_gone = tmp_path / "a.mkv"; write(cand_gone, b"x" * 500)
+    cand_added = tmp_path / "b.mkv"; write(cand_added, b"y" * 700)
+    assert idx.find_duplicate(cand_gone) is None
+    assert idx.find_duplicate(cand_added) == added
+
+
+def test_add_records_organiser_placements(tmp_path):
+    movies = tmp_path / "movies"
+    tv = tmp_path / "tv"
+    movies.mkdir(); tv.mkdir()
+    idx = build_library_import_dup_index(movies, tv, "name")
+    placed = movies / "Heat (1995)" / "Heat (1995) [1080p].mkv"
+    write(placed, b"h")
+    idx.add(placed)
+    assert idx.find_duplicate(tmp_path / "Heat (1995) [720p].mkv") == placed
+    idx.discard(placed)
+    assert idx.find_duplicate(tmp_path / "Heat (1995) [720p].mkv") is None
+
+
+def test_removing_a_key_holder_hands_over_without_searching_the_library(tmp_path, monkeypatch):
+    movies = tmp_path / "movies"
+    tv = tmp_path / "tv"
+    copies = [movies / f"Copy {n}" / f"Copy {n}.mkv" for n in range(3)]
+    for p in copies:
+        write(p, b"C" * 900)
+    write(movies / "Other" / "Other.mkv", b"O" * 100)
+    idx = build_library_import_dup_index(movies, tv, "size")
+
+    def resort(self):
+        raise AssertionError("removal went through every indexed file")
+    monkeypatch.setattr(dup.LibraryImportDupIndex, "_reindex", resort)
+
+    cand = tmp_path / "c.mkv"
+    write(cand, b"x" * 900)
+    first = idx.find_duplicate(cand)
+    idx.discard(first)
+    second = idx.find_duplicate(cand)
+    assert second in copies and second != first
+    monkeypatch.undo()
+    for p in copies:
+        p.unlink()
+    idx.refresh()
+    assert idx.find_duplicate(cand) is None
+    assert len(idx) == 1
+
+
+def test_index_from_name_run_gains_digests_in_hash_mode(tmp_path):
+    movies = tmp_path / "movies"
+    tv = tmp_path / "tv"
+    blob = os.urandom(640)
+    existing = movies / "X" / "X.mkv"
+    write(existing, blob)
+    state = tmp_path / "library_index.json"
+    build_library_import_dup_index(movies, tv, "name", state_path=state).save(state)
+
+    idx = build_library_import_dup_index(movies, tv, "hash", state_path=state)
+    cand = tmp_path / "renamed.mkv"
+    write(cand, blob)
+    assert idx.find_duplicate(cand) == existing
+
+
+def test_index_answers_the_same_after_compacting_and_reloading(tmp_path):
+    movies = tmp_path / "movies"
+    tv = tmp_path / "tv"
+    kept = movies / "Heat (1995)" / "Heat (1995) [1080p].mkv"
+    dropped = tv / "Show" / "Season 01" / "Show - S01E01.mkv"
+    write(kept, b"h" * 300)
+    write(dropped, b"s" * 400)
+    idx = build_library_import_dup_index(movies, tv, "name")
+    placed = tv / "Show" / "Season 01" / "Show - S01E02.mkv"
+    write(placed, b"p" * 500)
+    idx.add(placed)
+    idx.discard(dropped)
+    idx._reindex()  # renumbers rows now that one is gone
+    assert len(idx) == 2 and idx._dead == 0
+    cases = [(tmp_path / "Heat (1995) [720p].mkv", kept), (tmp_path / "Show - S01E02.mkv", placed),
+             (tmp_path / "Show - S01E01.mkv", None)]
+    assert [idx.find_duplicate(c) for c, _ in cases] == [want for _, want in cases]
+
+    state = tmp_path / "library_index.json"
+    idx.save(state)
+    reloaded = build_library_import_dup_index(movies, tv, "name", state_path=state)
+    assert [reloaded.find_duplicate(c) for c, _ in cases] == [want for _, want in cases]
+
+    # An index saved before the format kept keys rather than stems still loads.
+    old = {"version": 1, "base": str(tmp_path), "dirs": {}, "files": {
+        "movies/Heat (1995)/Heat (1995) [1080p].mkv": [300, kept.stat().st_mtime_ns, None, "Heat (1995)"]}}
+    state.write_text(json.dumps(old))
+    fallback = dup.LibraryImportDupIndex("name", tmp_path, (movies, tv))
+    assert fallback._load(state) and fallback.find_duplicate(cases[0][0]) == kept
+
+
+def test_index_holds_a_file_in_about_a_hundred_bytes():
+    idx = dup.LibraryImportDupIndex("hash", Path("/lib"), (Path("/lib/movies"), Path("/lib/tv")))
+    movies, tv = (row for _root, row in idx._root_dirs)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(20000):
+            if i % 2:  # a film in its own folder
+                name = f"Film Title {i} ({1950 + i % 70}) [1080p].mkv"
+                folder = idx._new_dir(movies, name[:-12].encode())
+            else:  # an episode, ten to a season folder
+                if i % 20 == 0:
+                    show = idx._new_dir(tv, f"Show {i}".encode())
+                    season = idx._new_dir(show, b"Season 01")
+                folder, name = season, f"Show {i - i % 20} - S01E{i % 20:02d} [1080p].mkv"
+            idx._new_file(folder, name.encode(), (3 << 30 | i, i, hashlib.md5(name.encode()).digest(), i))
+        idx._reindex()
+        per_file = (tracemalloc.get_traced_memory()[0] - before) / 20000
+    finally:
+        tracemalloc.stop()
+    assert per_file < 125, f"{per_file:.0f} bytes per file"  # 500k files: about 60 MB
+
+
+# ---------- run-scoped destination index ----------
+def _with_dest_index():
+    index = dup.DestDirIndex()
+    previous = dup.install_dest_index(index)
+    return index, previous
+
+
+def test_dest_index_answers_like_a_directory_scan(tmp_path):
+    dest = tmp_path / "Season 01"
+    blob = os.urandom(900)
+    write(dest / "Show - S01E01 (1080p).mkv", blob)
+    write(dest / "Show - S01E02 (1080p).mkv", os.urandom(900))
+    write(dest / "Show - S01E01 (1080p).en.srt", b"sub")
+    write(dest / "Empty.mkv", b"")
+    cases = [
+        (tmp_path / "in" / "Show - S01E01 (720p).mkv", b"other"),
+        (tmp_path / "in" / "renamed.mkv", blob),
+        (tmp_path / "in" / "Empty Too.mkv", b""),
+    ]
+    for cand, data in cases:
+        write(cand, data)
+
+    expected = [[is_duplicate_in_dir(c, dest, m) for m in ("name", "size", "hash")] for c, _ in cases]
+    index, previous = _with_dest_index()
+    try:
+        got = [[is_duplicate_in_dir(c, dest, m) for m in ("name", "size", "hash")] for c, _ in cases]
+    finally:
+        dup.install_dest_index(previous)
+    assert got == expected
+    assert index.listed == 1
+
+
+def test_dest_index_lists_a_folder_once_and_follows_placements(tmp_path, monkeypatch):
+    from media_organiser.io_ops import transfer
+
+    dest = tmp_path / "Season 01"
+    write(dest / "Show - S01E01.mkv", os.urandom(300))
+    index, previous = _with_dest_index()
+    globbed = []
+    monkeypatch.setattr(Path, "glob", lambda self, pat: globbed.append(self) or iter(()))
+    try:
+        for ep in range(2, 6):
+            cand = tmp_path / "in" / f"Show.S01E{ep:02d}.mkv"
+            write(cand, os.urandom(300 + ep))
+            assert is_duplicate_in_dir(cand, dest, "hash") is None
+            transfer(cand, dest / f"Show - S01E{ep:02d}.mkv", "copy", dry_run=False)
+
+        again = tmp_path / "in" / "Show.S01E05.mkv"
+        assert is_duplicate_in_dir(again, dest, "hash") == dest / "Show - S01E05.mkv"
+
+        transfer(dest / "Show - S01E05.mkv", tmp_path / "elsewhere" / "x.mkv", "move", dry_run=False)
+        assert is_duplicate_in_dir(again, dest, "hash") is None
+    finally:
+        dup.install_dest_index(previous)
+    assert index.listed == 1 and globbed == []
+
+
+def test_dest_index_keeps_step_with_lane_threads(tmp_path):
+    dest = tmp_path / "Season 01"
+    files = [dest / f"Show - S01E{ep:02d}.mkv" for ep in range(1, 41)]
+    for i, f in enumerate(files):
+        write(f, os.urandom(100 + i % 4))
+    index = dup.DestDirIndex()
+    cand = tmp_path / "in" / "c.mkv"
+    write(cand, b"c" * 7)
+    assert index.find(cand, dest, "hash") is None
+    vids = index._dirs[dest]
+
+    class NoScan(dict):
+        def items(self):
+            raise AssertionError("discard searched every key")
+    vids.by_name, vids.by_size = NoScan(vids.by_name), NoScan(vids.by_size)
+
+    def churn(mine):
+        for _ in range(50):
+            for f in mine:
+                index.gone(f)
+                index.placed(f)
+    lanes = [threading.Thread(target=churn, args=(files[i::4],)) for i in range(4)]
+    for t in lanes:
+        t.start()
+    for t in lanes:
+        t.join()
+
+    assert sorted(vids.keys) == sorted(files)
+    assert sorted(p for ps in vids.by_size.values() for p in ps) == sorted(files)
+    index.gone(files[0])
+    assert files[0] not in vids.by_name.get(normalized_stem_ignore_quality(files[0]), [])
+
+
+# ---------- full mode: the comparison ladder ----------
+def test_ladder_turns_each_kind_of_difference_away_at_its_rung(tmp_path):
+    size = 3 << 20
+    base = bytearray(os.urandom(size))
+    original = tmp_path / "original.mkv"
+    write(original, bytes(base))
+
+    span = size - 2 * dup.FINGERPRINT_SAMPLE - dup.INTERIOR_BYTES
+    first_sample = dup.FINGERPRINT_SAMPLE + span // (dup.INTERIOR_SAMPLES + 1)
+
+    def variant(name, offset):
+        data = bytearray(base)
+        data[offset] ^= 0xFF
+        write(tmp_path / name, bytes(data))
+        return tmp_path / name
+
+    write(tmp_path / "shorter.mkv", bytes(base[:-1]))
+    write(tmp_path / "copy.mkv", bytes(base))
+    cases = {
+        tmp_path / "shorter.mkv": "size",
+        variant("head.mkv", 10): "head",
+        variant("interior.mkv", first_sample + 5): "sampled",
+        variant("unsampled.mkv", dup.FINGERPRINT_SAMPLE + 100): "full",
+    }
+    ladder = dup.DupeLadder()
+    for other, stage in cases.items():
+        before = dict(ladder.rejected)
+        assert not ladder.same(original, other)
+        assert {k for k in ladder.rejected if ladder.rejected[k] != before[k]} == {stage}
+    assert ladder.same(original, tmp_path / "copy.mkv")
+
+    st = ladder.stats()
+    assert st["confirmed"] == 1
+    assert st["checked"] == {"size": 5, "head": 4, "sampled": 3, "full": 2}
+    # Each file is read at most once per rung; only three were read in full.
+    heads = 8 * dup.HEAD_BYTES
+    samples = 4 * (2 * dup.FINGERPRINT_SAMPLE + dup.INTERIOR_SAMPLES * dup.INTERIOR_BYTES)
+    assert st["bytes_read"] == heads + samples + 3 * size
+    assert st["bytes_saved"] == 4 * 2 * size - st["bytes_read"]
+
+
+def test_full_mode_finds_true_copies_only(tmp_path):
+    blob = os.urandom((2 << 20) + 4096)
+    dest = tmp_path / "Film (2020)"
+    write(dest / "Film (2020).mkv", blob)
+    twin = tmp_path / "in" / "twin.mkv"
+    write(twin, blob)
+    near = tmp_path / "in" / "near.mkv"
+    write(near, blob[: (1 << 20) + 50] + b"!" + blob[(1 << 20) + 51:])
+
+    # Head, tail and interior samples agree; hash mode cannot tell them apart.
+    assert is_duplicate_in_dir(near, dest, "hash") == dest / "Film (2020).mkv"
+    assert is_duplicate_in_dir(near, dest, "full") is None
+    assert is_duplicate_in_dir(twin, dest, "full") == dest / "Film (2020).mkv"
+
+    index = build_library_import_dup_index(tmp_path / "Film (2020)", tmp_path / "none", "full")
+    assert index.find_duplicate(near) is None
+    assert index.find_duplicate(twin) == dest / "Film (2020).mkv"
+
+
+def test_full_mode_checks_every_library_file_with_the_fingerprint(tmp_path):
+    blob = os.urandom((2 << 20) + 4096)
+    near = blob[: (1 << 20) + 50] + b"!" + blob[(1 << 20) + 51:]
+    # Two library files share the candidate's fingerprint; only the second holds its bytes.
+    write(tmp_path / "movies" / "A (2001)" / "A (2001).mkv", near)
+    write(tmp_path / "movies" / "B (2002)" / "B (2002).mkv", blob)
+    index = build_library_import_dup_index(tmp_path / "movies", tmp_path / "tv", "full")
+    holders = [index._path(s) for s in index._holders(len(blob))]
+    assert [p.parent.name for p in holders] == ["A (2001)", "B (2002)"]
+    twin = tmp_path / "in" / "twin.mkv"
+    write(twin, blob)
+    assert index.find_duplicate(twin) == tmp_path / "movies" / "B (2002)" / "B (2002).mkv"
+    assert len(index) == 2, "a near miss stays in the index"
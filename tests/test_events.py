@@ -0,0 +1,76 @@
+from pathlib import Path
+import io
+import json
+import os
+import sys
+
+from media_organiser import events
+from media_organiser.cli import main as cli_main
+from media_organiser.events import EventLog
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def _run_cli(argv):
+    backup = sys.argv[:]
+    sys.argv = ["media_organiser", *argv]
+    try:
+        cli_main()
+    finally:
+        sys.argv = backup
+
+
+def test_events_are_held_back_until_a_block_is_full():
+    out = io.StringIO()
+    log = EventLog(out, flush_bytes=200)
+    log.emit("placed", {"transfer": 0.5}, source="a")
+    assert out.getvalue() == ""
+    for n in range(5):
+        log.emit("placed", {"transfer": 0.25}, source=str(n))
+    assert out.getvalue()  # a block went out
+    log.close(mode="move")
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [e["event"] for e in lines] == ["placed"] * 6 + ["run"]
+    assert lines[-1]["durations"] == {"transfer": 1.75}
+    assert lines[-1]["events"] == {"placed": 6} and lines[-1]["mode"] == "move"
+    events.emit("ignored")  # nothing installed: a no-op
+
+
+def test_json_log_file_has_one_event_per_decision_with_stage_timings(tmp_path, capsys):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    data = os.urandom(2048)
+    write(src / "Film.2020" / "Film.2020.1080p.mkv", data)
+    write(src / "Film.2020" / "Film.2020.1080p.en.srt", b"sub")
+    write(dst / "movies" / "Other" / "Other (2001) [1080p].mkv", b"o" * 1000)
+    write(src / "Again" / "Other.2001.1080p.mkv", b"o" * 1000)
+    log_file = tmp_path / "logs" / "events.jsonl"
+    _run_cli([str(src), str(dst), "--stable-interval", "0", "--no-fingerprint-cache", "--dupe-mode", "hash",
+              "--emit-nfo", "all", "--log-format", "json", "--log-file", str(log_file)])
+
+    out = capsys.readouterr().out
+    assert "MOVE:" in out and "Done." in out  # the text log is unchanged
+    records = [json.loads(line) for line in log_file.read_text().splitlines()]
+    by_event = {r["event"]: r for r in records}
+    placed = by_event["placed"]
+    assert placed["source"] == str(src / "Film.2020" / "Film.2020.1080p.mkv")
+    assert placed["destination"].endswith("Film (2020) [1080p].mkv")
+    assert placed["bytes"] == len(data) and placed["dupe_mode"] == "hash" and placed["sidecars"] == 1
+    assert set(placed["durations"]) == {"classify", "dedupe", "transfer", "sidecar", "nfo"}
+    dup = by_event["library-duplicate"]
+    assert dup["duplicate_of"].endswith("Other (2001) [1080p].mkv")
+    assert "transfer" not in dup["durations"]
+    assert by_event["prune"]["folders"] >= 1
+    assert records[-1]["event"] == "run" and records[-1]["events"]["placed"] == 1
+
+
+def test_json_events_on_stdout_move_the_text_log_to_stderr(tmp_path, capsys):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write(src / "Show" / "Show.S01E01.mkv", os.urandom(500))
+    _run_cli([str(src), str(dst), "--stable-interval", "0", "--no-fingerprint-cache", "--log-format", "json"])
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert [r["event"] for r in records] == ["placed", "prune", "run"]
+    assert "MOVE:" in captured.err and "Done." in captured.err
@@ -0,0 +1,139 @@
+from pathlib import Path
+import os
+import sys
+import threading
+
+import media_organiser.duplicates as dup
+from media_organiser import fingerprints
+from media_organiser.cli import main as cli_main
+from media_organiser.fingerprints import FingerprintCache
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def _installed(cache):
+    previous = fingerprints.install(cache)
+    return lambda: fingerprints.install(previous)
+
+
+def test_second_lookup_is_a_hit_and_reads_nothing(tmp_path, monkeypatch):
+    f = tmp_path / "a.mkv"
+    write(f, os.urandom(4096))
+    cache = FingerprintCache(tmp_path / "fp.sqlite")
+    restore = _installed(cache)
+    reads = {"n": 0}
+    real = dup._read_fingerprint
+
+    def counting(p, sample_bytes):
+        reads["n"] += 1
+        return real(p, sample_bytes)
+
+    monkeypatch.setattr(dup, "_read_fingerprint", counting)
+    try:
+        first = dup.quick_fingerprint(f)
+        second = dup.quick_fingerprint(f)
+    finally:
+        restore()
+        cache.close()
+    assert first == second
+    assert reads["n"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_survives_reopen_and_follows_a_rename(tmp_path):
+    f = tmp_path / "in" / "a.mkv"
+    write(f, os.urandom(4096))
+    db = tmp_path / "fp.sqlite"
+
+    cache = FingerprintCache(db)
+    restore = _installed(cache)
+    try:
+        expected = dup.quick_fingerprint(f)
+    finally:
+        restore()
+        cache.close()
+
+    moved = tmp_path / "lib" / "A (2019).mkv"
+    moved.parent.mkdir()
+    f.rename(moved)
+
+    cache = FingerprintCache(db)
+    restore = _installed(cache)
+    try:
+        assert dup.quick_fingerprint(moved) == expected
+    finally:
+        restore()
+        cache.close()
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_changed_file_is_a_miss(tmp_path):
+    f = tmp_path / "a.mkv"
+    write(f, b"A" * 4096)
+    cache = FingerprintCache(tmp_path / "fp.sqlite")
+    restore = _installed(cache)
+    try:
+        before = dup.quick_fingerprint(f)
+        write(f, b"B" * 8192)
+        after = dup.quick_fingerprint(f)
+    finally:
+        restore()
+        cache.close()
+    assert before != after
+    assert cache.misses == 2
+
+
+def test_evict_missing_drops_vanished_files(tmp_path):
+    keep = tmp_path / "keep.mkv"
+    gone = tmp_path / "gone.mkv"
+    write(keep, b"k" * 100)
+    write(gone, b"g" * 100)
+    cache = FingerprintCache(tmp_path / "fp.sqlite")
+    restore = _installed(cache)
+    try:
+        dup.quick_fingerprint(keep)
+        dup.quick_fingerprint(gone)
+    finally:
+        restore()
+    gone.unlink()
+    assert cache.evict_missing() == 1
+    assert len(cache) == 1
+    assert cache.maybe_evict() is None, "a sweep just ran"
+    cache.close()
+
+
+def test_opened_override_is_per_thread(tmp_path):
+    seen = {}
+    with fingerprints.opened(tmp_path / "fp.sqlite") as cache:
+        assert fingerprints.active() is cache
+        t = threading.Thread(target=lambda: seen.setdefault("other", fingerprints.active()))
+        t.start(); t.join()
+    assert seen["other"] is None
+    assert fingerprints.active() is None
+
+
+def test_cli_rerun_over_unchanged_library_reads_nothing(tmp_path, capsys):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    existing = dst / "movies" / "Some Movie" / "Some Movie (1080p).mkv"
+    write(existing, os.urandom(8192))
+    write(src / "Other.Film.2020.720p.mkv", os.urandom(8192))
+
+    argv = ["media_organiser", str(src), str(dst), "--mode", "copy", "--dupe-mode", "hash",
+            "--stable-interval", "0"]
+    backup = sys.argv[:]
+    try:
+        sys.argv = argv
+        cli_main()
+        capsys.readouterr()
+        sys.argv = argv
+        cli_main()
+    finally:
+        sys.argv = backup
+
+    out = capsys.readouterr().out
+    assert (dst / ".media_organiser" / "fingerprints.sqlite").exists()
+    assert " 0 misses" in out, out
@@ -35,6 +35,21 @@ def test_safe_path_appends_increment_suffix_when_taken(tmp_path):
     assert cand3.name == "f (3).dat"
 
 
+def test_safe_path_does_not_trust_a_stale_snapshot(tmp_path):
+    from media_organiser import snapshot
+    base = tmp_path / "out" / "f.dat"
+    base.parent.mkdir()
+    with snapshot.installed(snapshot.Snapshot()) as snap:
+        assert io_ops.safe_path(base) == base  # the folder is listed, empty
+        write(base, b"landed after the listing")
+        src = tmp_path / "src.dat"
+        write(src, b"new")
+        placed = io_ops.transfer(src, base, "move", dry_run=False)
+        assert placed.path.name == "f (2).dat"
+        assert snap.exists(base)
+    assert base.read_bytes() == b"landed after the listing"
+
+
 def test_copy_basic_and_dry_run_and_collision_numbering(tmp_path, capsys):
     src = tmp_path / "src" / "a.txt"
     write(src, b"hello")
@@ -104,3 +119,161 @@ def test_move_fallback_on_shutil_error(monkeypatch, tmp_path):
     assert called["count"] == 1
     assert dst.exists() and dst.read_bytes() == b"fallback"
     assert not src.exists()
+
+
+def test_copy_file_keeps_bytes_and_times_without_fast_paths(monkeypatch, tmp_path):
+    src = tmp_path / "in" / "d.mkv"
+    write(src, os.urandom(300_000))
+    os.utime(src, (1_000_000_000, 1_000_000_000))
+    dst = tmp_path / "out" / "d.mkv"
+    dst.parent.mkdir()
+
+    def refuse(*_a, **_k):
+        raise OSError(io_ops.errno.EXDEV, "cross-device")
+
+    monkeypatch.setattr(os, "copy_file_range", refuse, raising=False)
+    monkeypatch.setattr(os, "sendfile", refuse, raising=False)
+    io_ops.copy_file(src, dst)
+    assert sha256(dst) == sha256(src)
+    assert int(dst.stat().st_mtime) == 1_000_000_000
+
+
+def test_hardlink_and_symlink_leave_the_import_in_place(tmp_path, capsys):
+    src = tmp_path / "in" / "e.mkv"
+    write(src, b"seeding")
+
+    linked = io_ops.do_move_or_copy(src, tmp_path / "lib" / "e.mkv", mode="hardlink", dry_run=False)
+    assert "HARDLINK:" in capsys.readouterr().out
+    assert src.exists() and linked.stat().st_ino == src.stat().st_ino
+
+    sym = io_ops.do_move_or_copy(src, tmp_path / "lib" / "e.mkv", mode="symlink", dry_run=False)
+    assert sym.name == "e (2).mkv"
+    assert sym.is_symlink() and sym.resolve() == src.resolve()
+
+
+def test_refused_modes_fall_back_to_a_copy_and_warn_once(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(io_ops, "_refused", set())
+
+    def no_links(*_a):
+        raise OSError(io_ops.errno.EXDEV, "Invalid cross-device link")
+
+    def no_clone(*_a):
+        raise OSError(io_ops.errno.EOPNOTSUPP, "Operation not supported")
+
+    monkeypatch.setattr(os, "link", no_links)
+    monkeypatch.setattr(io_ops, "reflink_file", no_clone)
+    for name in ("f.mkv", "g.mkv"):
+        src = tmp_path / "in" / name
+        write(src, name.encode())
+        out = io_ops.do_move_or_copy(src, tmp_path / "lib" / name, mode="hardlink", dry_run=False)
+        assert out.read_bytes() == name.encode() and src.exists()
+        assert out.stat().st_ino != src.stat().st_ino
+
+    warnings = [l for l in capsys.readouterr().out.splitlines() if l.startswith("[warn]")]
+    assert len(warnings) == 2, warnings  # hardlink -> reflink, reflink -> copy; each once
+
+
+def test_copy_returns_the_fingerprint_of_what_it_wrote(tmp_path):
+    import media_organiser.duplicates as dup
+
+    for size in (5000, 3 * 1024 * 1024 + 17):
+        src = tmp_path / "in" / f"{size}.mkv"
+        write(src, os.urandom(size))
+        res = io_ops.transfer(src, tmp_path / "lib" / src.name, mode="copy", dry_run=False)
+        assert res.method == "copy"
+        assert res.fingerprint == dup._read_fingerprint(res.path, dup.FINGERPRINT_SAMPLE)
+
+
+def test_cross_device_move_is_a_verified_copy(monkeypatch, tmp_path):
+    src = tmp_path / "usb" / "h.mkv"
+    write(src, os.urandom(3 * 1024 * 1024))
+    monkeypatch.setattr(io_ops, "_devices", lambda s, d: (1, 2))
+    res = io_ops.transfer(src, tmp_path / "lib" / "h.mkv", mode="move", dry_run=False, verify=True)
+    assert not src.exists() and res.path.exists()
+    assert res.checksum == hashlib.blake2b(res.path.read_bytes()).hexdigest()
+
+
+def test_failed_verification_keeps_the_source(monkeypatch, tmp_path):
+    src = tmp_path / "usb" / "i.mkv"
+    write(src, b"precious" * 1000)
+    monkeypatch.setattr(io_ops, "_devices", lambda s, d: (1, 2))
+    monkeypatch.setattr(io_ops, "_file_digest", lambda p: "bitrot")
+    dst = tmp_path / "lib" / "i.mkv"
+    try:
+        io_ops.transfer(src, dst, mode="move", dry_run=False, verify=True)
+    except OSError as e:
+        assert "verification failed" in str(e)
+    else:
+        raise AssertionError("a mismatching copy must not be accepted")
+    assert src.exists() and not dst.exists()
+
+
+def test_nfo_fingerprint_does_not_reread_a_copied_file(monkeypatch, tmp_path):
+    import sys
+    import media_organiser.duplicates as dup
+    from media_organiser.cli import main as cli_main
+
+    src = tmp_path / "in"
+    write(src / "Some.Film.2020.1080p.mkv", os.urandom(4096))
+    reads = []
+    real = dup._read_fingerprint
+    monkeypatch.setattr(dup, "_read_fingerprint", lambda p, n: reads.append(p) or real(p, n))
+    monkeypatch.setattr(sys, "argv", ["media_organiser", str(src), str(tmp_path / "out"), "--mode", "copy",
+                                      "--dupe-mode", "name", "--stable-interval", "0"])
+    cli_main()
+    nfo = next((tmp_path / "out" / "movies").rglob("*.nfo"))
+    assert "uniqueid" in nfo.read_text()
+    assert reads == []
+
+
+def test_interrupted_copy_resumes_and_never_appears_half_written(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(io_ops, "_CHECKPOINT_BYTES", 64 * 1024)
+    src = tmp_path / "usb" / "j.mkv"
+    write(src, os.urandom(4 * 1024 * 1024))
+    dst = tmp_path / "lib" / "j.mkv"
+    dst.parent.mkdir()
+
+    real = io_ops._copy_range
+    copied = []
+
+    def dies_midway(in_fd, out_fd, start, end, sink=None):
+        if sum(copied) > 1024 * 1024 + 5 * 64 * 1024:
+            raise KeyboardInterrupt("container restarted")
+        copied.append(end - start)
+        return real(in_fd, out_fd, start, end, sink)
+
+    monkeypatch.setattr(io_ops, "_copy_range", dies_midway)
+    try:
+        io_ops.copy_file(src, dst)
+    except KeyboardInterrupt:
+        pass
+    assert not dst.exists()
+    assert io_ops.partial_path(dst).exists()
+
+    before = sum(copied)
+    copied.clear()
+    monkeypatch.setattr(io_ops, "_copy_range", lambda *a, **k: copied.append(a[3] - a[2]) or real(*a, **k))
+    fp, _ = io_ops.copy_file(src, dst)
+
+    assert "RESUME:" in capsys.readouterr().out
+    assert sha256(dst) == sha256(src)
+    assert sum(copied) < src.stat().st_size - before + 64 * 1024, "only the rest was copied"
+    assert not io_ops.partial_path(dst).exists()
+    assert not list(dst.parent.glob(".*.json"))
+    import media_organiser.duplicates as dup
+    assert fp == dup._read_fingerprint(dst, dup.FINGERPRINT_SAMPLE)
+
+
+def test_changed_source_is_not_resumed(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(io_ops, "_CHECKPOINT_BYTES", 64 * 1024)
+    src = tmp_path / "k.mkv"
+    write(src, os.urandom(3 * 1024 * 1024))
+    dst = tmp_path / "lib" / "k.mkv"
+    dst.parent.mkdir()
+    partial = io_ops.partial_path(dst)
+    write(partial, b"\0" * (2 * 1024 * 1024))
+    (partial.parent / (partial.name + ".json")).write_text('{"source": [0, 0, 0, 0], "offset": 1048576}')
+
+    io_ops.copy_file(src, dst)
+    assert "RESUME:" not in capsys.readouterr().out
+    assert sha256(dst) == sha256(src)
@@ -0,0 +1,110 @@
+from pathlib import Path
+import os
+import subprocess
+import sys
+
+import pytest
+
+from media_organiser import iorate
+from media_organiser.io_ops import copy_file
+
+
+def test_parse_rate():
+    assert iorate.parse_rate("80M") == 80 << 20
+    assert iorate.parse_rate("1.5G") == int(1.5 * (1 << 30))
+    assert iorate.parse_rate("512k") == 512 << 10
+    assert iorate.parse_rate("40MiB/s") == 40 << 20
+    assert iorate.parse_rate("1000") == 1000
+    for bad in ("fast", "0M", "-1M"):
+        with pytest.raises(ValueError):
+            iorate.parse_rate(bad)
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, s):
+        self.sleeps.append(s)
+        self.now += s
+
+
+def test_bucket_allows_a_small_burst_then_holds_the_rate():
+    t = FakeTime()
+    bucket = iorate.TokenBucket(1000, t.clock, t.sleep)
+    bucket.take(250)  # the banked quarter second
+    assert t.sleeps == []
+    for _ in range(4):
+        bucket.take(250)
+    assert t.now == pytest.approx(1.0)
+    assert bucket.waited == pytest.approx(1.0)
+
+
+def test_capped_copy_runs_in_even_steps(tmp_path):
+    src, dst = tmp_path / "a.mkv", tmp_path / "b.mkv"
+    data = os.urandom(3 << 20)
+    src.write_bytes(data)
+    t = FakeTime()
+    limiter = iorate.Limiter(1 << 20)
+    limiter.overall = iorate.TokenBucket(1 << 20, t.clock, t.sleep)
+    previous = iorate.install(limiter)
+    try:
+        copy_file(src, dst)
+    finally:
+        iorate.install(previous)
+    assert dst.read_bytes() == data
+    # 3 MiB at 1 MiB/s with a quarter second banked, in ~0.1 s steps rather than one stall.
+    assert t.now == pytest.approx(2.75, abs=0.01)
+    assert len(t.sleeps) > 20 and max(t.sleeps) <= 0.11
+
+
+def test_uncapped_copies_are_not_paced(tmp_path):
+    assert iorate.active() is None
+    fd = os.open(tmp_path, os.O_RDONLY)
+    try:
+        assert iorate.pacer(fd) is None
+    finally:
+        os.close(fd)
+
+
+def test_device_caps_apply_only_to_their_device(tmp_path):
+    limiter = iorate.Limiter.from_options(None, [f"{tmp_path}=2M"])
+    dev = os.stat(tmp_path).st_dev
+    assert [b.rate for b in limiter.buckets([dev, dev])] == [2 << 20]
+    assert limiter.buckets([dev + 1]) == []
+    assert iorate.Limiter.from_options(None, []) is None
+    with pytest.raises(ValueError):
+        iorate.Limiter.from_options(None, [f"{tmp_path / 'missing'}=2M"])
+    with pytest.raises(ValueError):
+        iorate.Limiter.from_options(None, ["2M"])
+
+
+def test_child_priority_only_when_asked(monkeypatch):
+    monkeypatch.setattr(iorate, "_child_priority", (None, 0))
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        assert iorate.prioritise_child(child.pid) == []
+        applied = iorate.configure_from_env({"IO_NICE": "5"})
+        assert applied == ["child priority"]
+        before = os.getpriority(os.PRIO_PROCESS, child.pid)
+        assert iorate.prioritise_child(child.pid) == ["nice +5"]
+        assert os.getpriority(os.PRIO_PROCESS, child.pid) == min(19, before + 5)
+        assert os.getpriority(os.PRIO_PROCESS, 0) == before, "the parent keeps its priority"
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_web_app_applies_env_settings_on_import():
+    pytest.importorskip("flask")
+    # gunicorn only imports ``app``; the settings must be in place by then.
+    probe = ("from media_organiser.web import app; from media_organiser import iorate; "
+             "print(iorate.active().overall.rate, *iorate._child_priority)")
+    env = dict(os.environ, IO_RATE="40M", IO_PRIORITY="idle", IO_NICE="5")
+    out = subprocess.run([sys.executable, "-c", probe], env=env, cwd=Path(__file__).resolve().parent.parent,
+                         capture_output=True, text=True, check=True).stdout.split()
+    assert out == [str(40 << 20), "idle", "5"]
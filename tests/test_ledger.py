@@ -0,0 +1,124 @@
+from pathlib import Path
+import os
+import sys
+
+from media_organiser.cli import main as cli_main
+from media_organiser.ledger import PLACED, ImportLedger, SAMPLE
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def run(src: Path, dst: Path, capsys, *extra: str) -> str:
+    argv = ["media_organiser", str(src), str(dst), "--stable-interval", "0", *extra]
+    backup = sys.argv[:]
+    try:
+        sys.argv = argv
+        cli_main()
+    finally:
+        sys.argv = backup
+    return capsys.readouterr().out
+
+
+def test_left_behind_files_are_not_reexamined(tmp_path, capsys):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    write(src / "a" / "Show.S01E01.720p.mkv", os.urandom(1000))
+    write(src / "b" / "Show.S01E01.1080p.mkv", os.urandom(2000))
+    write(src / "c" / "Film.2020.sample.mkv", os.urandom(10))
+
+    first = run(src, dst, capsys)
+    assert "Potential duplicate in batch" in first
+
+    second = run(src, dst, capsys)
+    assert "LEDGER: 2 unchanged import file(s) already decided" in second
+    assert "Potential duplicate" not in second and "MOVE:" not in second
+
+    again = run(src, dst, capsys, "--reconsider")
+    assert "LEDGER:" not in again
+    assert "SKIP DUPLICATE" in again or "REMOVED DUPLICATE IMPORT" in again or "MOVE:" in again
+
+
+def test_changed_file_gets_a_fresh_look(tmp_path, capsys):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    write(src / "a" / "Show.S01E02.mkv", b"a" * 1000)
+    write(src / "b" / "Show.S01E02.mkv", b"b" * 1000)
+    run(src, dst, capsys)
+
+    left = next(src.rglob("*.mkv"))
+    write(left, b"c" * 3000)
+    out = run(src, dst, capsys)
+    assert "LEDGER:" not in out
+    assert str(left) in out
+
+
+def test_linked_imports_are_not_deleted_on_the_next_run(tmp_path, capsys):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    seed = src / "Some.Film.2019.1080p.mkv"
+    write(seed, os.urandom(4096))
+
+    run(src, dst, capsys, "--mode", "hardlink")
+    out = run(src, dst, capsys, "--mode", "hardlink")
+    assert seed.exists(), "a seeding import must survive a rerun"
+    assert "REMOVED DUPLICATE IMPORT" not in out
+    assert "LEDGER: 1 unchanged" in out
+
+
+def test_linked_imports_survive_without_the_ledger(tmp_path, capsys):
+    for mode in ("symlink", "hardlink"):
+        src = tmp_path / mode / "in"
+        dst = tmp_path / mode / "out"
+        seed = src / "Some.Film.2019.1080p.mkv"
+        write(seed, os.urandom(4096))
+        run(src, dst, capsys, "--mode", mode)
+
+        out = run(src, dst, capsys, "--mode", mode, "--reconsider")
+        (dst / ".media_organiser" / "import_ledger.json").unlink()
+        out += run(src, dst, capsys, "--mode", mode)
+        assert seed.exists(), f"{mode}: the library entry is the import"
+        assert "REMOVED DUPLICATE IMPORT" not in out and "SKIP DUPLICATE IMPORT" in out
+        placed = next((dst / "movies").rglob("*.mkv"))
+        assert placed.read_bytes() == seed.read_bytes()
+
+
+def test_ledger_round_trip_and_retain(tmp_path):
+    keep = tmp_path / "keep.mkv"
+    gone = tmp_path / "gone.mkv"
+    write(keep, b"k")
+    write(gone, b"g")
+    path = tmp_path / "ledger.json"
+
+    led = ImportLedger(path)
+    led.record(keep, keep.stat(), SAMPLE)
+    led.record(gone, gone.stat(), SAMPLE)
+    led.save()
+
+    led = ImportLedger(path)
+    assert led.decision(keep, keep.stat()) == (SAMPLE, "")
+    led.retain([keep])
+    assert len(led) == 1
+
+
+def test_decisions_survive_a_crash_before_save(tmp_path):
+    placed = tmp_path / "Film.mkv"
+    write(placed, b"f")
+    path = tmp_path / "state" / "ledger.json"
+
+    led = ImportLedger(path)
+    led.record(placed, placed.stat(), PLACED, "/lib/Film.mkv")
+    with led.journal_path.open("a", encoding="utf-8") as fh:
+        fh.write('["torn')  # killed mid-write
+    # No save(): the process died here.
+    again = ImportLedger(path)
+    assert again.decision(placed, placed.stat()) == (PLACED, "/lib/Film.mkv")
+    again.save()
+    assert path.exists() and not again.journal_path.exists()
+    assert ImportLedger(path).decision(placed, placed.stat()) == (PLACED, "/lib/Film.mkv")
+
+    dry = ImportLedger(tmp_path / "dry" / "ledger.json", journal=False)
+    dry.record(placed, placed.stat(), PLACED)
+    assert not (tmp_path / "dry").exists()
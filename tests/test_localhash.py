@@ -0,0 +1,64 @@
+import os
+
+from media_organiser import localhash
+from media_organiser.duplicates import quick_fingerprint
+from media_organiser.nfo import read_nfo_to_meta, set_localhash, write_movie_nfo
+
+
+def test_legacy_scheme_is_quick_fingerprint(tmp_path):
+    for size in (10, (2 << 20) + 12345):
+        p = tmp_path / f"{size}.mkv"
+        p.write_bytes(os.urandom(size))
+        assert localhash.LEGACY.fingerprint(p) == quick_fingerprint(p)
+
+
+def test_sampled_scheme_sees_the_middle_of_the_file(tmp_path):
+    data = bytearray(os.urandom(3 << 20))
+    a, b = tmp_path / "a.mkv", tmp_path / "b.mkv"
+    a.write_bytes(bytes(data))
+    span = len(data) - 2 * (1 << 20) - (64 << 10)
+    data[(1 << 20) + span // 5 + 7] ^= 0xFF  # inside the first interior sample
+    b.write_bytes(bytes(data))
+    assert quick_fingerprint(a) == quick_fingerprint(b)
+    assert localhash.BLAKE2_SAMPLED.fingerprint(a) != localhash.BLAKE2_SAMPLED.fingerprint(b)
+
+
+def test_keys_round_trip_through_attributes():
+    for scheme in (localhash.LEGACY, localhash.BLAKE2_SAMPLED):
+        assert localhash.scheme_key(scheme.attrs()) == scheme.key
+        assert localhash.key_attrs(scheme.key) == scheme.attrs()
+    assert localhash.scheme_key({}) == localhash.LEGACY.key
+    future = localhash.scheme_key({"algorithm": "xxh3", "layout": "ht-4m", "version": "2"})
+    assert future == "xxh3/ht-4m/v2" and localhash.get(future) is None
+    assert localhash.key_attrs(future) == {"algorithm": "xxh3", "layout": "ht-4m", "version": "2"}
+
+
+def test_nfos_of_every_version_read_back(tmp_path):
+    old = tmp_path / "old.nfo"
+    old.write_text(
+        '<?xml version="1.0" encoding="utf-8"?><movie><title>Old</title>'
+        '<uniqueid type="localhash" default="true">abc</uniqueid></movie>'
+    )
+    assert read_nfo_to_meta(old)["uniqueid_localhash_scheme"] == localhash.LEGACY.key
+
+    video = tmp_path / "New.mkv"
+    video.write_bytes(b"x")
+    computed = {"title": "New", "uniqueid_localhash": "def",
+                "uniqueid_localhash_scheme": localhash.BLAKE2_SAMPLED.key}
+    write_movie_nfo(video, computed, None, overwrite=True, layout="same-stem")
+    meta = read_nfo_to_meta(tmp_path / "New.nfo")
+    assert meta["uniqueid_localhash"] == "def"
+    assert meta["uniqueid_localhash_scheme"] == localhash.BLAKE2_SAMPLED.key
+
+    assert set_localhash(old, "123", localhash.BLAKE2_SAMPLED.key)
+    meta = read_nfo_to_meta(old)
+    assert meta["title"] == "Old" and meta["uniqueid_localhash"] == "123"
+    assert meta["uniqueid_localhash_scheme"] == localhash.BLAKE2_SAMPLED.key
+
+
+def test_only_compatible_fingerprints_are_compared():
+    legacy, sampled = localhash.LEGACY.key, localhash.BLAKE2_SAMPLED.key
+    assert localhash.same_content(legacy, "aa", legacy, "AA") is True
+    assert localhash.same_content(legacy, "aa", legacy, "bb") is False
+    assert localhash.same_content(legacy, "aa", sampled, "aa") is None
+    assert localhash.same_content("xxh3/ht-4m/v2", "aa", "xxh3/ht-4m/v2", "aa") is None
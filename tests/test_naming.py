@@ -738,3 +738,54 @@ def test_generic_parent_still_strips_a_real_index(tmp_path):
         path = parent / name
         path.touch()
         assert title_from_filename_for_generic_parent(path) == titlecase_soft(expected), name
+
+
+def test_parent_titles_are_derived_once_per_folder_name(tmp_path):
+    from media_organiser import naming
+
+    naming._title_from_dir_name.cache_clear()
+    src = tmp_path / "import"
+    folder = src / "The.Matrix.1999.1080p"
+    for part in ("CD1", "CD2", "Extras"):
+        assert movie_name_from_parents(folder / f"movie.{part}.mkv", src_root=src) == "The Matrix"
+    info = naming._title_from_dir_name.cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+
+def _bench():
+    import importlib.util
+    script = Path(__file__).resolve().parent.parent / "scripts" / "bench_naming.py"
+    spec = importlib.util.spec_from_file_location("bench_naming", script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_single_scan_matcher_agrees_with_per_pattern_finditer():
+    import random
+    from media_organiser import naming
+
+    bench = _bench()
+    rnd = random.Random(7)
+    alphabet = "SsEex0123456789 .-_–&/abcEpseasonepisode"
+    stems = [Path(n).stem for n, _p in bench.corpus(3000)]
+    stems += ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 24))) for _ in range(20000)]
+    # Overlapping tokens, where finditer's non-overlap decides the answer.
+    stems += ["Show 1x02 03x04", "Show..S01E01", "A - 101 - 202 - B", "Ep 1 Ep 2", "S01E02E03 S04 05"]
+    for stem in stems:
+        assert naming._rightmost_episode_token(stem) == bench.rightmost_token_per_pattern(stem), stem
+
+
+def test_loose_episode_still_reads_its_own_folder(tmp_path):
+    a = is_tv_episode("Ep 03.mkv", tmp_path / "Show Season 2" / "Ep 03.mkv")
+    b = is_tv_episode("Ep 03.mkv", tmp_path / "Show Season 4" / "Ep 03.mkv")
+    assert (a[1]["season"], b[1]["season"]) == (2, 4)
+    a[1]["series"] = "mutated"
+    assert is_tv_episode("Ep 03.mkv", tmp_path / "Show Season 2" / "Ep 03.mkv")[1]["series"] != "mutated"
+
+
+def test_naming_benchmark_runs_and_checks():
+    result = _bench().run(500, check=True)
+    assert result["names"] == 500 and result["episodes"] > 0
+    assert result["mismatches"] == 0
+    assert result["cold_per_sec"] > 0 and result["warm_per_sec"] > 0
@@ -434,3 +434,31 @@ def test_holds_single_video_stops_at_two(tmp_path):
     assert nfo.holds_single_video(tmp_path) is True
     _movie(tmp_path, "two.mp4")
     assert nfo.holds_single_video(tmp_path) is False
+
+
+def test_census_answers_for_the_batch_as_it_started(tmp_path, monkeypatch):
+    lone = tmp_path / "Fargo (1996)"
+    video = _movie(lone, "clip.mp4")
+    (lone / "movie.nfo").write_text("<movie><title>Fargo</title></movie>")
+    dump = tmp_path / "dump"
+    siblings = [_movie(dump, f"Film {i}.mp4") for i in range(3)]
+    (dump / "F.nfo").write_text("<movie><title>F</title></movie>")
+
+    walks = []
+    real = nfo.holds_single_video
+    monkeypatch.setattr(nfo, "holds_single_video", lambda d: walks.append(d) or real(d))
+    census = nfo.FolderCensus.survey([video, *siblings])
+    assert sorted(walks) == sorted({lone, dump, tmp_path})
+
+    previous = nfo.install_census(census)
+    try:
+        # The lone video has already been moved away; its folder NFO still speaks for it.
+        video.unlink()
+        assert nfo.find_nfo(video) == lone / "movie.nfo"
+        # Siblings leaving one by one do not make the stray NFO apply to the last.
+        for v in siblings[:-1]:
+            v.unlink()
+        assert nfo.find_nfo(siblings[-1]) is None
+    finally:
+        nfo.install_census(previous)
+    assert len(walks) == 3
@@ -0,0 +1,97 @@
+from pathlib import Path
+import os
+import threading
+
+import pytest
+
+from media_organiser import fingerprints, organiser
+from media_organiser.organiser import OrganiseConfig, organise
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def test_organise_reports_each_file_outcome(tmp_path, capsys):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    film = os.urandom(2048)
+    write(src / "Film.2020" / "Film.2020.1080p.mkv", film)
+    write(src / "Film.2020" / "Film.2020.1080p.en.srt", b"sub")
+    write(src / "Film.2020" / "Film.2020.sample.mkv", b"s" * 100)
+    write(dst / "movies" / "Other" / "Other (2001) [1080p].mkv", b"o" * 1000)
+    write(src / "Again" / "Other.2001.1080p.mkv", b"o" * 1000)
+
+    report = organise(OrganiseConfig(src, dst, stable_interval=0, no_fingerprint_cache=True))
+
+    assert "MOVE:" in capsys.readouterr().out  # the console log is still printed
+    assert report.counts() == {"placed": 1, "library-duplicate": 1, "sample": 1}
+    (placed,) = report.placed
+    assert placed.source == src.resolve() / "Film.2020" / "Film.2020.1080p.mkv"
+    assert placed.destination == dst.resolve() / "movies" / "Film" / "Film (2020) [1080p].mkv"
+    assert placed.destination.is_file() and placed.method == "rename" and placed.bytes == len(film)
+    assert placed.nfo == placed.destination.with_suffix(".nfo") and placed.nfo.is_file()
+    assert placed.subtitles == [placed.destination.with_name("Film (2020) [1080p].en.srt")]
+    assert placed.subtitles[0].is_file()
+    (dup,) = report.by_decision("library-duplicate")
+    assert dup.duplicate_of == dst.resolve() / "movies" / "Other" / "Other (2001) [1080p].mkv"
+    assert dup.destination is None and not dup.source.exists()
+    assert report.library_index is not None and report.elapsed >= 0
+
+
+def test_reused_index_and_cache_carry_over_between_calls(tmp_path, monkeypatch):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    write(src / "First.Film.2019.1080p.mkv", b"1" * 4096)
+    cache = fingerprints.FingerprintCache(tmp_path / "fp.sqlite")
+    config = OrganiseConfig(src, dst, mode="copy", emit_nfo="off", stable_interval=0,
+                            fingerprint_cache=str(tmp_path / "unused.sqlite"))
+    first = organise(config, fingerprint_cache=cache)
+    assert len(first.placed) == 1
+
+    def no_rebuild(*a, **kw):
+        raise AssertionError("the library index was passed in; it must not be rebuilt")
+    monkeypatch.setattr(organiser, "build_library_import_dup_index", no_rebuild)
+    write(src / "Again" / "First.Film.2019.720p.mkv", b"1" * 4096)
+    second = organise(config, library_index=first.library_index, fingerprint_cache=cache)
+
+    assert second.library_index is first.library_index
+    (dup,) = second.by_decision("library-duplicate")
+    assert dup.duplicate_of == first.placed[0].destination, "the first call's placement was indexed"
+    assert second.already_decided == 1  # the original, copied last time and unchanged
+    assert cache.stats()["hits"] > 0 and not (tmp_path / "unused.sqlite").exists()
+    cache.close()
+
+    with pytest.raises(ValueError, match="built for --dupe-mode hash"):
+        organise(OrganiseConfig(src, dst, dupe_mode="size"), library_index=first.library_index)
+
+
+def test_runs_in_one_process_take_turns(tmp_path, monkeypatch):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    src.mkdir()
+    inside, release = threading.Event(), threading.Event()
+    running, overlap = [], []
+    real_tree = organiser._organise_tree
+
+    def tree(*a, **kw):
+        overlap.append(len(running))
+        running.append(1)
+        inside.set()
+        release.wait(5)
+        try:
+            return real_tree(*a, **kw)
+        finally:
+            running.pop()
+    monkeypatch.setattr(organiser, "_organise_tree", tree)
+
+    config = OrganiseConfig(src, dst, stable_interval=0, no_fingerprint_cache=True)
+    first = threading.Thread(target=organise, args=(config,))
+    first.start()
+    assert inside.wait(5)
+    second = threading.Thread(target=organise, args=(config,))
+    second.start()
+    second.join(0.3)
+    assert second.is_alive(), "the second run must wait for the first"
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert overlap == [0, 0]
@@ -0,0 +1,101 @@
+from pathlib import Path
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from media_organiser.cli import main as cli_main
+from media_organiser.pipeline import run_staged
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def test_output_stays_in_input_order_when_jobs_finish_out_of_order(capsys):
+    def place(n):
+        print(f"place {n}")
+
+        def job():
+            time.sleep(0.05 if n == 0 else 0)
+            print(f"describe {n}")
+        return job
+
+    run_staged(range(4), lambda n: n, place, jobs=4)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [f"{stage} {n}" for n in range(4) for stage in ("place", "describe")]
+
+
+def test_describe_overlaps_the_next_placement():
+    started = threading.Event()
+    overlapped = []
+
+    def place(n):
+        if n == 1:
+            overlapped.append(started.wait(1.0))
+        if n == 0:
+            return started.set
+        return None
+
+    run_staged([0, 1], lambda n: n, place, jobs=2)
+    assert overlapped == [True]
+
+
+def test_same_key_is_not_planned_before_the_previous_one_is_placed():
+    placed = []
+    seen_at_plan = {}
+
+    def plan(item):
+        seen_at_plan[item] = list(placed)
+        return item
+
+    run_staged(["a1", "b1", "a2"], plan, placed.append, jobs=2, key=lambda s: s[0])
+    assert "a1" in seen_at_plan["a2"]
+
+
+def test_errors_in_a_job_reach_the_caller(capsys):
+    def place(n):
+        print(f"place {n}")
+
+        def boom():
+            raise RuntimeError("disk on fire")
+        return boom if n == 1 else None
+
+    with pytest.raises(RuntimeError, match="disk on fire"):
+        run_staged(range(3), lambda n: n, place, jobs=2)
+    assert sys.stdout is not None
+    assert "place 0" in capsys.readouterr().out
+
+
+def _organise(src: Path, dst: Path, jobs: int, capsys) -> list[str]:
+    argv = ["media_organiser", str(src), str(dst), "--mode", "copy", "--stable-interval", "0",
+            "--no-fingerprint-cache", "--jobs", str(jobs)]
+    backup = sys.argv[:]
+    try:
+        sys.argv = argv
+        cli_main()
+    finally:
+        sys.argv = backup
+    out = capsys.readouterr().out
+    return out.replace(str(dst), "DEST").splitlines()
+
+
+def test_parallel_run_matches_serial_run(tmp_path, capsys):
+    src = tmp_path / "in"
+    for i in range(1, 7):
+        write(src / "Show" / f"Show.S01E{i:02d}.720p.mkv", os.urandom(2048))
+    # Same episode twice in the batch, and two different films competing for one name.
+    write(src / "Again" / "Show.S01E03.1080p.mkv", os.urandom(2048))
+    write(src / "A" / "Film.2020.720p.mkv", os.urandom(3000))
+    write(src / "B" / "Film.2020.720p.mkv", os.urandom(3001))
+    write(src / "Show" / "Show.S01E02.720p.en.srt", b"sub")
+
+    serial = _organise(src, tmp_path / "serial", 1, capsys)
+    parallel = _organise(src, tmp_path / "parallel", 8, capsys)
+
+    assert serial == parallel
+    assert any("Potential duplicate in batch" in line for line in serial)
+    assert sum(line.startswith("COPY:") for line in serial) >= 9
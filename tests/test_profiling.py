@@ -0,0 +1,59 @@
+from pathlib import Path
+import json
+import os
+import sys
+
+from media_organiser import naming, profiling
+from media_organiser.cli import main as cli_main
+from media_organiser.profiling import Profile
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def test_instrument_counts_outermost_calls_and_restores_everything(tmp_path):
+    write(tmp_path / "a" / "one.mkv", b"x")
+    real = (os.stat, Path.exists, Path.rglob, naming.re, naming._PATTERNS)
+    own = dict(vars(Path))
+    profile = Profile()
+    with profile.instrument():
+        assert (tmp_path / "a").exists()          # Path.exists stats underneath: one exists, no stat
+        assert len(list(tmp_path.rglob("*.mkv"))) == 1
+        (tmp_path / "b" / "c").mkdir(parents=True)
+        naming.is_tv_episode("Show.S01E02.mkv", Path("Show.S01E02.mkv"))
+    report = profile.report()
+    assert report["fs"]["exists"]["calls"] == 1 and report["fs"]["stat"]["calls"] == 0
+    assert report["fs"]["glob"]["calls"] == 1 and report["fs"]["mkdir"]["calls"] == 1
+    assert report["regex"]["evaluations"] >= 1
+    assert (os.stat, Path.exists, Path.rglob, naming.re, naming._PATTERNS) == real
+    assert dict(vars(Path)) == own                # an inherited method's override is removed, not left behind
+
+
+def test_profile_reports_stages_bytes_and_writes_json(tmp_path, capsys):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    film = os.urandom(3 << 20)
+    write(src / "Film.2020" / "Film.2020.1080p.mkv", film)
+    write(src / "Show" / "Show.S01E01.mkv", os.urandom(4096))
+    write(dst / "movies" / "Other" / "Other (2001) [1080p].mkv", b"o" * 5000)
+    report_path = tmp_path / "profile" / "run.json"
+    backup = sys.argv[:]
+    try:
+        sys.argv = ["media_organiser", str(src), str(dst), "--stable-interval", "0", "--no-fingerprint-cache",
+                    "--mode", "copy", "--dupe-mode", "hash", "--emit-nfo", "all",
+                    "--profile-json", str(report_path)]
+        cli_main()
+    finally:
+        sys.argv = backup
+
+    out = capsys.readouterr().out
+    assert "PROFILE: stages:" in out and "naming regex evaluations" in out
+    report = json.loads(report_path.read_text())
+    assert {"classify", "dedupe", "transfer", "nfo", "walk", "organise", "index"} <= set(report["stages"])
+    assert report["bytes"]["copied"] == len(film) + 4096
+    assert report["placed"] == {"copy": 2}
+    assert report["bytes"]["fingerprint_read"] > 0
+    assert report["fs"]["stat"]["calls"] > 0 and report["regex"]["evaluations"] > 0
+    assert report["peak_rss"] is None or report["peak_rss"] > 0
+    assert profiling.active() is None
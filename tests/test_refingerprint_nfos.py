@@ -0,0 +1,86 @@
+# tests/test_refingerprint_nfos.py
+import importlib.util
+import os
+from pathlib import Path
+
+from media_organiser import fingerprints, localhash
+from media_organiser.nfo import read_nfo_to_meta
+
+_SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "refingerprint_nfos.py"
+_spec = importlib.util.spec_from_file_location("refingerprint_nfos", _SCRIPT)
+tool = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(tool)
+
+
+def _legacy_nfo(path: Path, title: str, video: Path = None) -> None:
+    digest = localhash.LEGACY.fingerprint(video)[1] if video is not None else "0123"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        f'<?xml version="1.0" encoding="utf-8"?><movie><title>{title}</title>'
+        f'<uniqueid type="localhash" default="true">{digest}</uniqueid></movie>'
+    )
+
+
+def test_upgrades_legacy_nfos_and_resumes(tmp_path):
+    movies = tmp_path / "movies"
+    for name in ("A (2001)", "B (2002)", "C (2003)"):
+        (movies / name).mkdir(parents=True)
+        (movies / name / f"{name}.mkv").write_bytes(os.urandom(3000))
+        _legacy_nfo(movies / name / f"{name}.nfo", name, movies / name / f"{name}.mkv")
+    kodi = movies / "D (2004)"
+    kodi.mkdir()
+    (kodi / "D.mkv").write_bytes(os.urandom(100))
+    _legacy_nfo(kodi / "movie.nfo", "D", kodi / "D.mkv")
+    _legacy_nfo(movies / "Orphan" / "Orphan.nfo", "Orphan")
+
+    target = localhash.BLAKE2_SAMPLED
+    first = tool.upgrade(tmp_path, target, limit=2, log=lambda *_: None)
+    assert first["upgraded"] == 2
+    rest = tool.upgrade(tmp_path, target, log=lambda *_: None)
+    assert rest == {"upgraded": 2, "current": 2, "no-hash": 0, "no-video": 1, "mismatch": 0, "failed": 0}
+
+    meta = read_nfo_to_meta(kodi / "movie.nfo")
+    assert meta["title"] == "D"
+    assert meta["uniqueid_localhash_scheme"] == target.key
+    assert meta["uniqueid_localhash"] == target.fingerprint(kodi / "D.mkv")[1]
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    folder = tmp_path / "E (2005)"
+    folder.mkdir()
+    (folder / "E (2005).mkv").write_bytes(b"video")
+    _legacy_nfo(folder / "E (2005).nfo", "E", folder / "E (2005).mkv")
+    before = (folder / "E (2005).nfo").read_bytes()
+    counts = tool.upgrade(tmp_path, localhash.BLAKE2_SAMPLED, dry_run=True, log=lambda *_: None)
+    assert counts["upgraded"] == 1
+    assert (folder / "E (2005).nfo").read_bytes() == before
+
+
+def test_a_video_that_no_longer_matches_keeps_its_nfo(tmp_path):
+    folder = tmp_path / "F (2006)"
+    folder.mkdir()
+    video = folder / "F (2006).mkv"
+    video.write_bytes(os.urandom(4000))
+    _legacy_nfo(folder / "F (2006).nfo", "F", video)
+    video.write_bytes(os.urandom(4000))  # rotted since the NFO was written
+    before = (folder / "F (2006).nfo").read_bytes()
+    logged = []
+    counts = tool.upgrade(tmp_path, localhash.BLAKE2_SAMPLED, log=logged.append)
+    assert counts["mismatch"] == 1 and counts["upgraded"] == 0
+    assert (folder / "F (2006).nfo").read_bytes() == before
+    assert logged and logged[0].startswith("MISMATCH:")
+
+
+def test_rot_is_caught_even_when_the_cache_remembers_the_old_hash(tmp_path):
+    folder = tmp_path / "G (2007)"
+    folder.mkdir()
+    video = folder / "G (2007).mkv"
+    video.write_bytes(os.urandom(4000))
+    with fingerprints.opened(tmp_path / "fingerprints.sqlite"):
+        _legacy_nfo(folder / "G (2007).nfo", "G", video)  # cached under the video's size and mtime
+        st = video.stat()
+        with open(video, "r+b") as f:  # a flipped byte; size and mtime unchanged
+            f.write(b"\0" if f.read(1) != b"\0" else b"\1")
+        os.utime(video, ns=(st.st_atime_ns, st.st_mtime_ns))
+        counts = tool.upgrade(tmp_path, localhash.BLAKE2_SAMPLED, log=lambda *_: None)
+    assert counts["mismatch"] == 1 and counts["upgraded"] == 0
@@ -1,4 +1,7 @@
-from media_organiser.sidecars import copy_move_sidecars
+from media_organiser import snapshot
+from media_organiser.constants import SIDECAR_EXTS
+from media_organiser.sidecars import copy_move_sidecars, find_related_sidecars
+from media_organiser.snapshot import Snapshot
 
 def _noop_mover(src, dst, mode, dry_run):
     # emulate copy: create dst with same content
@@ -26,3 +29,46 @@ def test_copy_sidecars_moves_nfo_but_does_not_list_as_subtitle(tmp_tree):
     assert len(moved) == 0
     assert (out.parent / "Movie Name (1080p).nfo").exists()
     assert (out.parent / "Movie Name (1080p).nfo").read_bytes() == nfo.read_bytes()
+
+
+def _scan_all(src):
+    """The matching rule applied to the whole folder, as a reference."""
+    import re
+    base = re.escape(src.stem)
+    pat = re.compile(rf"(?i)^({base})(?P<suffix>(?:[ ._\-](?!S\d{{1,2}}E)\w[\w.\-]*)?)$")
+    return [p for p in src.parent.iterdir()
+            if p.suffix.lower() in SIDECAR_EXTS and p.is_file() and pat.match(p.stem)]
+
+
+def test_indexed_lookup_matches_a_full_scan(tmp_tree):
+    names = [
+        "Show.S01E01.mkv", "Show.S01E01.en.srt", "SHOW.s01e01.FR.srt", "Show.S01E01.nfo",
+        "Show.S01E010.srt", "Show.S01E01.S01E02.srt", "Show.S01E01-eng.ass",
+        "Show.mkv", "Show.S01E02.srt", "show.srt", "Show en.srt", "Shower.srt",
+        "Kırık.mkv", "KIRIK.srt", "Straße.mkv", "STRASSE.srt", "straße.de.srt",
+    ]
+    for n in names:
+        tmp_tree(f"in/{n}", b"x")
+    folder = tmp_tree("in/.keep").parent
+    for video in ("Show.S01E01.mkv", "Show.mkv", "Kırık.mkv", "Straße.mkv"):
+        src = folder / video
+        assert sorted(find_related_sidecars(src)) == sorted(_scan_all(src)), video
+    # Episode-looking suffixes belong to another episode, not to the bare show.
+    assert folder / "Show.S01E02.srt" not in list(find_related_sidecars(folder / "Show.mkv"))
+
+
+def test_folder_is_indexed_once_per_run(tmp_tree, monkeypatch):
+    import media_organiser.sidecars as sc
+    for ep in range(1, 30):
+        tmp_tree(f"in/Show.S01E{ep:02d}.mkv", b"v")
+        tmp_tree(f"in/Show.S01E{ep:02d}.en.srt", b"s")
+    folder = tmp_tree("in/.keep").parent
+    builds = []
+    real = sc._SidecarIndex.__init__
+    monkeypatch.setattr(sc._SidecarIndex, "__init__", lambda self, d: builds.append(d) or real(self, d))
+    with snapshot.installed(Snapshot()):
+        for ep in range(1, 30):
+            found = list(find_related_sidecars(folder / f"Show.S01E{ep:02d}.mkv"))
+            assert found == [folder / f"Show.S01E{ep:02d}.en.srt"]
+            snapshot.removed(found[0])  # moved away with its video
+    assert builds == [folder]
@@ -0,0 +1,166 @@
+from pathlib import Path
+import os
+import sys
+
+from media_organiser import snapshot
+from media_organiser.cli import main as cli_main
+from media_organiser.snapshot import Snapshot
+
+
+def write(p: Path, data: bytes = b"x"):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def test_walk_lists_what_rglob_lists(tmp_path):
+    write(tmp_path / "a" / "one.mkv")
+    write(tmp_path / "a" / "b" / "two.srt")
+    (tmp_path / "empty").mkdir()
+    assert sorted(Snapshot().walk(tmp_path)) == sorted(tmp_path.rglob("*"))
+
+
+def test_repeated_questions_do_not_list_again(tmp_path, monkeypatch):
+    write(tmp_path / "Film" / "Film.mkv")
+    write(tmp_path / "Film" / "Film.nfo")
+    calls = []
+    real = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda d: calls.append(d) or real(d))
+
+    snap = Snapshot()
+    folder = tmp_path / "Film"
+    for _ in range(3):
+        assert snap.is_file(folder / "Film.mkv")
+        assert snap.exists(folder / "Film.nfo")
+        assert not snap.exists(folder / "Film.en.srt")
+        assert len(snap.listdir(folder)) == 2
+    assert calls == [folder]
+    assert snap.counters()["scans"] == 1
+
+
+def test_recorded_changes_keep_the_picture_true(tmp_path):
+    write(tmp_path / "in" / "Film.mkv")
+    snap = Snapshot()
+    snap.walk(tmp_path)
+
+    target = tmp_path / "out" / "Film (2020)"
+    snap.makedirs(target)
+    assert target.is_dir() and snap.is_dir(target)
+
+    (tmp_path / "in" / "Film.mkv").rename(target / "Film.mkv")
+    snap.removed(tmp_path / "in" / "Film.mkv")
+    snap.added(target / "Film.mkv")
+    assert not snap.exists(tmp_path / "in" / "Film.mkv")
+    assert snap.is_file(target / "Film.mkv")
+    assert snap.stat(target / "Film.mkv").st_size == 1
+
+    (tmp_path / "in").rmdir()
+    snap.removed(tmp_path / "in")
+    assert not snap.is_dir(tmp_path / "in")
+
+
+def test_removing_a_folder_drops_only_the_listings_below_it(tmp_path):
+    write(tmp_path / "in" / "Show" / "S01" / "e1.mkv")
+    write(tmp_path / "in" / "Film" / "Film.mkv")
+    snap = Snapshot()
+    deep, film = tmp_path / "in" / "Show" / "S01", tmp_path / "in" / "Film"
+    assert snap.exists(deep / "e1.mkv") and snap.exists(film / "Film.mkv")  # lists the leaves only
+
+    snap.removed(tmp_path / "in" / "Show")
+    assert deep not in snap._listings and film in snap._listings
+    snap.removed(tmp_path / "in")
+    assert snap._listings == {}
+
+
+def test_helpers_use_the_filesystem_without_a_snapshot(tmp_path):
+    assert snapshot.active() is None
+    write(tmp_path / "a.mkv")
+    assert snapshot.is_file(tmp_path / "a.mkv")
+    write(tmp_path / "b.mkv")  # nothing cached: seen straight away
+    assert snapshot.exists(tmp_path / "b.mkv")
+    assert sorted(snapshot.files_under(tmp_path)) == [tmp_path / "a.mkv", tmp_path / "b.mkv"]
+
+
+def test_run_reports_what_the_snapshot_saved(tmp_path, capsys):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    write(src / "Show" / "Show.S01E01.mkv", os.urandom(500))
+    write(src / "Show" / "Show.S01E01.en.srt", b"sub")
+    write(src / "Film.2020" / "Film.2020.1080p.mkv", os.urandom(700))
+    argv = ["media_organiser", str(src), str(dst), "--stable-interval", "0", "--no-fingerprint-cache"]
+    backup = sys.argv[:]
+    try:
+        sys.argv = argv
+        cli_main()
+    finally:
+        sys.argv = backup
+    out = capsys.readouterr().out
+    assert "SNAPSHOT:" in out and "lookups answered from memory" in out
+    assert snapshot.active() is None
+    # Sidecars were found through the snapshot too.
+    assert any(p.suffix == ".srt" for p in (dst / "tv").rglob("*"))
+
+
+def test_walk_dirs_visits_in_walk_order_and_forget_drops_listings(tmp_path):
+    write(tmp_path / "a" / "one.mkv")
+    write(tmp_path / "a" / "b" / "two.srt")
+    write(tmp_path / "c" / "three.mkv")
+    write(tmp_path / "c" / "d" / "e" / "four.mkv")
+    snap = Snapshot()
+    seen, dirs = [], []
+    for d, paths in snap.walk_dirs(tmp_path):
+        seen.extend(paths)
+        dirs.append(d)
+        # Only this directory and the ones still queued are listed; the rest were let go.
+        assert d in snap._listings
+        snap.forget(d)
+    assert seen == Snapshot().walk(tmp_path)
+    assert snap._listings == {}
+
+    def preorder(d):
+        # Each directory, then each subdirectory's whole tree in listing order.
+        out = [d]
+        for e in os.scandir(d):
+            if e.is_dir():
+                out += preorder(Path(e.path))
+        return out
+
+    assert dirs == preorder(tmp_path)
+
+
+def test_a_streamed_walk_keeps_nothing_about_folders_it_let_go(tmp_path):
+    for i in range(300):
+        for j in range(10):
+            (tmp_path / f"show{i}" / f"S{j:02d}").mkdir(parents=True)
+    write(tmp_path / "show0" / "S00" / "e1.mkv")
+    snap = Snapshot()
+    most = 0
+    for d, _paths in snap.walk_dirs(tmp_path):
+        snap.forget(d)
+        most = max(most, len(snap._below))
+    assert most < 50  # the path down to where the walk is, not the 3300 folders
+    assert snap._below == {} and snap._listings == {}
+
+
+def test_stream_moves_the_tree_in_directory_batches(tmp_path, capsys):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    write(src / "Show" / "Show.S01E01.mkv", os.urandom(500))
+    write(src / "Show" / "Show.S01E01.en.srt", b"sub")
+    write(src / "Again" / "Show.S01E01.720p.mkv", os.urandom(400))
+    write(src / "Film.2020" / "Film.2020.1080p.mkv", os.urandom(700))
+    for i in range(50):
+        write(src / "photos" / f"{i:03d}" / "IMG.jpg")
+    argv = ["media_organiser", str(src), str(dst), "--stable-interval", "0", "--no-fingerprint-cache",
+            "--stream", "--stream-batch", "1"]
+    backup = sys.argv[:]
+    try:
+        sys.argv = argv
+        cli_main()
+    finally:
+        sys.argv = backup
+    out = capsys.readouterr().out
+    assert (dst / "movies" / "Film" / "Film (2020) [1080p].mkv").exists()
+    assert any(p.suffix == ".srt" for p in (dst / "tv").rglob("*"))
+    # The same episode in a later batch is still caught as a batch duplicate.
+    assert "Potential duplicate in batch" in out
+    assert "Done." in out
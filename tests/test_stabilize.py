@@ -0,0 +1,98 @@
+from pathlib import Path
+import os
+import time
+
+import pytest
+
+from media_organiser.stabilize import (
+    StabilityCheck,
+    is_file_size_stable,
+    open_writer_inodes,
+    parse_strategies,
+    partition_stable,
+)
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+def test_batch_sleeps_once_for_all_candidates(tmp_path):
+    files = [tmp_path / f"ep{i}.mkv" for i in range(50)]
+    for f in files:
+        write(f, b"x" * 64)
+    sleeps = []
+
+    stable, unstable = partition_stable(files, ["size-mtime"], StabilityCheck(interval=1.0, sleep=sleeps.append))
+
+    assert sleeps == [1.0], "one shared interval per batch, not one per file"
+    assert stable == files and unstable == []
+
+
+def test_growing_file_is_unstable_and_order_is_kept(tmp_path):
+    a, b, c = (tmp_path / n for n in ("a.mkv", "b.mkv", "c.mkv"))
+    for f in (a, b, c):
+        write(f, b"x" * 16)
+
+    def grow_b(_interval):
+        with b.open("ab") as fh:
+            fh.write(b"more")
+
+    stable, unstable = partition_stable([a, b, c], ["size-mtime"], StabilityCheck(sleep=grow_b))
+    assert stable == [a, c]
+    assert unstable == [b]
+
+
+def test_vanished_file_is_unstable(tmp_path):
+    gone = tmp_path / "gone.mkv"
+    stable, unstable = partition_stable([gone], ["size-mtime"], StabilityCheck(sleep=lambda _s: None))
+    assert stable == [] and unstable == [gone]
+
+
+def test_single_file_check_follows_the_batch_rule(tmp_path):
+    write(tmp_path / "done.mkv", b"x" * 10)
+    assert is_file_size_stable(tmp_path / "done.mkv", interval=0)
+    assert not is_file_size_stable(tmp_path / "gone.mkv", interval=0)
+
+
+def test_min_age_rejects_fresh_files(tmp_path):
+    old = tmp_path / "old.mkv"
+    new = tmp_path / "new.mkv"
+    write(old, b"o")
+    write(new, b"n")
+    past = time.time() - 3600
+    os.utime(old, (past, past))
+
+    stable, unstable = partition_stable([old, new], ["min-age"], StabilityCheck(min_age=60))
+    assert stable == [old]
+    assert unstable == [new]
+
+
+@pytest.mark.skipif(not Path("/proc/self/fd").is_dir(), reason="needs /proc")
+def test_open_writers_sees_our_own_handle(tmp_path):
+    busy = tmp_path / "busy.mkv"
+    idle = tmp_path / "idle.mkv"
+    write(idle, b"i")
+    with busy.open("wb") as fh:
+        fh.write(b"partial")
+        fh.flush()
+        st = busy.stat()
+        assert (st.st_dev, st.st_ino) in open_writer_inodes()
+        stable, unstable = partition_stable([busy, idle], ["open-writers"])
+    assert stable == [idle]
+    assert unstable == [busy]
+
+
+def test_open_writers_without_proc_is_a_no_op(tmp_path):
+    f = tmp_path / "a.mkv"
+    write(f, b"a")
+    check = StabilityCheck(proc_root=tmp_path / "no-proc")
+    assert open_writer_inodes(check.proc_root) is None
+    assert partition_stable([f], ["open-writers"], check) == ([f], [])
+
+
+def test_parse_strategies_rejects_unknown():
+    assert parse_strategies("size-mtime, min-age") == ("size-mtime", "min-age")
+    with pytest.raises(ValueError):
+        parse_strategies("size-mtime,crystal-ball")
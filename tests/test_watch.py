@@ -0,0 +1,213 @@
+from pathlib import Path
+from types import SimpleNamespace
+import signal
+import threading
+
+import pytest
+
+import media_organiser.organiser as organiser
+from media_organiser.watch import InotifyWatcher, PollingWatcher, affected_items, batches
+
+
+def write(p: Path, data: bytes):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+
+
+class FakeWatcher:
+    """Replays scripted change sets, one per wait(); stops the loop when empty."""
+
+    def __init__(self, script, stop):
+        self.script = list(script)
+        self.stop = stop
+        self.closed = False
+
+    def wait(self, timeout):
+        if not self.script:
+            self.stop.set()
+            return set()
+        return set(self.script.pop(0))
+
+    def close(self):
+        self.closed = True
+
+
+def test_polling_watcher_reports_new_and_removed_files(tmp_path):
+    keep = tmp_path / "keep.mkv"
+    gone = tmp_path / "gone.mkv"
+    write(keep, b"k")
+    write(gone, b"g")
+    w = PollingWatcher(tmp_path, interval=0)
+    assert w.wait(0) == set()
+
+    new = tmp_path / "Show" / "Show.S01E01.mkv"
+    write(new, b"n")
+    gone.unlink()
+    changed = w.wait(0)
+    assert new in changed and gone in changed and new.parent in changed
+    assert keep not in changed
+
+
+def test_inotify_watcher_sees_a_folder_dropped_in(tmp_path):
+    try:
+        w = InotifyWatcher(tmp_path)
+    except OSError:
+        pytest.skip("inotify not available")
+    try:
+        staged = tmp_path.parent / (tmp_path.name + "-staging") / "Film (2020)"
+        write(staged / "Film.2020.mkv", b"f")
+        staged.rename(tmp_path / "Film (2020)")
+        changed = w.wait(1.0)
+        assert tmp_path / "Film (2020)" in changed
+        write(tmp_path / "Film (2020)" / "Film.2020.srt", b"s")
+        assert tmp_path / "Film (2020)" / "Film.2020.srt" in w.wait(1.0)
+    finally:
+        w.close()
+
+
+def test_batches_coalesce_a_burst():
+    stop = threading.Event()
+    w = FakeWatcher([{Path("/in/a")}, {Path("/in/b")}, set(), {Path("/in/c")}], stop)
+    got = list(batches(w, debounce=0.05, stop=stop))
+    assert got == [{Path("/in/a"), Path("/in/b"), Path("/in/c")}]
+
+
+def test_batches_yield_retries_without_new_events():
+    stop = threading.Event()
+    w = FakeWatcher([set()], stop)
+    retry = {Path("/in/slow.mkv")}
+    got = next(batches(w, debounce=0, stop=stop, retry=retry))
+    assert got == {Path("/in/slow.mkv")}
+    assert retry == set()
+
+
+def test_affected_items_flat_for_files_and_deep_for_dirs(tmp_path):
+    src = tmp_path / "in"
+    write(src / "Loose" / "a.mkv", b"a")
+    write(src / "Loose" / "b.mkv", b"b")
+    write(src / "Loose" / "Nested" / "c.mkv", b"c")
+    write(src / "Other" / "d.mkv", b"d")
+    write(src / "Pack" / "Disc1" / "e.mkv", b"e")
+    write(src / "movies" / "Old" / "Old.mkv", b"o")
+
+    items = affected_items(
+        src,
+        [src / "Loose" / "a.mkv", src / "Pack", src / "movies" / "Old" / "Old.mkv", tmp_path / "elsewhere"],
+        exclude=[src / "movies"],
+    )
+    assert src / "Loose" / "a.mkv" in items and src / "Loose" / "b.mkv" in items
+    assert src / "Loose" / "Nested" / "c.mkv" not in items, "siblings only, not the subtree"
+    assert src / "Pack" / "Disc1" / "e.mkv" in items
+    assert src / "Other" / "d.mkv" not in items
+    assert not any(src / "movies" in p.parents for p in items)
+
+
+def _args(**kw):
+    base = dict(
+        mode="move", dry_run=False, verify=False, reconsider=False, dupe_mode="name", no_import_dedupe=False, rebuild_index=False,
+        emit_nfo="off", nfo_layout="same-stem", overwrite_nfo=False, localhash_scheme="md5/ht-1m/v1",
+        carry_posters="off",
+        poster_min_wh="600x900", poster_aspect="0.66-0.75", poster_keywords="yify",
+        stable_interval=0.0, min_age=0.0, jobs=2, device_jobs="hdd=1,ssd=4,other=2", stream=False, stream_batch=256, debounce=0.0, watch_backend="poll", poll_interval=0.0,
+    )
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_watch_organises_new_uploads_and_keeps_index_warm(tmp_path, capsys, monkeypatch):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    write(src / "First.Film.2019.1080p.mkv", b"1" * 4096)
+    args = _args(dupe_mode="hash")
+    session = organiser._open_session(args, src, dst, ("size-mtime",))
+
+    stop = threading.Event()
+    late = src / "Second.Film.2021.1080p.mkv"
+    again = src / "First.Film.2019.720p.mkv"
+
+    class Uploads(FakeWatcher):
+        def wait(self, timeout):
+            if self.script and self.script[0] == "upload":
+                self.script.pop(0)
+                write(late, b"2" * 4096)
+                write(again, b"1" * 4096)
+                return {late, again}
+            return super().wait(timeout)
+
+    walked = []
+    real_rglob = Path.rglob
+    monkeypatch.setattr(Path, "rglob", lambda self, pat: walked.append(self) or real_rglob(self, pat))
+    organiser._watch(args, session, watcher=Uploads(["upload"], stop), stop=stop)
+
+    out = capsys.readouterr().out
+    placed = sorted(p.name for p in (dst / "movies").rglob("*.mkv"))
+    assert placed == ["First Film (2019) [1080p].mkv", "Second Film (2021) [1080p].mkv"]
+    assert "REMOVED DUPLICATE IMPORT" in out and str(again) in out
+    assert dst not in walked, "the library is not re-walked between batches"
+    assert (dst / ".media_organiser" / "library_index.json").exists()
+
+
+def test_watch_saves_state_once_a_while_and_only_when_changed(tmp_path, monkeypatch):
+    src = tmp_path / "in"
+    dst = tmp_path / "out"
+    write(src / "First.Film.2019.1080p.mkv", b"1" * 4096)
+    args = _args(dupe_mode="hash")
+    session = organiser._open_session(args, src, dst, ("size-mtime",))
+    saves = []
+    real_save = type(session.lib_import_index).save
+    monkeypatch.setattr(type(session.lib_import_index), "save",
+                        lambda self, path: saves.append(path) or real_save(self, path))
+    monkeypatch.setattr(organiser, "_WATCH_SAVE_EVERY", 3600.0)
+
+    stop = threading.Event()
+    uploads = [src / f"Film.{n}.{2000 + n}.1080p.mkv" for n in range(3)]
+
+    class Uploads(FakeWatcher):
+        def wait(self, timeout):
+            if self.script:
+                p = uploads[len(uploads) - len(self.script)]
+                self.script.pop(0)
+                write(p, bytes([n for n in range(256)]) * (16 + len(self.script)))
+                return {p}
+            return super().wait(timeout)
+
+    organiser._watch(args, session, watcher=Uploads(["a", "b", "c"], stop), stop=stop)
+    assert len(saves) == 2, "the first pass, then once on the way out"
+    assert len(list((dst / "movies").rglob("*.mkv"))) == 4
+    assert not session.lib_import_index.dirty
+    organiser._close_session(args, session)
+    assert len(saves) == 2, "nothing changed since the last save"
+
+
+def test_watch_hands_sigterm_back_when_it_stops(tmp_path):
+    args = _args()
+    seen = []
+
+    class Terminated(FakeWatcher):
+        def wait(self, timeout):
+            handler = signal.getsignal(signal.SIGTERM)
+            seen.append(handler)
+            if threading.current_thread() is threading.main_thread():
+                handler(signal.SIGTERM, None)  # what SIGTERM would do: stop the loop
+                return set()
+            raise KeyboardInterrupt
+
+    def ours(*_):
+        pass
+
+    previous = signal.signal(signal.SIGTERM, ours)
+    try:
+        session = organiser._open_session(args, tmp_path / "in", tmp_path / "out", ("size-mtime",))
+        organiser._watch(args, session, watcher=Terminated([], None))
+        assert seen[0] is not ours, "the watch stops on SIGTERM"
+        assert signal.getsignal(signal.SIGTERM) is ours
+
+        # Off the main thread it leaves handlers alone.
+        session = organiser._open_session(args, tmp_path / "in", tmp_path / "out", ("size-mtime",))
+        worker = threading.Thread(target=organiser._watch, args=(args, session),
+                                  kwargs={"watcher": Terminated([], None)})
+        worker.start()
+        worker.join()
+        assert seen[1] is ours and signal.getsignal(signal.SIGTERM) is ours
+    finally:
+        signal.signal(signal.SIGTERM, previous)
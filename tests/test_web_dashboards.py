@@ -164,3 +164,11 @@ def test_zero_ttl_disables_caching(client, monkeypatch, movies_root):
 def test_invalid_ttl_falls_back_to_default(monkeypatch):
     monkeypatch.setenv("DASHBOARD_CACHE_TTL", "not-a-number")
     assert web._cache_ttl() == 60.0
+
+
+def test_api_scrub_reports_nothing_before_a_first_scrub(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("LIB_DIR", str(tmp_path))
+    r = client.get("/api/library/scrub")
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["in_progress"] is None and data["last_completed"] is None